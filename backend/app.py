@@ -1,62 +1,65 @@
-from flask import Flask
-from flask_cors import CORS
-from database import app, db
-from routes.user_routes import user_bp
-from routes.quiz_routes import quiz_bp
-from routes.lobby_routes import lobby_bp
-from flask_socketio import SocketIO
-from websocket.socket_handlers import register_socket_events
-
-
-# Configura CORS (completamente libero)
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ["http://localhost:5173"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": True
-    }
-})
-
-socketio = SocketIO(app, cors_allowed_origins="*")
-register_socket_events(socketio)
-
-# Registra i blueprints
-app.register_blueprint(user_bp)
-app.register_blueprint(quiz_bp)
-app.register_blueprint(lobby_bp)
-
-@app.route('/')
-def home():
-    return """
-    <h1>Quiz Game API</h1>
-    <p>Server Flask attivo e funzionante!</p>
-    
-    <h3>API Endpoints disponibili:</h3>
-    <ul>
-        <li><strong>GET</strong> /api/users - Lista utenti</li>
-        <li><strong>POST</strong> /api/user - Crea utente</li>
-        <li><strong>GET</strong> /api/user/&lt;id&gt; - Ottieni utente</li>
-        <li><strong>POST</strong> /api/auth - Login</li>
-        <li><strong>POST</strong> /api/quiz - Crea quiz</li>
-        <li><strong>GET</strong> /api/quiz/&lt;id&gt; - Ottieni quiz</li>
-        <li><strong>GET</strong> /api/quiz/&lt;id&gt;/lobby - Ottieni lobby info</li>
-        <li><strong>POST</strong> /api/quiz/&lt;id&gt;/lobby/join - Unisciti alla lobby</li>
-        <li><strong>POST</strong> /api/quiz/&lt;id&gt;/lobby/start - Inizia quiz (solo admin)</li>
-        <li><strong>POST</strong> /api/quiz/&lt;id&gt;/lobby/leave - Lascia lobby</li>
-    </ul>
-    
-    <h3>Test veloce:</h3>
-    <a href="/api/users">Vedi tutti gli utenti</a><br>
-    """
+import threading
+
+# Modalità WSGI (Flask-SocketIO); la modalità ASGI è in asgi_app.py
+#
+# create_app() configura l'app e il server Socket.IO una sola volta per processo.
+# Importare il modulo non carica Flask né il database: `from app import app, socketio`
+# chiama create_app() al primo accesso.
+
+_created = None
+_create_lock = threading.Lock()
+
+def create_app():
+    """(app Flask, SocketIO) pronti per servire; le chiamate successive ritornano gli stessi"""
+    global _created
+    with _create_lock:
+        if _created is None:
+            _created = _build_app()
+        return _created
+
+def _build_app():
+    from database import create_flask_app
+    from app_setup import configure_app
+    from flask_socketio import SocketIO
+    from websocket.socket_handlers import register_socket_events
+    from services.lobby_service import lobby_store
+    from services.game_service import game_engine
+    from services.snapshot_service import quiz_snapshots
+    from websocket.wire_format import wire_formats
+
+    app = create_flask_app()
+    configure_app(app)
+
+    # Con più worker gli emit verso le room passano dalla message queue condivisa
+    message_queue = app.config['REDIS_URL'] if app.config['LOBBY_BACKEND'] == 'redis' else None
+    if message_queue:
+        # I client compatti in una room possono essere collegati a un altro worker
+        wire_formats.share_room_counts(lobby_store.client)
+    socketio = SocketIO(app, cors_allowed_origins="*", message_queue=message_queue,
+                        http_compression=True, compression_threshold=app.config['SOCKETIO_COMPRESSION_THRESHOLD'])
+    register_socket_events(socketio)
+    lobby_store.start_sweeper(socketio)
+    quiz_snapshots.start_sweeper(socketio, lobby_store.exists)
+    game_engine.start_flusher(socketio)
+    return app, socketio
+
+def __getattr__(name):
+    if name == 'app':
+        return create_app()[0]
+    if name == 'socketio':
+        return create_app()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
+    from migrations import upgrade_db
+    upgrade_db()
+
+    app, socketio = create_app()
     with app.app_context():
         print("Quiz Game API Server Starting...")
         print("=" * 40)
         print("Server disponibile su: http://localhost:5000")
         print("API Base URL: http://localhost:5000/api")
         print("=" * 40)
-        
-        socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+
+        socketio.run(app, debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,92 @@
+from services.logging_service import setup_logging
+
+# Configurazione HTTP comune ai due server: app.py (Flask-SocketIO) e asgi_app.py (ASGI).
+# Blueprint, CORS e servizi vengono importati qui dentro, quando un worker crea
+# l'app, e non quando un modulo (o uno script da riga di comando) importa app_setup.
+
+def trust_proxies(app):
+    """
+    Dietro un reverse proxy request.remote_addr (usato dai rate limit per ip)
+    sarebbe l'indirizzo del proxy: ProxyFix lo prende da X-Forwarded-For, contando
+    solo gli ultimi TRUSTED_PROXIES indirizzi (quelli aggiunti dai proxy fidati)
+    """
+    if app.config['TRUSTED_PROXIES']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
+def configure_app(app):
+    from flask_cors import CORS
+    from routes.user_routes import user_bp
+    from routes.quiz_routes import quiz_bp
+    from routes.lobby_routes import lobby_bp
+    from routes.metrics_routes import metrics_bp
+    from routes.stats_routes import stats_bp
+    from services.game_service import game_engine
+    from services.metrics_service import metrics, init_request_metrics
+    from services.cache_service import quiz_payload_cache
+    from services.snapshot_service import quiz_snapshots
+    from services.password_service import password_hasher
+
+    setup_logging()
+
+    trust_proxies(app)
+
+    # Configura CORS (completamente libero)
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": ["http://localhost:5173"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["Content-Type", "Authorization"],
+            "supports_credentials": True
+        }
+    })
+
+    # Registra i blueprints
+    app.register_blueprint(user_bp)
+    app.register_blueprint(quiz_bp)
+    app.register_blueprint(lobby_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(stats_bp)
+
+    # Metriche: durata di ogni richiesta e statistiche dei componenti in memoria
+    init_request_metrics(app)
+    metrics.register_collector("quiz_payload_cache", "Statistiche della cache dei quiz", quiz_payload_cache.stats)
+    metrics.register_collector("quiz_snapshots", "Quiz caricati in memoria per le lobby", quiz_snapshots.stats)
+    metrics.register_collector("password_pool", "Statistiche del pool di hash delle password", password_hasher.stats)
+    metrics.register_collector("answer_buffer", "Risposte in attesa e scritte su Risposta", lambda: {
+        "pending": game_engine.buffer.pending(),
+        "flushed": game_engine.buffer.flushed,
+        "flushes": game_engine.buffer.flushes,
+        "dropped": game_engine.buffer.dropped
+    })
+
+    app.add_url_rule('/', 'home', home)
+
+def home():
+    return """
+    <h1>Quiz Game API</h1>
+    <p>Server Flask attivo e funzionante!</p>
+
+    <h3>API Endpoints disponibili:</h3>
+    <ul>
+        <li><strong>GET</strong> /api/users - Lista utenti</li>
+        <li><strong>POST</strong> /api/user - Crea utente</li>
+        <li><strong>GET</strong> /api/user/&lt;id&gt; - Ottieni utente</li>
+        <li><strong>POST</strong> /api/auth - Login</li>
+        <li><strong>POST</strong> /api/quiz - Crea quiz</li>
+        <li><strong>GET</strong> /api/quiz/&lt;id&gt; - Ottieni quiz</li>
+        <li><strong>GET</strong> /api/quiz/&lt;id&gt;/lobby - Ottieni lobby info</li>
+        <li><strong>POST</strong> /api/quiz/&lt;id&gt;/lobby/join - Unisciti alla lobby</li>
+        <li><strong>POST</strong> /api/quiz/&lt;id&gt;/lobby/start - Inizia quiz (solo admin)</li>
+        <li><strong>POST</strong> /api/quiz/&lt;id&gt;/lobby/leave - Lascia lobby</li>
+        <li><strong>GET</strong> /api/quiz/&lt;id&gt;/stats - Statistiche del quiz</li>
+        <li><strong>GET</strong> /api/user/&lt;id&gt;/stats - Statistiche dell'utente</li>
+        <li><strong>GET</strong> /api/leaderboard - Classifica generale</li>
+        <li><strong>GET</strong> /metrics - Metriche (formato Prometheus)</li>
+    </ul>
+
+    <h3>Test veloce:</h3>
+    <a href="/api/users">Vedi tutti gli utenti</a><br>
+    """
@@ -0,0 +1,80 @@
+"""
+Modalità ASGI: stessi blueprint e stessi handler Socket.IO di app.py, ma serviti da
+un socketio.AsyncServer su asyncio (es. uvicorn). Gli handler e le route Flask
+girano in thread separati, quindi l'accesso al database non blocca il loop.
+
+    uvicorn asgi_app:application --host 0.0.0.0 --port 5000 [--no-ws-per-message-deflate]
+    uvicorn --factory asgi_app:create_asgi_app --host 0.0.0.0 --port 5000
+    python server.py --mode asgi
+
+Richiede asgiref e un server ASGI (uvicorn) oltre alle dipendenze di app.py.
+"""
+import threading
+
+# create_asgi_app() costruisce l'applicazione una sola volta per processo; `application`
+# viene creata al primo accesso, quindi `uvicorn asgi_app:application` continua a funzionare
+# (come `uvicorn --factory asgi_app:create_asgi_app`).
+
+_created = None
+_create_lock = threading.Lock()
+
+def create_asgi_app():
+    """socketio.ASGIApp con le route Flask come applicazione secondaria"""
+    global _created
+    with _create_lock:
+        if _created is None:
+            _created = _build_application()
+        return _created
+
+def _build_application():
+    from asgiref.wsgi import WsgiToAsgi
+    from database import create_flask_app
+    from app_setup import configure_app
+    from websocket.async_bridge import AsyncSocketBridge
+    from websocket.socket_handlers import register_socket_events
+    from services.lobby_service import lobby_store
+    from services.game_service import game_engine
+    from services.snapshot_service import quiz_snapshots
+    from websocket.wire_format import wire_formats
+    import socketio
+
+    app = create_flask_app()
+    configure_app(app)
+
+    # Come in app.py: con Redis gli emit verso le room passano dal canale condiviso
+    client_manager = None
+    if app.config['LOBBY_BACKEND'] == 'redis':
+        client_manager = socketio.AsyncRedisManager(app.config['REDIS_URL'])
+        wire_formats.share_room_counts(lobby_store.client)
+
+    sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*", client_manager=client_manager,
+                               http_compression=True,
+                               compression_threshold=app.config['SOCKETIO_COMPRESSION_THRESHOLD'])
+    bridge = AsyncSocketBridge(sio, app)
+    register_socket_events(bridge)
+
+    async def on_startup():
+        await bridge.startup()
+        lobby_store.start_sweeper(bridge)
+        quiz_snapshots.start_sweeper(bridge, lobby_store.exists)
+        game_engine.start_flusher(bridge)
+
+    def on_shutdown():
+        game_engine.buffer.flush()
+        bridge.shutdown()
+
+    return socketio.ASGIApp(
+        sio,
+        other_asgi_app=WsgiToAsgi(app),
+        on_startup=on_startup,
+        on_shutdown=on_shutdown,
+    )
+
+def __getattr__(name):
+    if name == 'application':
+        return create_asgi_app()
+    if name == 'app':
+        create_asgi_app()
+        from database import create_flask_app
+        return create_flask_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,63 @@
+"""
+Benchmark dell'allocazione dei codici lobby.
+
+Crea N lobby da più thread il più velocemente possibile e verifica che:
+- nessun codice sia stato assegnato a due lobby vive
+- il numero di lobby nello store coincida con le allocazioni
+Stampa throughput e numero di tentativi ripetuti (codice già in uso).
+
+    python benchmarks/bench_lobby_codes.py --lobbies 200000 --threads 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.lobby_registry import LobbyRegistry
+from services.code_allocator import CodeAllocator
+
+def run(lobbies, threads):
+    store = LobbyRegistry()
+    allocator = CodeAllocator(store)
+    per_thread = lobbies // threads
+    results = [[] for _ in range(threads)]
+
+    def worker(index):
+        codes = results[index]
+        for i in range(per_thread):
+            codes.append(allocator.allocate(i))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    codes = [code for chunk in results for code in chunk]
+    duplicates = len(codes) - len(set(codes))
+    return {
+        "lobbies": len(codes),
+        "threads": threads,
+        "seconds": round(elapsed, 3),
+        "allocations_per_second": round(len(codes) / elapsed),
+        "retries": allocator.retries,
+        "duplicates": duplicates,
+        "store_size": len(store)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lobbies", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    report = run(args.lobbies, args.threads)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    assert report["duplicates"] == 0, "Codici duplicati tra lobby vive!"
+    assert report["store_size"] == report["lobbies"], "Lobby sovrascritte nello store!"
@@ -0,0 +1,144 @@
+"""
+Benchmark della ricerca full-text (FTS5) sui quiz.
+
+Popola un database temporaneo con quiz e domande generati da un vocabolario
+sintetico (l'indice è aggiornato dai trigger durante gli insert), poi misura
+la latenza di GET /api/quiz/search per parole intere, prefissi da type-ahead e
+più termini, confrontandola con un filtro LIKE sulle stesse tabelle.
+
+    python benchmarks/bench_search.py --quizzes 100000 --questions 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import use_temp_database, summarize, save_results, print_table, default_output
+
+SYLLABLES = ["ca", "pi", "ta", "le", "ro", "ma", "sto", "ria", "geo", "gra", "fi", "a", "mu", "si",
+             "scien", "za", "ar", "te", "lin", "gua", "ne", "vi", "zio", "mon", "do", "spor", "tu"]
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def sentence(rng, vocabulary, length):
+    return " ".join(rng.choice(vocabulary) for _ in range(length)).capitalize()
+
+def seed(db, args, vocabulary, rng):
+    from sqlalchemy import insert
+    from models import User, Quiz, Domanda
+
+    db.session.execute(insert(User), [{"id": 1, "username": "bench", "password": "password"}])
+    start = datetime.utcnow() - timedelta(days=365)
+    batch = 10000
+    for first in range(1, args.quizzes + 1, batch):
+        ids = range(first, min(first + batch, args.quizzes + 1))
+        db.session.execute(insert(Quiz), [{
+            "id": i, "nome": sentence(rng, vocabulary, 3), "data": start + timedelta(seconds=i), "user_id": 1
+        } for i in ids])
+        db.session.execute(insert(Domanda), [{
+            "testo": sentence(rng, vocabulary, 8) + "?", "indice_corretto": 0, "quiz_id": i
+        } for i in ids for _ in range(args.questions)])
+        db.session.commit()
+
+def database_size_mb(path):
+    return round(sum(os.path.getsize(path + s) for s in ("", "-wal") if os.path.exists(path + s)) / 2 ** 20, 1)
+
+def like_search(db, word):
+    """Riferimento senza indice: per ordinare i risultati serve comunque trovarli tutti con LIKE"""
+    from sqlalchemy import text
+    return db.session.execute(text(
+        "SELECT COUNT(DISTINCT q.id) FROM quiz q LEFT JOIN domanda d ON d.quiz_id = q.id "
+        "WHERE q.nome LIKE :p OR d.testo LIKE :p"
+    ), {"p": f"%{word}%"}).scalar()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=100000)
+    parser.add_argument("--questions", type=int, default=10, help="domande per quiz")
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--like-queries", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=default_output("search"))
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    rng = random.Random(args.seed)
+    try:
+        from app import create_app
+        from database import db
+        from migrations import upgrade_db
+        app, _ = create_app()
+
+        upgrade_db()
+        vocabulary = make_vocabulary(args.vocabulary, rng)
+        with app.app_context():
+            t0 = time.perf_counter()
+            seed(db, args, vocabulary, rng)
+            seed_seconds = time.perf_counter() - t0
+        print(f"Seed con indicizzazione: {seed_seconds:.1f}s, database {database_size_mb(db_path)} MB")
+
+        client = app.test_client()
+        queries = {
+            "parola intera": lambda: rng.choice(vocabulary),
+            "prefisso 3 caratteri": lambda: rng.choice(vocabulary)[:3],
+            "prefisso 5 caratteri": lambda: rng.choice(vocabulary)[:5],
+            "due termini": lambda: f"{rng.choice(vocabulary)} {rng.choice(vocabulary)[:4]}",
+        }
+        scenarios = {}
+        for name, make_query in queries.items():
+            samples = []
+            results = 0
+            start = time.perf_counter()
+            for _ in range(args.queries):
+                t0 = time.perf_counter()
+                response = client.get("/api/quiz/search", query_string={"q": make_query(), "limit": args.limit})
+                samples.append(time.perf_counter() - t0)
+                results += len(response.get_json()["quizzes"])
+            scenarios[f"FTS {name}"] = dict(summarize(samples, time.perf_counter() - start),
+                                            avg_results=round(results / args.queries, 1))
+
+        # Pagine successive della stessa ricerca tramite cursore
+        samples = []
+        start = time.perf_counter()
+        for _ in range(args.queries // 10 or 1):
+            cursor, query = None, rng.choice(vocabulary)[:3]
+            for _ in range(5):
+                t0 = time.perf_counter()
+                body = client.get("/api/quiz/search", query_string={
+                    "q": query, "limit": args.limit, "cursor": cursor or ""}).get_json()
+                samples.append(time.perf_counter() - t0)
+                cursor = body["next_cursor"]
+                if not cursor:
+                    break
+        scenarios["FTS paginazione (5 pagine)"] = summarize(samples, time.perf_counter() - start)
+
+        with app.app_context():
+            samples = []
+            start = time.perf_counter()
+            for _ in range(args.like_queries):
+                t0 = time.perf_counter()
+                like_search(db, rng.choice(vocabulary))
+                samples.append(time.perf_counter() - t0)
+            scenarios["LIKE parola intera"] = summarize(samples, time.perf_counter() - start)
+
+        print_table(scenarios)
+        params = {k: v for k, v in vars(args).items() if k != "output"}
+        params.update(seed_seconds=round(seed_seconds, 1), database_mb=database_size_mb(db_path))
+        save_results(args.output, "search", params, scenarios)
+        print(f"Risultati in {args.output}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+if __name__ == '__main__':
+    main()
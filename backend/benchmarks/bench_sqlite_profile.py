@@ -0,0 +1,144 @@
+"""
+Benchmark del profilo SQLite: throughput delle letture con e senza scritture concorrenti.
+
+Per ogni profilo avvia un processo separato (le PRAGMA si leggono all'avvio) che:
+1. misura le letture al secondo dei servizi GET con soli lettori
+2. ripete la misura mentre un thread scrive righe Risposta in transazioni brevi
+Con il profilo "default" (journal DELETE) le letture crollano durante le
+scritture; con il profilo "tuned" (WAL + sessione in sola lettura) no.
+
+    python benchmarks/bench_sqlite_profile.py --seconds 5 --readers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import use_temp_database, save_results, default_output
+
+PROFILES = {
+    # Comportamento precedente: rollback journal, sync completo, nessuna mmap
+    "default": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+    },
+    # Default di db_profile.py
+    "tuned": {},
+}
+
+def run_phase(seconds, readers, with_writer, quizzes):
+    from database import app, db
+    from services.quiz_service import list_quizzes, get_quiz_with_questions
+    from models import Risposta
+
+    stop = threading.Event()
+    reads = [0] * readers
+    read_errors = [0] * readers
+    writes = [0]
+    write_errors = [0]
+
+    def reader(index):
+        n = 0
+        while not stop.is_set():
+            n += 1
+            try:
+                with app.app_context():
+                    list_quizzes(limit=20)
+                    quiz, _, _ = get_quiz_with_questions(n % quizzes + 1)
+                    if quiz is None:
+                        raise RuntimeError("quiz non trovato")
+                reads[index] += 1
+            except Exception:
+                read_errors[index] += 1
+
+    def writer():
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    db.session.add_all([Risposta(risposta_data="A", quiz_id=1, user_id=1) for _ in range(20)])
+                    db.session.commit()
+                    writes[0] += 1
+                except Exception:
+                    db.session.rollback()
+                    write_errors[0] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {
+        "reads_per_second": round(sum(reads) / seconds, 1),
+        "read_errors": sum(read_errors),
+        "write_transactions_per_second": round(writes[0] / seconds, 1),
+        "write_errors": write_errors[0],
+    }
+
+def worker(args):
+    db_path = use_temp_database()
+    try:
+        from database import app, db
+        from migrations import upgrade_db
+        from load_test import seed
+
+        upgrade_db()
+        with app.app_context():
+            seed(db, 50, args.quizzes, 10)
+        result = {
+            "reads_only": run_phase(args.seconds, args.readers, False, args.quizzes),
+            "reads_with_writer": run_phase(args.seconds, args.readers, True, args.quizzes),
+        }
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    print(json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--quizzes", type=int, default=500)
+    parser.add_argument("--output", default=default_output("sqlite_profile"))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    scenarios = {}
+    for name, env in PROFILES.items():
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker",
+             "--seconds", str(args.seconds), "--readers", str(args.readers), "--quizzes", str(args.quizzes)],
+            env={**os.environ, **env, "LOG_LEVEL": "WARNING"},
+            capture_output=True, text=True, check=True)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        for phase, stats in result.items():
+            scenarios[f"{name} {phase}"] = stats
+
+    for name, stats in scenarios.items():
+        print(f"{name:28} letture/s {stats['reads_per_second']:>9}  errori {stats['read_errors']:>5}  "
+              f"scritture/s {stats['write_transactions_per_second']:>7}  errori {stats['write_errors']:>5}")
+    for name in PROFILES:
+        alone = scenarios[f"{name} reads_only"]["reads_per_second"]
+        loaded = scenarios[f"{name} reads_with_writer"]["reads_per_second"]
+        if alone:
+            print(f"{name}: con scritture in corso le letture restano al {loaded / alone:.0%}")
+
+    params = {"seconds": args.seconds, "readers": args.readers, "quizzes": args.quizzes}
+    save_results(args.output, "sqlite_profile", params, scenarios)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark dell'avvio: quanto costa importare e preparare l'app in un processo nuovo.
+
+Per ogni scenario avvia --runs processi Python separati e misura:
+- il tempo totale del processo (avvio dell'interprete compreso), mediana e minimo
+- il tempo di CPU del processo, meno sensibile al rumore della macchina
+- il tempo di import secondo `python -X importtime` (somma dei moduli di primo livello)
+- il numero di moduli caricati e i moduli più costosi
+
+Scenari:
+- cli:      import di database e models, come create_db.py e gli altri script
+- migrate:  import di migrations (upgrade del database da riga di comando)
+- wsgi:     create_app() di app.py, cioè un worker Flask-SocketIO pronto
+- asgi:     create_asgi_app() di asgi_app.py, cioè un worker uvicorn pronto
+- import:   solo import di app e asgi_app, senza creare l'app (strumenti, processo master)
+
+    python benchmarks/bench_startup.py --runs 15
+"""
+import argparse
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import use_temp_database, save_results, default_output, BACKEND_DIR
+
+SCENARIOS = {
+    "cli": "import database, models",
+    "migrate": "import migrations",
+    "wsgi": "from app import create_app; create_app()",
+    "asgi": "from asgi_app import create_asgi_app; create_asgi_app()",
+    "import": "import app, asgi_app",
+}
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def run(code, env, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [
+        "-c", code + "; import sys; print(len(sys.modules))"]
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    proc = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime
+    return wall, cpu, proc
+
+def parse_importtime(stderr):
+    """(millisecondi di import dei moduli di primo livello, [(ms cumulativi, modulo)])"""
+    top_level = 0
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2))
+        depth = len(match.group(3)) // 2
+        if depth == 0:
+            top_level += cumulative
+        modules.append((cumulative / 1000, match.group(4)))
+    return top_level / 1000, modules
+
+def measure(code, runs, env):
+    run(code, env)  # primo avvio: riscalda la cache dei file .pyc
+    walls, cpus = [], []
+    for _ in range(runs):
+        wall, cpu, proc = run(code, env)
+        walls.append(wall)
+        cpus.append(cpu)
+    module_count = int(proc.stdout.strip().splitlines()[-1])
+
+    import_ms = []
+    heaviest = {}
+    for _ in range(max(3, runs // 3)):
+        _, _, proc = run(code, env, importtime=True)
+        total, modules = parse_importtime(proc.stderr)
+        import_ms.append(total)
+        for ms, name in modules:
+            heaviest[name] = min(ms, heaviest.get(name, ms))
+    top = sorted(heaviest.items(), key=lambda item: -item[1])
+
+    return {
+        "runs": runs,
+        "wall_ms_median": round(statistics.median(walls) * 1000, 1),
+        "wall_ms_min": round(min(walls) * 1000, 1),
+        "cpu_ms_median": round(statistics.median(cpus) * 1000, 1),
+        "import_ms_median": round(statistics.median(import_ms), 1),
+        "modules": module_count,
+        # Moduli dell'app (non di librerie) più lenti da importare, tempi cumulativi
+        "top_app_modules": [
+            {"module": name, "ms": round(ms, 1)} for name, ms in top
+            if os.path.exists(os.path.join(BACKEND_DIR, name.split(".")[0]))
+            or os.path.exists(os.path.join(BACKEND_DIR, name.split(".")[0] + ".py"))
+        ][:8],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="scenari da misurare (default: tutti)")
+    parser.add_argument("--output", default=default_output("startup"))
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    env = {**os.environ, "LOG_LEVEL": "WARNING", "PYTHONPATH": BACKEND_DIR}
+    try:
+        subprocess.run([sys.executable, "-c", "from migrations import upgrade_db; upgrade_db()"],
+                       cwd=BACKEND_DIR, env=env, capture_output=True, check=True)
+        scenarios = {}
+        print(f"{'scenario':10} {'processo ms':>12} {'min ms':>8} {'CPU ms':>8} {'import ms':>10} {'moduli':>7}")
+        for name in args.scenario or SCENARIOS:
+            stats = measure(SCENARIOS[name], args.runs, env)
+            scenarios[name] = stats
+            print(f"{name:10} {stats['wall_ms_median']:>12} {stats['wall_ms_min']:>8} {stats['cpu_ms_median']:>8} "
+                  f"{stats['import_ms_median']:>10} {stats['modules']:>7}")
+            print("           " + ", ".join(f"{m['module']} {m['ms']}" for m in stats["top_app_modules"][:5]))
+
+        save_results(args.output, "startup", {"runs": args.runs}, scenarios)
+        print(f"Risultati in {args.output}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Benchmark di memoria delle liste complete: risposta costruita in memoria contro streaming.
+
+Popola un database temporaneo con --rows utenti e quiz, poi per ogni combinazione
+(lista, modalità) avvia un processo separato e misura la crescita della RSS
+(totale e anonima, cioè senza le pagine del database mappate con mmap) durante
+la richiesta, il tempo al primo byte e il tempo totale:
+- buffered: tutte le righe in una lista e poi jsonify (il comportamento precedente)
+- stream:   GET /api/users e GET /api/quizzez?stream=1, letti a pezzi e scartati
+
+    python benchmarks/bench_streaming.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import use_temp_database, save_results, default_output, BACKEND_DIR
+
+TARGETS = {
+    "users": "/api/users",
+    "quizzes": "/api/quizzez?stream=1",
+}
+MODES = ("buffered", "stream")
+
+def current_rss_mb():
+    """(RSS totale, RSS anonima) in MB: la parte anonima esclude le pagine del file
+    SQLite mappate con mmap, che il kernel può liberare in qualsiasi momento"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "RssAnon:")):
+                name, kb = line.split()[:2]
+                values[name] = int(kb) / 1024
+    return values["VmRSS:"], values["RssAnon:"]
+
+class RssSampler:
+    """Picchi di RSS durante la richiesta: ru_maxrss includerebbe anche gli import"""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak, self.peak_anon = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        total, anon = current_rss_mb()
+        self.peak = max(self.peak, total)
+        self.peak_anon = max(self.peak_anon, anon)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+def seed(db, rows):
+    from sqlalchemy import insert
+    from models import User, Quiz
+
+    start = datetime.utcnow() - timedelta(days=365)
+    batch = 50000
+    for first in range(1, rows + 1, batch):
+        ids = range(first, min(first + batch, rows + 1))
+        db.session.execute(insert(User), [{"id": i, "username": f"user{i}", "password": "x"} for i in ids])
+        db.session.execute(insert(Quiz), [{
+            "id": i, "nome": f"Quiz {i}", "data": start + timedelta(seconds=i), "user_id": i
+        } for i in ids])
+        db.session.commit()
+
+def run_buffered(app, target):
+    from flask import jsonify
+    from services.user_service import get_all_users
+    from services.quiz_service import iter_quizzes
+
+    with app.test_request_context():
+        if target == "users":
+            users, message = get_all_users()
+            body = jsonify({"message": message, "users": [{"id": u.id, "username": u.username} for u in users]})
+        else:
+            body = jsonify({"quizzes": list(iter_quizzes()), "next_cursor": None})
+        data = body.get_data()
+    return len(data), None
+
+def run_stream(app, target):
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get(TARGETS[target], buffered=False)
+    size = 0
+    first_byte = None
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    response.close()
+    return size, first_byte
+
+def worker(args):
+    # DATABASE_URL arriva dal processo padre
+    sys.path.insert(0, BACKEND_DIR)
+    from app import create_app
+    app, _ = create_app()
+
+    baseline, baseline_anon = current_rss_mb()
+    run = run_stream if args.mode == "stream" else run_buffered
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        size, first_byte = run(app, args.target)
+        elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "rss_before_mb": round(baseline, 1),
+        "rss_peak_mb": round(sampler.peak, 1),
+        "rss_growth_mb": round(sampler.peak - baseline, 1),
+        "anon_rss_growth_mb": round(sampler.peak_anon - baseline_anon, 1),
+        "seconds": round(elapsed, 3),
+        "first_byte_ms": round((first_byte if first_byte is not None else elapsed) * 1000, 1),
+        "bytes": size
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--output", default=default_output("streaming"))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--target", choices=list(TARGETS), help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    db_path = use_temp_database()
+    try:
+        from database import app, db
+        from migrations import upgrade_db
+
+        upgrade_db()
+        with app.app_context():
+            t0 = time.perf_counter()
+            seed(db, args.rows)
+        print(f"Seed di {args.rows} utenti e quiz in {time.perf_counter() - t0:.1f}s")
+
+        scenarios = {}
+        for target in TARGETS:
+            for mode in MODES:
+                proc = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", "--target", target, "--mode", mode],
+                    env={**os.environ, "LOG_LEVEL": "WARNING"}, capture_output=True, text=True, check=True)
+                stats = json.loads(proc.stdout.strip().splitlines()[-1])
+                scenarios[f"{target} {mode}"] = stats
+                print(f"{target + ' ' + mode:18} RSS anonima +{stats['anon_rss_growth_mb']:>8} MB  "
+                      f"RSS +{stats['rss_growth_mb']:>8} MB (picco {stats['rss_peak_mb']} MB)  "
+                      f"primo byte {stats['first_byte_ms']:>9} ms  totale {stats['seconds']:>7} s  "
+                      f"{stats['bytes'] / 2 ** 20:.1f} MB")
+
+        save_results(args.output, "streaming", {"rows": args.rows}, scenarios)
+        print(f"Risultati in {args.output}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark del formato degli eventi Socket.IO: byte e CPU per evento.
+
+Ricostruisce gli eventi ricevuti da un client durante una partita in una room di
+--players giocatori (ingressi, domande, notifiche delle risposte, classifiche, chat)
+e li codifica come pacchetti Socket.IO con:
+- json:    i dizionari inviati oggi (predefinito)
+- compact: il formato negoziato con auth={'encoding': 'compact'} (websocket/wire_format.py)
+- msgpack: lo stesso formato compatto serializzato con MessagePack come allegato
+           binario, se il pacchetto msgpack è installato (solo per confronto)
+
+Per ogni formato riporta i byte per evento senza compressione e con permessage-deflate
+(zlib con context takeover, come lo negoziano i browser), il tempo di codifica per
+evento (una volta per room) e quello della compressione (una volta per connessione).
+
+    python benchmarks/bench_wire_format.py --players 300 --questions 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import use_temp_database, save_results, default_output
+
+def build_events(players, questions, messages, seed):
+    """Eventi ricevuti da un client nell'ordine della partita: [(evento, payload)]"""
+    from services.game_service import Leaderboard
+    from services.resume_service import resume_tokens
+    from websocket.broadcaster import public_player
+
+    rng = random.Random(seed)
+    code = "K7TQ2M"
+    roster = [{'sid': f"sid{i:06d}abcdefgh", 'username': f"studente{i}", 'user_id': 1000 + i, 'id': 1000 + i}
+              for i in range(players)]
+    events = []
+    seq = 0
+
+    def room_event(event, payload):
+        nonlocal seq
+        seq += 1
+        events.append((event, {**payload, 'seq': seq}))
+
+    me = roster[0]
+    events.append(('user_joined', {
+        'username': me['username'], 'message': f"{me['username']} si è unito alla room!",
+        'participants_count': 1, 'resume_token': resume_tokens.issue(code, me['sid']), 'seq': 0
+    }))
+    events.append(('list_players', {'room_id': code, 'version': 0, 'players': [public_player(me)]}))
+
+    # Ingressi raggruppati da PlayerListBroadcaster in finestre da ~10 giocatori
+    version = 0
+    for first in range(1, players, 10):
+        batch = roster[first:first + 10]
+        room_event('players_delta', {
+            'room_id': code, 'version': version + 1, 'base_version': version,
+            'added': [public_player(p) for p in batch], 'removed': [], 'count': first + len(batch)
+        })
+        version += 1
+
+    room_event('quiz_started', {'quiz_id': code, 'question_count': questions})
+    leaderboard = Leaderboard()
+    for index in range(questions):
+        question_id = 5000 + index
+        room_event('question', {
+            'quiz_id': code, 'index': index, 'total': questions, 'question_id': question_id,
+            'testo': f"Domanda {index + 1}: quale di queste città è la capitale della regione numero {index}?",
+            'options': ["Torino", "Milano", "Bologna", "Firenze"],
+            'duration': 20, 'ends_at': 1760000000000 + index * 23000
+        })
+        for player in rng.sample(roster, len(roster)):
+            points = rng.choice((0, 0, 612, 748, 903, 991))
+            score = leaderboard.add(player['id'], player['username'], points)
+            if player is me:
+                events.append(('answer_result', {'question_id': question_id, 'correct': points > 0,
+                                                 'points': points, 'score': score}))
+            room_event('answer_submitted', {'username': player['username'], 'question_id': question_id,
+                                            'quiz_id': code})
+        room_event('question_ended', {'quiz_id': code, 'question_id': question_id, 'correct_index': 2,
+                                      'leaderboard': leaderboard.top()})
+    for i in range(messages):
+        player = rng.choice(roster)
+        room_event('room_message', {'username': player['username'], 'message': f"forza ragazzi! {i}",
+                                    'room_id': code})
+    room_event('quiz_ended', {'quiz_id': code, 'leaderboard': leaderboard.top(len(leaderboard))})
+    return events
+
+def encoders():
+    from socketio import packet
+    from websocket.wire_format import encode_compact
+
+    def frames(event, data):
+        """Messaggi websocket del pacchetto (testo Engine.IO '4' + eventuali allegati binari)"""
+        encoded = packet.Packet(packet.EVENT, data=[event, data]).encode()
+        if isinstance(encoded, list):
+            return [("4" + encoded[0]).encode()] + encoded[1:]
+        return [("4" + encoded).encode()]
+
+    formats = {
+        "json": lambda event, payload: frames(event, payload),
+        "compact": lambda event, payload: frames(*encode_compact(event, payload)),
+    }
+    try:
+        import msgpack
+    except ImportError:
+        print("msgpack non installato: formato msgpack escluso")
+    else:
+        def msgpack_frames(event, payload):
+            code, values = encode_compact(event, payload)
+            return frames(code, msgpack.packb(values, use_bin_type=True))
+        formats["msgpack"] = msgpack_frames
+    return formats
+
+def deflate_sizes(messages):
+    """Byte dopo permessage-deflate con context takeover (un compressore per connessione)"""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    total = 0
+    for message in messages:
+        # RFC 7692: flush sincrono e rimozione dei 4 byte finali 00 00 ff ff
+        total += len(compressor.compress(message) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return total
+
+def measure(events, encode, rounds):
+    messages = [m for event, payload in events for m in encode(event, payload)]
+    raw = sum(len(m) for m in messages)
+    compressed = deflate_sizes(messages)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for event, payload in events:
+            encode(event, payload)
+    encode_us = (time.perf_counter() - started) / (rounds * len(events)) * 1e6
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        deflate_sizes(messages)
+    deflate_us = (time.perf_counter() - started) / (rounds * len(events)) * 1e6
+
+    count = len(events)
+    return {
+        "events": count,
+        "websocket_messages": len(messages),
+        "bytes": raw,
+        "bytes_per_event": round(raw / count, 1),
+        "deflate_bytes": compressed,
+        "deflate_bytes_per_event": round(compressed / count, 1),
+        "encode_us_per_event": round(encode_us, 2),
+        "deflate_us_per_event": round(deflate_us, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=200, help="messaggi di chat nella room")
+    parser.add_argument("--rounds", type=int, default=5, help="ripetizioni per la misura della CPU")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=default_output("wire_format"))
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    try:
+        events = build_events(args.players, args.questions, args.messages, args.seed)
+        scenarios = {}
+        print(f"{len(events)} eventi ricevuti da un client in una room da {args.players} giocatori")
+        print(f"{'formato':10} {'byte/evento':>12} {'deflate':>9} {'totale KB':>10} {'deflate KB':>11} "
+              f"{'codifica µs':>12} {'deflate µs':>11}")
+        for name, encode in encoders().items():
+            stats = measure(events, encode, args.rounds)
+            scenarios[name] = stats
+            print(f"{name:10} {stats['bytes_per_event']:>12} {stats['deflate_bytes_per_event']:>9} "
+                  f"{stats['bytes'] / 1024:>10.1f} {stats['deflate_bytes'] / 1024:>11.1f} "
+                  f"{stats['encode_us_per_event']:>12} {stats['deflate_us_per_event']:>11}")
+
+        save_results(args.output, "wire_format", {
+            "players": args.players, "questions": args.questions, "messages": args.messages
+        }, scenarios)
+        print(f"Risultati in {args.output}")
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+if __name__ == '__main__':
+    main()
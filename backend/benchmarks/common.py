@@ -0,0 +1,95 @@
+"""Funzioni condivise dai benchmark: database temporaneo, percentili, RSS e salvataggio risultati."""
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+def default_output(name):
+    return os.path.join(RESULTS_DIR, f"{name}.json")
+
+def use_temp_database():
+    """
+    Punta l'app su un file SQLite temporaneo. Va chiamata PRIMA di importare
+    database/app; ritorna il percorso del file.
+    """
+    fd, path = tempfile.mkstemp(prefix="quiz_bench_", suffix=".db")
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    # Il carico arriva tutto da un solo client: niente 429 durante le misure
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return path
+
+def percentile(sorted_samples, p):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(p / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+def summarize(samples, elapsed):
+    """Latenze in millisecondi e throughput di uno scenario"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "seconds": round(elapsed, 4),
+        "throughput": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0
+    }
+
+def peak_rss_mb():
+    # ru_maxrss è in KB su Linux e in byte su macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(rss / divisor, 1)
+
+def save_results(path, name, params, scenarios):
+    data = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": params,
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": scenarios
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    return data
+
+def compare_results(previous_path, current, threshold=0.2):
+    """Stampa le differenze di p95 e throughput rispetto a un'esecuzione precedente"""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    regressions = []
+    for name, stats in current["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        for metric, worse_if_higher in (("p95_ms", True), ("throughput", False)):
+            if metric not in stats or not old.get(metric):
+                continue
+            change = (stats[metric] - old[metric]) / old[metric]
+            regressed = change > threshold if worse_if_higher else change < -threshold
+            flag = "  <-- REGRESSIONE" if regressed else ""
+            print(f"{name:28} {metric:11} {old[metric]:>10} -> {stats[metric]:>10} ({change:+.0%}){flag}")
+            if regressed:
+                regressions.append((name, metric))
+    return regressions
+
+def print_table(scenarios):
+    print(f"{'scenario':28} {'count':>7} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in scenarios.items():
+        if "p50_ms" not in stats:
+            continue
+        print(f"{name:28} {stats['count']:>7} {stats['throughput']:>10} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
@@ -0,0 +1,180 @@
+"""
+Benchmark di carico delle API REST e degli eventi Socket.IO.
+
+Usa un database SQLite temporaneo, lo popola con dati sintetici e misura
+latenza (p50/p95/p99), throughput e RSS massimo per ogni scenario.
+I risultati vengono salvati in JSON per confrontare esecuzioni diverse.
+
+    python benchmarks/load_test.py --users 1000 --quizzes 2000 --questions 10
+    python benchmarks/load_test.py --output nuovo.json --compare vecchio.json
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import use_temp_database, summarize, save_results, compare_results, print_table, default_output
+
+def seed(db, users, quizzes, questions):
+    """Inserisce i dati sintetici con insert multipli; ritorna gli id creati"""
+    from sqlalchemy import insert
+    from models import User, Quiz, Domanda, Opzione
+
+    db.session.execute(insert(User), [
+        {"id": i, "username": f"user{i}", "password": "password"} for i in range(1, users + 1)
+    ])
+    start = datetime.utcnow() - timedelta(days=365)
+    db.session.execute(insert(Quiz), [{
+        "id": i,
+        "nome": f"Quiz {i}",
+        "data": start + timedelta(minutes=i),
+        "user_id": random.randint(1, users)
+    } for i in range(1, quizzes + 1)])
+    # Id espliciti per le domande: servono alle righe di Opzione dello stesso blocco
+    questions_batch = []
+    options_batch = []
+    question_id = 0
+    for quiz_id in range(1, quizzes + 1):
+        for n in range(questions):
+            question_id += 1
+            questions_batch.append({
+                "id": question_id,
+                "testo": f"Domanda {n} del quiz {quiz_id}",
+                "indice_corretto": 0,
+                "quiz_id": quiz_id
+            })
+            options_batch.extend({"domanda_id": question_id, "posizione": i, "testo": option}
+                                 for i, option in enumerate("ABCD"))
+            if len(questions_batch) >= 5000:
+                db.session.execute(insert(Domanda), questions_batch)
+                db.session.execute(insert(Opzione), options_batch)
+                questions_batch = []
+                options_batch = []
+    if questions_batch:
+        db.session.execute(insert(Domanda), questions_batch)
+        db.session.execute(insert(Opzione), options_batch)
+    db.session.commit()
+
+def run_http(app, requests, concurrency, make_request):
+    """Esegue `requests` chiamate con `concurrency` thread; make_request(client, i) -> status"""
+    samples = []
+    errors = 0
+
+    def call(i):
+        client = app.test_client()
+        t0 = time.perf_counter()
+        status = make_request(client, i)
+        return time.perf_counter() - t0, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for duration, status in pool.map(call, range(requests)):
+            samples.append(duration)
+            if status >= 400:
+                errors += 1
+    stats = summarize(samples, time.perf_counter() - start)
+    stats["errors"] = errors
+    return stats
+
+def rest_scenarios(app, args):
+    users, quizzes = args.users, args.quizzes
+    pick_user = lambda: random.randint(1, users)
+    pick_quiz = lambda: random.randint(1, quizzes)
+    question = {"text": "Domanda", "options": ["A", "B", "C", "D"], "correctAnswer": 0}
+
+    scenarios = {
+        "GET /api/quiz/<id>": lambda c, i: c.get(f"/api/quiz/{pick_quiz()}").status_code,
+        "GET /api/user/<id>/quizzes": lambda c, i: c.get(f"/api/user/{pick_user()}/quizzes").status_code,
+        "GET /api/quizzez": lambda c, i: c.get("/api/quizzez").status_code,
+        "POST /api/auth": lambda c, i: c.post("/api/auth", json={
+            "username": f"user{pick_user()}", "password": "password"}).status_code,
+        "POST /api/quiz": lambda c, i: c.post("/api/quiz", json={
+            "title": f"Bench {i}", "userId": pick_user(),
+            "questions": [question] * args.questions}).status_code,
+        "GET /api/quiz/create/<id>": lambda c, i: c.get(f"/api/quiz/create/{pick_quiz()}").status_code,
+    }
+    results = {}
+    for name, make_request in scenarios.items():
+        results[name] = run_http(app, args.requests, args.concurrency, make_request)
+    return results
+
+def socket_scenarios(app, socketio, args):
+    results = {}
+    code = app.test_client().get(f"/api/quiz/create/{random.randint(1, args.quizzes)}").get_json()["lobby_code"]
+    clients = [socketio.test_client(app) for _ in range(args.players)]
+
+    # Tutti i giocatori entrano nella stessa lobby (link condiviso dal docente)
+    samples = []
+    start = time.perf_counter()
+    for i, client in enumerate(clients):
+        t0 = time.perf_counter()
+        client.emit("join_room", {"room_id": code, "username": f"user{i + 1}", "user_id": i + 1})
+        samples.append(time.perf_counter() - t0)
+    results["socket join_room storm"] = summarize(samples, time.perf_counter() - start)
+    time.sleep(0.2)  # lascia partire i broadcast raggruppati
+    results["socket join_room storm"]["events_received"] = sum(len(c.get_received()) for c in clients)
+
+    # Tutti rispondono alla prima domanda nello stesso istante
+    clients[0].emit("start_quiz", {"quiz_id": code})
+    time.sleep(0.2)
+    question = next((e["args"][0] for e in clients[0].get_received() if e["name"] == "question"), None)
+    if question is not None:
+        samples = []
+        start = time.perf_counter()
+        for client in clients:
+            t0 = time.perf_counter()
+            client.emit("submit_answer", {"quiz_id": code, "answer": 0, "question_id": question["question_id"]})
+            samples.append(time.perf_counter() - t0)
+        results["socket submit_answer burst"] = summarize(samples, time.perf_counter() - start)
+
+    for client in clients:
+        client.disconnect()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--quizzes", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10, help="domande per quiz")
+    parser.add_argument("--requests", type=int, default=500, help="richieste per scenario REST")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--players", type=int, default=200, help="client Socket.IO simulati")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=default_output("load_test"))
+    parser.add_argument("--compare", help="file JSON di un'esecuzione precedente")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    db_path = use_temp_database()
+    try:
+        from app import create_app
+        from database import db
+        from migrations import upgrade_db
+        app, socketio = create_app()
+
+        upgrade_db()
+        with app.app_context():
+            t0 = time.perf_counter()
+            seed(db, args.users, args.quizzes, args.questions)
+            print(f"Seed completato in {time.perf_counter() - t0:.1f}s ({db_path})")
+
+        scenarios = rest_scenarios(app, args)
+        scenarios.update(socket_scenarios(app, socketio, args))
+    finally:
+        os.remove(db_path)
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    data = save_results(args.output, "load_test", params, scenarios)
+    print_table(scenarios)
+    print(f"RSS massimo: {data['peak_rss_mb']} MB - risultati in {args.output}")
+
+    if args.compare:
+        regressions = compare_results(args.compare, data)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,12 @@
-from database import app, db
+from migrations import upgrade_db
 
 # Import models
 from models import User, Quiz, Domanda, Risposta
 
 def create_database():
-    with app.app_context():
-        db.create_all()
-        print("✅ Database creato!")
+    # Crea le tabelle mancanti e porta quelle esistenti all'ultima versione dello schema
+    upgrade_db()
+    print("✅ Database creato!")
 
 if __name__ == '__main__':
     create_database()
\ No newline at end of file
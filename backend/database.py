@@ -1,18 +1,133 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from contextlib import contextmanager
 from datetime import datetime
+from db_profile import load_sqlite_profile, engine_options, register_sqlite_pragmas
+import os
+import secrets
+import threading
 
-# Configurazione Flask e Database
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz_game.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'your-secret-key-here'
+# Estensione senza app: i models la usano subito, mentre l'app Flask e l'engine
+# vengono creati da create_flask_app() al primo uso (`from database import app`).
+# Chi importa solo db e models (script, migrazioni) non apre nulla finché non serve.
+db = SQLAlchemy()
 
-# Inizializzazione SQLAlchemy
-db = SQLAlchemy(app)
+_app = None
+_app_lock = threading.RLock()
+sqlite_profile = None
 
-# IMPORTANTE: Importa i models DOPO aver definito db
-from models import *
+def create_flask_app():
+    """App Flask configurata con il database; una sola per processo"""
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = _build_flask_app()
+        return _app
+
+def _build_flask_app():
+    global sqlite_profile
+    from flask import Flask
+
+    # Configurazione Flask e Database
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///quiz_game.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Firma i token di sessione e di resume: mai una chiave fissa nel codice
+    app.config['SECRET_KEY'] = load_secret_key(app.instance_path)
+
+    # Stato delle lobby: "memory" (un solo processo) o "redis" (più worker condivisi).
+    # Con "redis" lo stesso server fa anche da message queue di SocketIO.
+    app.config['LOBBY_BACKEND'] = os.environ.get('LOBBY_BACKEND', 'memory')
+    app.config['REDIS_URL'] = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+    # Numero di proxy fidati davanti al server (X-Forwarded-For/Proto): 0 = nessuno
+    app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+    # Compressione del trasporto Socket.IO: permessage-deflate sui websocket (con uvicorn;
+    # simple-websocket, usato da app.py, la accetta sempre se il client la propone)
+    # e gzip/deflate delle risposte long-polling oltre la soglia in byte
+    app.config['WS_PER_MESSAGE_DEFLATE'] = os.environ.get('WS_PER_MESSAGE_DEFLATE', '1') != '0'
+    app.config['SOCKETIO_COMPRESSION_THRESHOLD'] = int(os.environ.get('SOCKETIO_COMPRESSION_THRESHOLD', 1024))
+
+    # Profilo SQLite (WAL, timeout, cache, pool) configurabile da variabili d'ambiente
+    sqlite_profile = load_sqlite_profile()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(sqlite_profile, app.config['SQLALCHEMY_DATABASE_URI'])
+
+    # init_app crea l'engine; le PRAGMA sono un listener 'connect' registrato subito,
+    # prima che l'engine apra la prima connessione
+    db.init_app(app)
+    with app.app_context():
+        register_sqlite_pragmas(db.engine, sqlite_profile)
+    return app
+
+def load_secret_key(instance_path):
+    """
+    SECRET_KEY dall'ambiente. Se manca, una chiave casuale generata al primo avvio
+    e salvata in SECRET_KEY_FILE (default instance/secret_key): i worker sullo stesso
+    host la condividono e resta valida ai riavvii. Con server su più host SECRET_KEY
+    va impostata, uguale per tutti.
+    """
+    key = os.environ.get('SECRET_KEY')
+    if key:
+        return key
+    path = os.environ.get('SECRET_KEY_FILE') or os.path.join(instance_path, 'secret_key')
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Scritta su un file temporaneo e pubblicata con link: se due worker partono
+        # insieme, il primo vince e l'altro legge la sua chiave, mai un file a metà
+        temp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(temp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp)
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"SECRET_KEY non impostata e {path} è vuoto")
+    return key
+
+def __getattr__(name):
+    if name == 'app':
+        return create_flask_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_read_engine = None
+_read_engine_lock = threading.Lock()
+
+def get_read_engine():
+    """
+    Engine in sola lettura sullo stesso file SQLite (mode=ro, query_only):
+    con WAL le letture non aspettano le scritture in corso.
+    Per database non SQLite o in memoria ritorna l'engine principale.
+    """
+    global _read_engine
+    with _read_engine_lock:
+        if _read_engine is None:
+            app = create_flask_app()
+            with app.app_context():
+                url = db.engine.url
+                if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+                    _read_engine = db.engine
+                else:
+                    read_url = url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"})
+                    _read_engine = create_engine(read_url, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+                    register_sqlite_pragmas(_read_engine, sqlite_profile, read_only=True)
+        return _read_engine
+
+@contextmanager
+def read_session():
+    """Sessione per le sole letture delle route GET"""
+    session = Session(bind=get_read_engine())
+    try:
+        yield session
+    finally:
+        session.close()
 
 # Funzioni di utilità per il database
 def init_db():
@@ -20,8 +135,12 @@ def init_db():
     # Import qui per evitare errori circolari
     from models import User, Quiz, Domanda, Risposta
     
+    from migrations import stamp_db
+
+    app = create_flask_app()
     with app.app_context():
         db.create_all()
+        stamp_db()
         print("✅ Database creato con successo!")
         print(f"📁 File database: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
@@ -29,24 +148,32 @@ def drop_db():
     """Elimina tutte le tabelle dal database"""
     from models import User, Quiz, Domanda, Risposta
     
-    with app.app_context():
+    with create_flask_app().app_context():
         db.drop_all()
         print("🗑️ Database eliminato!")
 
+def upgrade_db():
+    """Aggiorna lo schema di un database esistente senza perdere dati"""
+    from migrations import upgrade_db as run_migrations
+    run_migrations()
+
 def reset_db():
     """Resetta il database (drop + create)"""
     from models import User, Quiz, Domanda, Risposta
     
-    with app.app_context():
+    from migrations import stamp_db
+
+    with create_flask_app().app_context():
         db.drop_all()
         db.create_all()
+        stamp_db()
         print("🔄 Database resettato con successo!")
 
 if __name__ == '__main__':
     print("🛠️ Setup Database Quiz Game")
     print("=" * 30)
     
-    choice = input("Cosa vuoi fare?\n1. Crea database\n2. Resetta database\n3. Elimina database\nScelta (1-3): ")
+    choice = input("Cosa vuoi fare?\n1. Crea database\n2. Resetta database\n3. Elimina database\n4. Aggiorna database (migrazioni)\nScelta (1-4): ")
     
     if choice == '1':
         init_db()
@@ -54,6 +181,8 @@ if __name__ == '__main__':
         reset_db()
     elif choice == '3':
         drop_db()
+    elif choice == '4':
+        upgrade_db()
     else:
         print("❌ Scelta non valida!")
     
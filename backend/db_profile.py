@@ -0,0 +1,58 @@
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+import os
+import sqlite3
+
+# Profilo SQLite letto dalle variabili d'ambiente. I default sono pensati per
+# la produzione: WAL permette letture concorrenti mentre è in corso una scrittura.
+
+def _env(name, default, cast=str):
+    value = os.environ.get(name)
+    return cast(value) if value not in (None, "") else default
+
+def load_sqlite_profile():
+    return {
+        "journal_mode": _env("SQLITE_JOURNAL_MODE", "WAL").upper(),
+        "synchronous": _env("SQLITE_SYNCHRONOUS", "NORMAL").upper(),
+        "busy_timeout_ms": _env("SQLITE_BUSY_TIMEOUT_MS", 5000, int),
+        "mmap_size": _env("SQLITE_MMAP_SIZE", 256 * 1024 * 1024, int),
+        "cache_size": _env("SQLITE_CACHE_SIZE", -64000, int),  # negativo = KiB
+        "pool_size": _env("DB_POOL_SIZE", 10, int),
+        "max_overflow": _env("DB_MAX_OVERFLOW", 20, int),
+        "pool_timeout": _env("DB_POOL_TIMEOUT", 30, int),
+    }
+
+def engine_options(profile, uri):
+    """Opzioni per SQLALCHEMY_ENGINE_OPTIONS; le PRAGMA sono applicate da register_sqlite_pragmas"""
+    if not uri.startswith("sqlite") or ":memory:" in uri or uri in ("sqlite://", "sqlite:///"):
+        return {}
+    return {
+        "poolclass": QueuePool,
+        "pool_size": profile["pool_size"],
+        "max_overflow": profile["max_overflow"],
+        "pool_timeout": profile["pool_timeout"],
+        "pool_pre_ping": False,
+        "connect_args": {
+            "check_same_thread": False,
+            "timeout": profile["busy_timeout_ms"] / 1000,
+        },
+    }
+
+def register_sqlite_pragmas(engine, profile, read_only=False):
+    """Imposta le PRAGMA su ogni nuova connessione SQLite dell'engine"""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # journal_mode è persistente nel file: la connessione in sola lettura non può cambiarlo
+            cursor.execute(f"PRAGMA journal_mode={profile['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={profile['synchronous']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(profile['busy_timeout_ms'])}")
+        cursor.execute(f"PRAGMA mmap_size={int(profile['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size={int(profile['cache_size'])}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
@@ -0,0 +1,25 @@
+import argparse
+import json
+from database import create_flask_app
+from services.import_service import import_quizzes, get_record_reader, DEFAULT_CHUNK_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa quiz da un file NDJSON o CSV")
+    parser.add_argument("file", help="Percorso del file da importare")
+    parser.add_argument("--format", choices=["ndjson", "csv"],
+                        help="Formato del file (default: dedotto dall'estensione)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Numero di quiz per transazione")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "ndjson")
+    reader = get_record_reader(fmt)
+
+    with create_flask_app().app_context():
+        with open(args.file, newline="", encoding="utf-8") as stream:
+            report = import_quizzes(reader(stream), chunk_size=args.chunk_size)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+from sqlalchemy import text
+from database import db, create_flask_app
+from models import SEARCH_INDEX_DDL
+
+# Migrazioni dello schema applicate in-place su un database esistente.
+# La versione corrente è salvata in PRAGMA user_version di SQLite:
+# ogni migrazione viene eseguita una sola volta, in ordine, dentro una transazione.
+
+def _find_duplicate_usernames(conn):
+    rows = conn.execute(text(
+        "SELECT username, COUNT(*) FROM user GROUP BY username HAVING COUNT(*) > 1"
+    )).fetchall()
+    return [row[0] for row in rows]
+
+def migration_001_indexes(conn):
+    """Indici sulle chiavi esterne, sulla paginazione dei quiz e indice univoco su username"""
+    duplicates = _find_duplicate_usernames(conn)
+    if duplicates:
+        raise RuntimeError(
+            f"Impossibile creare l'indice univoco su username, duplicati: {', '.join(duplicates)}"
+        )
+
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_user_username ON user (username)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quiz_user_id ON quiz (user_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quiz_data_id ON quiz (data, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quiz_user_id_data_id ON quiz (user_id, data, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_domanda_quiz_id ON domanda (quiz_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_risposta_quiz_id ON risposta (quiz_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_risposta_user_id ON risposta (user_id)"))
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+def migration_002_risposta_scoring(conn):
+    """Domanda, correttezza e punti di ogni risposta registrata dal motore di gioco"""
+    columns = _column_names(conn, "risposta")
+    if "domanda_id" not in columns:
+        conn.execute(text("ALTER TABLE risposta ADD COLUMN domanda_id INTEGER REFERENCES domanda (id)"))
+    if "corretta" not in columns:
+        conn.execute(text("ALTER TABLE risposta ADD COLUMN corretta BOOLEAN"))
+    if "punti" not in columns:
+        conn.execute(text("ALTER TABLE risposta ADD COLUMN punti INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_risposta_domanda_id ON risposta (domanda_id)"))
+
+LEGACY_OPTION_COLUMNS = ("risposta_1", "risposta_2", "risposta_3", "risposta_4")
+MIGRATION_BATCH_SIZE = 1000
+
+def migration_003_option_table(conn):
+    """Opzioni delle domande nella tabella opzione e risposta corretta come indice"""
+    columns = _column_names(conn, "domanda")
+    if "risposta_1" not in columns:
+        return  # database creato con lo schema nuovo
+
+    # Import qui: i servizi servono solo ai database da migrare, non a ogni avvio
+    from services.quiz_service import resolve_correct_index
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS opzione ("
+        "domanda_id INTEGER NOT NULL REFERENCES domanda (id), "
+        "posizione INTEGER NOT NULL, "
+        "testo VARCHAR(200) NOT NULL, "
+        "PRIMARY KEY (domanda_id, posizione)) WITHOUT ROWID"
+    ))
+    if "indice_corretto" not in columns:
+        conn.execute(text("ALTER TABLE domanda ADD COLUMN indice_corretto INTEGER"))
+
+    # A blocchi per id: le opzioni nulle vengono compattate, la risposta diventa la posizione
+    last_id = 0
+    unresolved = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, risposta_1, risposta_2, risposta_3, risposta_4, risposta_corretta "
+            "FROM domanda WHERE id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": MIGRATION_BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        option_rows = []
+        index_rows = []
+        for row in rows:
+            options = [o for o in row[1:5] if o is not None]
+            option_rows.extend({"domanda_id": row[0], "posizione": i, "testo": o} for i, o in enumerate(options))
+            index = resolve_correct_index(row[5], options)
+            if index is None:
+                unresolved += 1
+            index_rows.append({"id": row[0], "indice": index})
+        if option_rows:
+            conn.execute(text(
+                "INSERT OR IGNORE INTO opzione (domanda_id, posizione, testo) VALUES (:domanda_id, :posizione, :testo)"
+            ), option_rows)
+        conn.execute(text("UPDATE domanda SET indice_corretto = :indice WHERE id = :id"), index_rows)
+        last_id = rows[-1][0]
+
+    for column in LEGACY_OPTION_COLUMNS + ("risposta_corretta",):
+        conn.execute(text(f"ALTER TABLE domanda DROP COLUMN {column}"))
+    if unresolved:
+        print(f"⚠️ {unresolved} domande senza una risposta corretta riconoscibile (indice_corretto NULL)")
+
+def migration_004_stats_backfill(conn):
+    """Statistiche materializzate di quiz, domande e utenti calcolate dalle risposte esistenti"""
+    # Le tabelle sono create da create_all prima delle migrazioni
+    from services.stats_service import rebuild_stats
+    rebuild_stats(conn)
+
+def migration_005_search_index(conn):
+    """Indice full-text FTS5 su nomi dei quiz e testi delle domande"""
+    for statement in SEARCH_INDEX_DDL:
+        conn.execute(text(statement))
+    # Indicizza le righe esistenti leggendole dalle tabelle di contenuto
+    conn.execute(text("INSERT INTO quiz_fts (quiz_fts) VALUES ('rebuild')"))
+    conn.execute(text("INSERT INTO domanda_fts (domanda_fts) VALUES ('rebuild')"))
+
+# Lista ordinata (versione, migrazione): aggiungere sempre in fondo
+MIGRATIONS = [
+    (1, migration_001_indexes),
+    (2, migration_002_risposta_scoring),
+    (3, migration_003_option_table),
+    (4, migration_004_stats_backfill),
+    (5, migration_005_search_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+def set_schema_version(conn, version):
+    # PRAGMA non accetta parametri bind
+    conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+def upgrade_db():
+    """Applica in-place le migrazioni mancanti senza perdere dati"""
+    with create_flask_app().app_context():
+        db.create_all()  # crea solo le tabelle nuove, non tocca quelle esistenti
+        applied = []
+        for version, migration in MIGRATIONS:
+            with db.engine.begin() as conn:
+                if get_schema_version(conn) >= version:
+                    continue
+                migration(conn)
+                set_schema_version(conn, version)
+            applied.append(version)
+            print(f"⬆️ Migrazione {version} applicata: {migration.__doc__}")
+
+        if not applied:
+            print("✅ Database già aggiornato")
+        return applied
+
+def stamp_db():
+    """Segna un database appena creato con create_all come aggiornato all'ultima versione"""
+    with create_flask_app().app_context():
+        with db.engine.begin() as conn:
+            set_schema_version(conn, LATEST_VERSION)
+
+if __name__ == '__main__':
+    upgrade_db()
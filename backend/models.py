@@ -1,28 +1,122 @@
 from database import db
+from sqlalchemy import event
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), nullable=False)
+    username = db.Column(db.String(80), nullable=False, unique=True, index=True)
     password = db.Column(db.String(120), nullable=False)
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(200), nullable=False)
     data = db.Column(db.DateTime, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+
+    # Indici per la paginazione keyset (globale e per utente)
+    __table_args__ = (
+        db.Index('ix_quiz_data_id', 'data', 'id'),
+        db.Index('ix_quiz_user_id_data_id', 'user_id', 'data', 'id'),
+    )
 
 class Domanda(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     testo = db.Column(db.String(500), nullable=False)
-    risposta_1 = db.Column(db.String(200), nullable=False)
-    risposta_2 = db.Column(db.String(200), nullable=False)
-    risposta_3 = db.Column(db.String(200), nullable=True)
-    risposta_4 = db.Column(db.String(200), nullable=True)
-    risposta_corretta = db.Column(db.String(200), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    # Posizione (0-based) dell'opzione corretta in Opzione; None solo per righe migrate non risolvibili
+    indice_corretto = db.Column(db.Integer, nullable=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+
+class Opzione(db.Model):
+    # Opzioni di una domanda in ordine di posizione; chiave (domanda_id, posizione) senza rowid
+    domanda_id = db.Column(db.Integer, db.ForeignKey('domanda.id'), primary_key=True)
+    posizione = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    testo = db.Column(db.String(200), nullable=False)
+
+    __table_args__ = {'sqlite_with_rowid': False}
 
 class Risposta(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     risposta_data = db.Column(db.String(200), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
\ No newline at end of file
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    domanda_id = db.Column(db.Integer, db.ForeignKey('domanda.id'), nullable=True, index=True)
+    corretta = db.Column(db.Boolean, nullable=True)
+    punti = db.Column(db.Integer, nullable=False, default=0)
+# Aggregati di Risposta aggiornati a ogni flush delle risposte (vedi stats_service)
+class StatisticheQuiz(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True, autoincrement=False)
+    risposte = db.Column(db.Integer, nullable=False, default=0)
+    corrette = db.Column(db.Integer, nullable=False, default=0)
+    punti = db.Column(db.Integer, nullable=False, default=0)
+    giocatori = db.Column(db.Integer, nullable=False, default=0)
+
+class StatisticheDomanda(db.Model):
+    domanda_id = db.Column(db.Integer, db.ForeignKey('domanda.id'), primary_key=True, autoincrement=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+    risposte = db.Column(db.Integer, nullable=False, default=0)
+    corrette = db.Column(db.Integer, nullable=False, default=0)
+    punti = db.Column(db.Integer, nullable=False, default=0)
+
+class StatisticheUtente(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    risposte = db.Column(db.Integer, nullable=False, default=0)
+    corrette = db.Column(db.Integer, nullable=False, default=0)
+    punti = db.Column(db.Integer, nullable=False, default=0)
+
+    # Classifica generale: i primi N e la posizione di un utente si leggono dall'indice
+    __table_args__ = (
+        db.Index('ix_statistiche_utente_punti', 'punti', 'user_id'),
+    )
+
+class StatisticheQuizUtente(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    risposte = db.Column(db.Integer, nullable=False, default=0)
+    corrette = db.Column(db.Integer, nullable=False, default=0)
+    punti = db.Column(db.Integer, nullable=False, default=0)
+
+    # Classifica di un quiz
+    __table_args__ = (
+        db.Index('ix_statistiche_quiz_utente_quiz_punti', 'quiz_id', 'punti'),
+    )
+
+# Indice full-text (FTS5) su Quiz.nome e Domanda.testo. Tabelle a contenuto esterno
+# (il testo resta solo in quiz/domanda) mantenute allineate dai trigger su ogni
+# insert, update e delete, qualunque sia il percorso di scrittura.
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS quiz_fts USING fts5("
+    "nome, content='quiz', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS domanda_fts USING fts5("
+    "testo, content='domanda', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS quiz_fts_ai AFTER INSERT ON quiz BEGIN "
+    "INSERT INTO quiz_fts (rowid, nome) VALUES (new.id, new.nome); END",
+    "CREATE TRIGGER IF NOT EXISTS quiz_fts_ad AFTER DELETE ON quiz BEGIN "
+    "INSERT INTO quiz_fts (quiz_fts, rowid, nome) VALUES ('delete', old.id, old.nome); END",
+    "CREATE TRIGGER IF NOT EXISTS quiz_fts_au AFTER UPDATE OF nome ON quiz BEGIN "
+    "INSERT INTO quiz_fts (quiz_fts, rowid, nome) VALUES ('delete', old.id, old.nome); "
+    "INSERT INTO quiz_fts (rowid, nome) VALUES (new.id, new.nome); END",
+    "CREATE TRIGGER IF NOT EXISTS domanda_fts_ai AFTER INSERT ON domanda BEGIN "
+    "INSERT INTO domanda_fts (rowid, testo) VALUES (new.id, new.testo); END",
+    "CREATE TRIGGER IF NOT EXISTS domanda_fts_ad AFTER DELETE ON domanda BEGIN "
+    "INSERT INTO domanda_fts (domanda_fts, rowid, testo) VALUES ('delete', old.id, old.testo); END",
+    "CREATE TRIGGER IF NOT EXISTS domanda_fts_au AFTER UPDATE OF testo ON domanda BEGIN "
+    "INSERT INTO domanda_fts (domanda_fts, rowid, testo) VALUES ('delete', old.id, old.testo); "
+    "INSERT INTO domanda_fts (rowid, testo) VALUES (new.id, new.testo); END",
+]
+
+SEARCH_INDEX_DROP = [
+    "DROP TABLE IF EXISTS quiz_fts",
+    "DROP TABLE IF EXISTS domanda_fts",
+]
+
+@event.listens_for(db.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in SEARCH_INDEX_DDL:
+            connection.exec_driver_sql(statement)
+
+@event.listens_for(db.metadata, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    # I trigger vengono eliminati insieme alle tabelle quiz e domanda
+    if connection.dialect.name == "sqlite":
+        for statement in SEARCH_INDEX_DROP:
+            connection.exec_driver_sql(statement)
@@ -0,0 +1,18 @@
+import argparse
+import json
+from database import db, create_flask_app
+from services.stats_service import rebuild_stats
+
+def main():
+    argparse.ArgumentParser(
+        description="Ricalcola da Risposta le statistiche materializzate di quiz, domande e utenti"
+    ).parse_args()
+
+    with create_flask_app().app_context():
+        with db.engine.begin() as conn:
+            counts = rebuild_stats(conn)
+
+    print(json.dumps(counts, indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
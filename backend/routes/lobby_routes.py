@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from services.lobby_service import *
+from services.rate_limit_service import rate_limit
 
 lobby_bp = Blueprint('lobby', __name__)
 
@@ -8,5 +9,12 @@ def get_lobby_info(quiz_id):
     return "response"
 
 @lobby_bp.route("/api/quiz/create/<int:quiz_id>", methods=["GET"])
+@rate_limit("ip", rate=1, burst=5)
 def get_lobby_code(quiz_id):
-    return {'lobby_code':create_lobby(quiz_id)}
\ No newline at end of file
+    try:
+        code, message = create_lobby(quiz_id)
+        if code is None:
+            return jsonify({"error": message}), 404
+        return {'lobby_code': code}
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
\ No newline at end of file
@@ -0,0 +1,8 @@
+from flask import Blueprint, Response
+from services.metrics_service import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics_route():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from services.quiz_service import *
+from services.import_service import import_quizzes, get_record_reader, DEFAULT_CHUNK_SIZE
+from services.session_service import get_current_session
+from services.search_service import get_search_results
+from services.stream_service import stream_json_response, wants_stream
+from services.rate_limit_service import rate_limit
+import io
 
 quiz_bp = Blueprint('quizzes', __name__)
 
 @quiz_bp.route("/api/quiz", methods=["POST"])
+@rate_limit("user", rate=1, burst=5)
 def create_quiz_route():
     data = request.get_json()
-    print("Received data for quiz creation:", data)
     title = data.get("title") or data.get("nome")  # Support both field names
     questions = data.get("questions")
     userId = data.get("userId") or data.get("user_id")  # Support both field names
@@ -16,6 +22,11 @@ def create_quiz_route():
     
     if not userId:
         return jsonify({"error": "User ID is required"}), 400
+
+    for q in questions:
+        error = validate_question(q)
+        if error:
+            return jsonify({"error": error}), 400
     
     quiz, message = create_quiz(userId, title, questions)
     if quiz:
@@ -23,43 +34,79 @@ def create_quiz_route():
     else:
         return jsonify({"error": message}), 500
 
+@quiz_bp.route("/api/quiz/import", methods=["POST"])
+@rate_limit("user", rate=0.2, burst=2)
+def import_quizzes_route():
+    # Il corpo viene letto in streaming: formato da ?format= oppure dal Content-Type
+    fmt = request.args.get("format")
+    if not fmt:
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    try:
+        reader = get_record_reader(fmt)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    chunk_size = request.args.get("chunk_size", DEFAULT_CHUNK_SIZE, type=int)
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    report = import_quizzes(reader(stream), chunk_size=chunk_size)
+    status = 200 if report["imported_quizzes"] or not report["error_count"] else 400
+    return jsonify(report), status
+
 @quiz_bp.route("/api/quiz/<int:quiz_id>", methods=["GET"])
 def get_quiz_route(quiz_id):
-    quiz, questions, message = get_quiz_with_questions(quiz_id)
-    if quiz:
-        quiz_data = {
-            "id": quiz.id,
-            "nome": quiz.nome,
-            "data": quiz.data.isoformat(),
-            "user_id": quiz.user_id,
-            "questions": [{
-                "id": q.id,
-                "testo": q.testo,
-                "risposta_1": q.risposta_1,
-                "risposta_2": q.risposta_2,
-                "risposta_3": q.risposta_3,
-                "risposta_4": q.risposta_4,
-                "risposta_corretta": q.risposta_corretta,
-                "quiz_id": q.quiz_id
-            } for q in questions] if questions else []
-        }
-        return jsonify({"message": message, "quiz": quiz_data}), 200
+    # Risposte corrette solo per l'autore autenticato, gli altri ricevono la versione per i giocatori
+    session = get_current_session()
+    payload = get_quiz_payload(quiz_id, viewer_id=session["user_id"] if session else None)
+    if payload is not None:
+        return Response(payload, status=200, mimetype="application/json")
     else:
-        return jsonify({"error": message}), 404
+        return jsonify({"error": "Quiz non trovato"}), 404
+
+@quiz_bp.route("/api/quiz/cache/stats", methods=["GET"])
+def get_quiz_cache_stats_route():
+    return jsonify(quiz_payload_cache.stats()), 200
 
 @quiz_bp.route("/api/user/<int:user_id>/quizzes", methods=["GET"])
 def get_user_quizzes_route(user_id):
-    quizzes, message = get_quizzes_by_user(user_id)
-    print("Quizzes fetched for user", user_id, ":", quizzes)
+    # ?stream=1: tutti i quiz dell'utente in un'unica risposta in streaming, senza cursore
+    if wants_stream(request.args):
+        return stream_json_response("quizzes", iter_quizzes(user_id=user_id),
+                                    fields={"message": "Quizzes recuperati con successo"},
+                                    trailer=lambda count: {"next_cursor": None})
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    quizzes, next_cursor, message = get_quizzes_by_user(user_id, limit, cursor)
     if quizzes is not None:
-        return jsonify({"message": message, "quizzes": quizzes}), 200
+        return jsonify({"message": message, "quizzes": quizzes, "next_cursor": next_cursor}), 200
+    elif message == INVALID_CURSOR:
+        return jsonify({"error": message}), 400
     else:
         return jsonify({"error": message}), 500
 
 @quiz_bp.route("/api/quizzez", methods=["GET"])
 def get_all_quizzes_route():
-    try:
-        quizzes, message = get_all_quizzes()
-        return jsonify({"quizzes": quizzes}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    if wants_stream(request.args):
+        return stream_json_response("quizzes", iter_quizzes(), trailer=lambda count: {"next_cursor": None})
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    quizzes, next_cursor, message = get_all_quizzes(limit, cursor)
+    if quizzes is not None:
+        return jsonify({"quizzes": quizzes, "next_cursor": next_cursor}), 200
+    elif message == INVALID_CURSOR:
+        return jsonify({"error": message}), 400
+    else:
+        return jsonify({"error": message}), 500
+
+@quiz_bp.route("/api/quiz/search", methods=["GET"])
+@rate_limit("user", rate=10, burst=20)
+def search_quizzes_route():
+    # ?q=testo (prefissi, per il type-ahead) &limit &cursor
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    quizzes, next_cursor, message = get_search_results(request.args.get("q", ""), limit, cursor)
+    if quizzes is not None:
+        return jsonify({"message": message, "quizzes": quizzes, "next_cursor": next_cursor}), 200
+    elif message == INVALID_CURSOR:
+        return jsonify({"error": message}), 400
+    else:
+        return jsonify({"error": message}), 500
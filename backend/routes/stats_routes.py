@@ -0,0 +1,31 @@
+from flask import Blueprint, request, jsonify
+from services.stats_service import (get_quiz_stats, get_user_stats, get_leaderboard,
+                                    QUIZ_NOT_FOUND, USER_NOT_FOUND)
+
+stats_bp = Blueprint('stats', __name__)
+
+def _stats_response(stats, message, not_found):
+    if stats is not None:
+        return jsonify({"message": message, "stats": stats}), 200
+    elif message == not_found:
+        return jsonify({"error": message}), 404
+    else:
+        return jsonify({"error": message}), 500
+
+@stats_bp.route("/api/quiz/<int:quiz_id>/stats", methods=["GET"])
+def get_quiz_stats_route(quiz_id):
+    stats, message = get_quiz_stats(quiz_id, request.args.get("limit", type=int))
+    return _stats_response(stats, message, QUIZ_NOT_FOUND)
+
+@stats_bp.route("/api/user/<int:user_id>/stats", methods=["GET"])
+def get_user_stats_route(user_id):
+    stats, message = get_user_stats(user_id)
+    return _stats_response(stats, message, USER_NOT_FOUND)
+
+@stats_bp.route("/api/leaderboard", methods=["GET"])
+def get_leaderboard_route():
+    leaderboard, message = get_leaderboard(request.args.get("limit", type=int))
+    if leaderboard is not None:
+        return jsonify({"message": message, "leaderboard": leaderboard}), 200
+    else:
+        return jsonify({"error": message}), 500
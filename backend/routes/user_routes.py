@@ -1,9 +1,13 @@
 from flask import Blueprint, request, jsonify
 from services.user_service import *
+from services.session_service import get_session_tokens, get_request_token, get_current_session
+from services.stream_service import stream_json_response
+from services.rate_limit_service import rate_limit
 
 user_bp = Blueprint('users', __name__)
 
 @user_bp.route("/api/user", methods=["POST"])
+@rate_limit("ip", rate=1, burst=5)
 def create_user_route():
     data = request.get_json()
     username = data.get("username")
@@ -12,17 +16,23 @@ def create_user_route():
     if not username or not password:
         return jsonify({"error": "Username e password sono obbligatori"}), 400
     
-    user, message = create_user(username, password)
+    try:
+        user, message = create_user(username, password)
+    except PasswordPoolBusy as e:
+        return jsonify({"error": str(e)}), 503
     if user:
         return jsonify({"message": message, "user_id": user.id}), 201
+    else:
+        return jsonify({"error": message}), 400
 
 @user_bp.route("/api/users", methods=["GET"])
+@rate_limit("user", rate=1, burst=3)
 def get_all_users_route():
-    users, message = get_all_users()
-    users_data = [{"id": user.id, "username": user.username} for user in users]
-    return jsonify({"message": message, "users": users_data}), 200
+    # In streaming: il numero di utenti è noto solo alla fine, il messaggio va in coda
+    return stream_json_response("users", iter_users(), trailer=lambda count: {"message": f"Trovati {count} utenti"})
 
 @user_bp.route("/api/auth", methods=["POST"])
+@rate_limit("ip", rate=2, burst=10)
 def login_route():
     data = request.get_json()
     username = data.get("username")
@@ -31,12 +41,33 @@ def login_route():
     if not username or not password:
         return jsonify({"error": "Username e password sono obbligatori"}), 400
     
-    user, message = authenticate_user(username, password)
+    try:
+        user, message = authenticate_user(username, password)
+    except PasswordPoolBusy as e:
+        return jsonify({"error": str(e)}), 503
     if user:
-        return jsonify({"message": message, "user_id": user.id}), 200
+        token = get_session_tokens().issue(user.id, user.username)
+        return jsonify({"message": message, "user_id": user.id, "token": token}), 200
     else:
         return jsonify({"error": message}), 401
 
+@user_bp.route("/api/auth/me", methods=["GET"])
+def current_user_route():
+    # Verifica solo il token (cache in memoria), nessun accesso al database
+    session = get_current_session()
+    if session is None:
+        return jsonify({"error": "Token non valido o scaduto"}), 401
+    return jsonify({"user": {"id": session["user_id"], "username": session["username"]}}), 200
+
+@user_bp.route("/api/auth/logout", methods=["POST"])
+def logout_route():
+    get_session_tokens().revoke(get_request_token())
+    return jsonify({"message": "Logout effettuato"}), 200
+
+@user_bp.route("/api/auth/stats", methods=["GET"])
+def auth_stats_route():
+    return jsonify({"password_pool": password_hasher.stats(), "sessions": get_session_tokens().stats()}), 200
+
 @user_bp.route("/api/user/<int:user_id>", methods=["GET"])
 def get_user_route(user_id):
     user, message = get_user_by_id(user_id)
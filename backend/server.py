@@ -0,0 +1,45 @@
+"""
+Avvia il backend in una delle due modalità:
+- wsgi: Flask-SocketIO (app.py), il comportamento storico
+- asgi: socketio.AsyncServer + uvicorn (asgi_app.py)
+
+    python server.py --mode asgi --port 5000
+
+La modalità predefinita si può impostare con SERVER_MODE.
+"""
+import argparse
+import os
+
+MODES = ("wsgi", "asgi")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=MODES, default=os.environ.get("SERVER_MODE", "wsgi"))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    from migrations import upgrade_db
+    upgrade_db()
+
+    print(f"Quiz Game API Server Starting ({args.mode})...")
+    print("=" * 40)
+    print(f"Server disponibile su: http://localhost:{args.port}")
+    print(f"API Base URL: http://localhost:{args.port}/api")
+    print("=" * 40)
+
+    if args.mode == "asgi":
+        import uvicorn
+        from asgi_app import create_asgi_app
+        from database import create_flask_app
+        app = create_flask_app()
+        uvicorn.run(create_asgi_app(), host=args.host, port=args.port, log_level="debug" if args.debug else "info",
+                    ws_per_message_deflate=app.config['WS_PER_MESSAGE_DEFLATE'])
+    else:
+        from app import create_app
+        app, socketio = create_app()
+        socketio.run(app, debug=args.debug, host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import threading
+import time
+
+class PayloadCache:
+    """
+    Cache LRU con TTL dei payload JSON già serializzati (bytes).
+    La chiave è (id, versione): invalidate() incrementa la versione, quindi le
+    voci vecchie non vengono più lette e vengono rimosse subito.
+    I miss concorrenti sulla stessa chiave aspettano un solo caricamento.
+    """
+
+    def __init__(self, max_size=512, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (key, version) -> (expires_at, payload)
+        self._versions = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _lookup(self, cache_key):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            del self._entries[cache_key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(cache_key)
+        return payload
+
+    def get_or_load(self, key, loader):
+        """Ritorna il payload in cache oppure lo calcola con loader(); None non viene salvato"""
+        with self._lock:
+            version = self._versions.get(key, 0)
+            cache_key = (key, version)
+            payload = self._lookup(cache_key)
+            if payload is not None:
+                self.hits += 1
+                return payload
+            load_lock = self._load_locks.setdefault(cache_key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # Un'altra richiesta potrebbe averlo appena caricato
+                payload = self._lookup(cache_key)
+                if payload is not None:
+                    self.hits += 1
+                    return payload
+                self.misses += 1
+
+            payload = loader()
+
+            with self._lock:
+                self._load_locks.pop(cache_key, None)
+                # Salva solo se nel frattempo non c'è stata un'invalidazione
+                if payload is not None and self._versions.get(key, 0) == version:
+                    self._entries[cache_key] = (time.monotonic() + self.ttl, payload)
+                    self._entries.move_to_end(cache_key)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            return payload
+
+    def invalidate(self, key):
+        with self._lock:
+            version = self._versions.get(key, 0)
+            self._versions[key] = version + 1
+            if self._entries.pop((key, version), None) is not None:
+                self.invalidations += 1
+
+    def version(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+# Payload completi di GET /api/quiz/<id>, invalidati da ogni scrittura sul quiz
+quiz_payload_cache = PayloadCache()
@@ -0,0 +1,41 @@
+import secrets
+
+# Alfabeto senza caratteri ambigui (0/O, 1/I): 32 simboli, 6 caratteri = ~1,07 miliardi di codici
+CODE_ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+CODE_LENGTH = 6
+MAX_ATTEMPTS = 16
+
+class CodeAllocator:
+    """
+    Genera codici lobby casuali e li riserva in modo atomico nello store
+    (store.create fallisce se il codice è già in uso), quindi due lobby vive
+    non possono mai avere lo stesso codice. Quando una lobby viene eliminata
+    o scade il suo codice torna disponibile.
+    """
+
+    def __init__(self, store, alphabet=CODE_ALPHABET, length=CODE_LENGTH):
+        self.store = store
+        self.alphabet = alphabet
+        self.length = length
+        self._space = len(alphabet) ** length
+        self.allocated = 0
+        self.retries = 0
+
+    def _random_code(self):
+        value = secrets.randbelow(self._space)
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(self.length):
+            value, index = divmod(value, base)
+            chars.append(self.alphabet[index])
+        return "".join(chars)
+
+    def allocate(self, quiz_id):
+        """Crea una lobby con un codice libero e ritorna il codice"""
+        for _ in range(MAX_ATTEMPTS):
+            code = self._random_code()
+            if self.store.create(code, quiz_id):
+                self.allocated += 1
+                return code
+            self.retries += 1
+        raise RuntimeError("Impossibile allocare un codice lobby libero")
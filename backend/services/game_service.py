@@ -0,0 +1,329 @@
+from database import create_flask_app, db
+from models import Risposta
+from services.stats_service import apply_answer_rows
+from services.lobby_store import player_id
+from services.snapshot_service import quiz_snapshots
+from services.metrics_service import metrics
+from sqlalchemy import insert
+from bisect import bisect_left, insort
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Motore di gioco lato server: il server decide quale domanda è aperta,
+# fino a quando, se una risposta è corretta e quanti punti vale.
+# Nota: la partita vive nel processo che l'ha avviata, quindi il motore è attivo solo
+# con LOBBY_BACKEND=memory. Domande e risposte corrette arrivano dalla copia del quiz
+# caricata alla creazione della lobby (snapshot_service): durante la partita si
+# scrive solo Risposta, a blocchi.
+
+QUESTION_TIME = 20        # secondi per domanda
+RESULTS_PAUSE = 3         # secondi tra la fine di una domanda e la successiva
+TICK = 0.1                # granularità del loop di gioco
+MAX_POINTS = 1000         # punti per una risposta corretta immediata
+FLUSH_INTERVAL = 0.5      # secondi tra due flush delle risposte su Risposta
+FLUSH_BATCH_SIZE = 500    # flush anticipato oltre questo numero di risposte
+MAX_PENDING_ANSWERS = 20000  # risposte trattenute al massimo se il database non risponde
+LEADERBOARD_SIZE = 10
+
+answers_dropped = metrics.counter(
+    "answer_buffer_dropped_total", "Risposte scartate perché il buffer era pieno (scritture fallite)", ())
+
+class AnswerBuffer:
+    """
+    Accumula le righe Risposta e le scrive con un unico executemany per flush.
+    Le scritture le fa solo il flusher in background: add() non tocca mai il database,
+    al massimo lo sveglia in anticipo quando il buffer raggiunge batch_size.
+    Se il database non risponde le righe restano in coda, fino a max_pending:
+    oltre, le più vecchie vengono scartate e contate in answer_buffer_dropped_total.
+    """
+
+    def __init__(self, batch_size=FLUSH_BATCH_SIZE, max_pending=MAX_PENDING_ANSWERS):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._full = threading.Event()
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def _trim(self):
+        # Chiamato con self._lock acquisito
+        excess = len(self._rows) - self.max_pending
+        if excess > 0:
+            del self._rows[:excess]
+            self.dropped += excess
+            answers_dropped.inc(amount=excess)
+
+    def add(self, row):
+        with self._lock:
+            self._rows.append(row)
+            self._trim()
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self._full.set()
+
+    def wait_full(self, timeout):
+        """Attende al massimo timeout secondi che il buffer raggiunga batch_size; True se l'ha raggiunta"""
+        if self._full.wait(timeout):
+            self._full.clear()
+            return True
+        return False
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            with create_flask_app().app_context():
+                try:
+                    db.session.execute(insert(Risposta), rows)
+                    # Statistiche aggiornate nella stessa transazione delle risposte
+                    apply_answer_rows(db.session, rows)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("Errore nel salvataggio delle risposte: %s", e)
+                    # Le righe tornano in coda per il prossimo flush, entro max_pending
+                    with self._lock:
+                        self._rows[:0] = rows
+                        self._trim()
+                    return 0
+            self.flushed += len(rows)
+            self.flushes += 1
+            return len(rows)
+
+class Leaderboard:
+    """
+    Classifica aggiornata in modo incrementale: lista ordinata di (-punti, ordine, chiave).
+    L'ordine di arrivo risolve i pari merito e rende confrontabili chiavi di tipo diverso.
+    """
+
+    def __init__(self):
+        self._scores = {}
+        self._names = {}
+        self._order = {}
+        self._ranking = []
+
+    def add(self, key, username, points):
+        old = self._scores.get(key)
+        if old is not None:
+            index = bisect_left(self._ranking, (-old, self._order[key]))
+            del self._ranking[index]
+        else:
+            self._order[key] = len(self._order)
+        score = (old or 0) + points
+        self._scores[key] = score
+        self._names[key] = username
+        insort(self._ranking, (-score, self._order[key], key))
+        return score
+
+    def score(self, key):
+        return self._scores.get(key, 0)
+
+    def top(self, n=LEADERBOARD_SIZE):
+        return [{
+            'rank': rank,
+            'user_id': key,
+            'username': self._names[key],
+            'score': -negative_score
+        } for rank, (negative_score, _, key) in enumerate(self._ranking[:n], start=1)]
+
+    def __len__(self):
+        return len(self._ranking)
+
+def _answer_index(answer, options):
+    """Indice dell'opzione scelta: i client inviano l'indice, il testo resta per compatibilità"""
+    if isinstance(answer, bool):
+        return None
+    if isinstance(answer, int):
+        return answer
+    if isinstance(answer, str) and answer.isdigit():
+        return int(answer)
+    if answer in options:
+        return options.index(answer)
+    return None
+
+class Game:
+    def __init__(self, code, snapshot, buffer):
+        self.code = code
+        self.quiz_id = snapshot.quiz_id
+        # Tupla condivisa e immutabile: nessuna copia per lobby
+        self.questions = snapshot.questions
+        self.buffer = buffer
+        self.leaderboard = Leaderboard()
+        self.current = -1
+        self.opened_at = None
+        self.deadline = None
+        self.answered = set()
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def open_question(self, index):
+        with self._lock:
+            self.current = index
+            self.opened_at = time.monotonic()
+            self.deadline = self.opened_at + QUESTION_TIME
+            self.answered = set()
+            question = self.questions[index]
+        return {
+            'quiz_id': self.code,
+            'index': index,
+            'total': len(self.questions),
+            'question_id': question.id,
+            'testo': question.testo,
+            'options': question.options,
+            'duration': QUESTION_TIME,
+            'ends_at': int((time.time() + QUESTION_TIME) * 1000)
+        }
+
+    def close_question(self):
+        with self._lock:
+            question = self.questions[self.current]
+            self.deadline = None
+        return {
+            'quiz_id': self.code,
+            'question_id': question.id,
+            'correct_index': question.correct_index,
+            'leaderboard': self.leaderboard.top()
+        }
+
+    def is_open(self):
+        with self._lock:
+            return self.deadline is not None and time.monotonic() < self.deadline
+
+    def answered_count(self):
+        with self._lock:
+            return len(self.answered)
+
+    def submit(self, player, question_id, answer):
+        """Valuta una risposta; ritorna (risultato, errore)"""
+        # Identificativo pubblico: resta lo stesso anche dopo un resume con un nuovo sid
+        key = player.get('id')
+        if key is None:
+            key = player_id(player['user_id'], player['sid'])
+        now = time.monotonic()
+        with self._lock:
+            if self.deadline is None or now >= self.deadline:
+                return None, "Tempo scaduto"
+            question = self.questions[self.current]
+            if question_id is not None and question_id != question.id:
+                return None, "Domanda non attiva"
+            if key in self.answered:
+                return None, "Risposta già inviata"
+            self.answered.add(key)
+
+            # Confronto tra interi; una domanda senza indice corretto non assegna punti
+            index = _answer_index(answer, question.options)
+            correct = index is not None and index == question.correct_index
+            points = 0
+            if correct:
+                # Da MAX_POINTS (subito) a MAX_POINTS / 2 (alla scadenza)
+                elapsed = now - self.opened_at
+                points = round(MAX_POINTS * (1 - elapsed / (2 * QUESTION_TIME)))
+            score = self.leaderboard.add(key, player['username'], points)
+
+        if player['user_id'] is not None:
+            # Solo in memoria: la scrittura la fa il flusher in background
+            self.buffer.add({
+                'risposta_data': str(answer),
+                'quiz_id': self.quiz_id,
+                'user_id': player['user_id'],
+                'domanda_id': question.id,
+                'corretta': correct,
+                'punti': points
+            })
+        return {'question_id': question.id, 'correct': correct, 'points': points, 'score': score}, None
+
+class GameEngine:
+    """Partite in corso per codice lobby e buffer condiviso delle risposte"""
+
+    def __init__(self):
+        self._games = {}
+        self._lock = threading.Lock()
+        self.buffer = AnswerBuffer()
+        self._flusher_started = False
+
+    def get(self, code):
+        with self._lock:
+            return self._games.get(code)
+
+    def available(self):
+        """
+        La partita vive nel processo che l'ha avviata: con LOBBY_BACKEND=redis le
+        risposte arrivate a un altro worker non verrebbero conteggiate, quindi il
+        motore resta spento e le lobby usano il flusso gestito dal client.
+        """
+        return create_flask_app().config['LOBBY_BACKEND'] == 'memory'
+
+    def start(self, socketio, code, quiz_id, player_count):
+        """Avvia la partita; ritorna (game, errore)"""
+        if not self.available():
+            return None, "Partite gestite dal server non disponibili con più worker"
+        if self.get(code) is not None:
+            return None, "Quiz già avviato"
+        # Già in memoria dalla creazione della lobby; la query resta solo per le lobby
+        # create da un altro worker (LOBBY_BACKEND=redis) o prima di un riavvio
+        snapshot = quiz_snapshots.for_lobby(code) or quiz_snapshots.attach(code, quiz_id)
+        if snapshot is None or not snapshot.questions:
+            return None, "Il quiz non ha domande"
+        with self._lock:
+            if code in self._games:
+                return None, "Quiz già avviato"
+            game = Game(code, snapshot, self.buffer)
+            self._games[code] = game
+        socketio.start_background_task(self._run, socketio, game, player_count)
+        return game, None
+
+    def _run(self, socketio, game, player_count):
+        try:
+            # Prima della prima domanda: chi azzera lo stato su quiz_started non la perde
+            socketio.emit('quiz_started', {'quiz_id': game.code, 'question_count': len(game.questions)},
+                          room=game.code)
+            for index in range(len(game.questions)):
+                socketio.emit('question', game.open_question(index), room=game.code)
+                # Chiude in anticipo quando hanno risposto tutti i giocatori
+                while game.is_open() and game.answered_count() < player_count():
+                    socketio.sleep(TICK)
+                socketio.emit('question_ended', game.close_question(), room=game.code)
+                socketio.sleep(RESULTS_PAUSE)
+
+            game.finished = True
+            self.buffer.flush()
+            socketio.emit('quiz_ended', {
+                'quiz_id': game.code,
+                'leaderboard': game.leaderboard.top(len(game.leaderboard))
+            }, room=game.code)
+        except Exception as e:
+            logger.error("Partita %s interrotta: %s", game.code, e)
+            game.finished = True
+        finally:
+            # Sempre: altrimenti ogni nuovo avvio risponderebbe "Quiz già avviato"
+            with self._lock:
+                self._games.pop(game.code, None)
+
+    def start_flusher(self, socketio, interval=FLUSH_INTERVAL):
+        if self._flusher_started:
+            return
+        self._flusher_started = True
+
+        def flush_loop():
+            # threading.Event: con eventlet/gevent serve il monkey patching, come per i lock
+            while True:
+                self.buffer.wait_full(interval)
+                if self.buffer.pending() and not self.buffer.flush():
+                    # Scrittura fallita: non riprovare subito a ogni nuova risposta
+                    socketio.sleep(interval)
+
+        socketio.start_background_task(flush_loop)
+
+game_engine = GameEngine()
@@ -0,0 +1,182 @@
+from database import db
+from services.quiz_service import validate_question, insert_quiz
+from services.cache_service import quiz_payload_cache
+import csv
+import json
+
+# Import massivo di quiz da NDJSON o CSV.
+# Le righe vengono lette e validate una alla volta e caricate a blocchi,
+# quindi la memoria usata dipende da chunk_size e non dalla dimensione del file.
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+
+# Colonne CSV: le righe consecutive con stesso quiz e user_id formano un unico quiz.
+# 'correct' è il numero dell'opzione come nei nomi delle colonne (1 = option_1) oppure
+# il testo esatto dell'opzione. In NDJSON correctAnswer resta quello dell'API:
+# indice 0-based o testo.
+CSV_COLUMNS = ["quiz", "user_id", "question", "option_1", "option_2", "option_3", "option_4", "correct"]
+
+def iter_ndjson(stream):
+    """Un quiz per riga: {"title", "user_id", "questions": [{"text", "options", "correctAnswer"}]}"""
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_no, None, "JSON non valido"
+            continue
+        if not isinstance(data, dict):
+            yield line_no, None, "Ogni riga deve essere un oggetto JSON"
+            continue
+        yield line_no, {
+            "title": data.get("title") or data.get("nome"),
+            "user_id": data.get("user_id") or data.get("userId"),
+            "questions": data.get("questions")
+        }, None
+
+def csv_correct_answer(value, options):
+    """
+    Valore della colonna 'correct' convertito in correctAnswer: (valore, errore).
+    Un numero che è anche il testo di un'altra opzione è ambiguo e viene rifiutato.
+    """
+    number = (value or "").strip()
+    if not number.isdigit():
+        return value, None
+    position = int(number) - 1
+    if 0 <= position < len(options):
+        if value in options and options.index(value) != position:
+            return None, f"Risposta corretta '{value}' ambigua: è il testo di un'opzione diversa da option_{number}"
+        return position, None
+    if value in options:
+        return value, None
+    return None, f"Risposta corretta '{value}' fuori intervallo: le opzioni sono numerate da 1 a {len(options)}"
+
+def iter_csv(stream):
+    """Una domanda per riga, raggruppate in quiz per righe consecutive (quiz, user_id)"""
+    reader = csv.DictReader(stream)
+    missing = [c for c in ("quiz", "user_id", "question", "option_1", "option_2", "correct")
+               if c not in (reader.fieldnames or [])]
+    if missing:
+        yield 1, None, f"Colonne CSV mancanti: {', '.join(missing)}"
+        return
+
+    current_key = None
+    current = None
+    current_error = None
+    start_line = None
+    for row in reader:
+        line_no = reader.line_num
+        key = (row.get("quiz"), row.get("user_id"))
+        if key != current_key:
+            if current is not None:
+                yield start_line, None if current_error else current, current_error
+            current_key = key
+            start_line = line_no
+            current = {"title": row.get("quiz"), "user_id": row.get("user_id"), "questions": []}
+            current_error = None
+
+        options = [row.get(f"option_{i}") or None for i in range(1, 5)]
+        while options and options[-1] is None:
+            options.pop()
+        correct, error = csv_correct_answer(row.get("correct"), options)
+        if error and current_error is None:
+            current_error = f"Riga {line_no}: {error}"
+        current["questions"].append({
+            "text": row.get("question"),
+            "options": options,
+            "correctAnswer": correct
+        })
+
+    if current is not None:
+        yield start_line, None if current_error else current, current_error
+
+def validate_record(record):
+    if not record.get("title"):
+        return "Titolo mancante"
+    try:
+        record["user_id"] = int(record.get("user_id"))
+    except (TypeError, ValueError):
+        return "user_id non valido"
+    questions = record.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return "Il quiz deve avere almeno una domanda"
+    for index, q in enumerate(questions, start=1):
+        error = validate_question(q)
+        if error:
+            return f"Domanda {index}: {error}"
+    return None
+
+def _flush_chunk(chunk, report):
+    try:
+        quiz_ids = [insert_quiz(record["user_id"], record["title"], record["questions"]).id
+                    for record in chunk]
+        db.session.commit()
+        for quiz_id in quiz_ids:
+            quiz_payload_cache.invalidate(quiz_id)
+        report["imported_quizzes"] += len(chunk)
+        report["imported_questions"] += sum(len(r["questions"]) for r in chunk)
+    except Exception as e:
+        db.session.rollback()
+        report["failed_chunks"] += 1
+        _add_error(report, None, f"Errore nel caricamento del blocco: {str(e)}")
+    finally:
+        # Libera gli oggetti Quiz del blocco dalla identity map
+        db.session.expunge_all()
+
+def _add_error(report, line_no, message):
+    report["error_count"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line_no, "error": message})
+
+def import_quizzes(records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Valida e carica i record prodotti da iter_ndjson/iter_csv.
+    Ogni blocco di chunk_size quiz (al massimo MAX_CHUNK_SIZE) è una transazione:
+    un blocco fallito non annulla quelli già caricati.
+    """
+    chunk_size = max(1, min(int(chunk_size), MAX_CHUNK_SIZE))
+    report = {
+        "imported_quizzes": 0,
+        "imported_questions": 0,
+        "failed_chunks": 0,
+        "error_count": 0,
+        "errors": []
+    }
+    chunk = []
+    last_line = 0
+    records = iter(records)
+    while True:
+        try:
+            line_no, record, error = next(records)
+        except StopIteration:
+            break
+        except UnicodeDecodeError as e:
+            # Il file viene decodificato mentre si legge: i blocchi precedenti sono già
+            # salvati, si carica quello in corso e ci si ferma
+            _add_error(report, None, f"Testo non UTF-8 dopo la riga {last_line}: {e.reason}")
+            break
+        last_line = line_no
+        if error is None:
+            error = validate_record(record)
+        if error:
+            _add_error(report, line_no, error)
+            continue
+
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            _flush_chunk(chunk, report)
+            chunk = []
+
+    if chunk:
+        _flush_chunk(chunk, report)
+    return report
+
+def get_record_reader(fmt):
+    readers = {"ndjson": iter_ndjson, "csv": iter_csv}
+    if fmt not in readers:
+        raise ValueError(f"Formato non supportato: {fmt}")
+    return readers[fmt]
@@ -0,0 +1,282 @@
+import logging
+import threading
+import time
+from collections import deque
+from services.lobby_store import LobbyStore, EVENT_LOG_SIZE, player_id, select_events
+
+logger = logging.getLogger(__name__)
+
+# Una lobby vuota viene eliminata dopo EMPTY_LOBBY_TTL secondi,
+# una lobby con giocatori ma senza attività dopo IDLE_LOBBY_TTL secondi
+EMPTY_LOBBY_TTL = 10 * 60
+IDLE_LOBBY_TTL = 2 * 60 * 60
+SWEEP_INTERVAL = 30
+
+class Lobby:
+    __slots__ = ("code", "quiz_id", "players", "sids", "events", "event_seq", "players_version",
+                 "created_at", "last_activity")
+
+    def __init__(self, code, quiz_id):
+        self.code = code
+        self.quiz_id = quiz_id
+        self.players = {}  # chiave giocatore (user_id, o sid se anonimo) -> dati giocatore
+        self.sids = {}     # sid -> chiave giocatore
+        self.events = deque(maxlen=EVENT_LOG_SIZE)  # (seq, evento, payload)
+        self.event_seq = 0
+        self.players_version = 0
+        self.created_at = time.monotonic()
+        self.last_activity = self.created_at
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+class _Shard:
+    __slots__ = ("lock", "lobbies")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.lobbies = {}
+
+class LobbyRegistry(LobbyStore):
+    """
+    Registro delle lobby attive, suddiviso in shard con un lock ciascuno:
+    operazioni su lobby diverse non si bloccano a vicenda.
+    Tutte le operazioni su giocatori e sid sono O(1).
+    """
+
+    def __init__(self, shard_count=16):
+        self._shards = [_Shard() for _ in range(shard_count)]
+        # Indice inverso sid -> codici delle lobby in cui il sid è presente
+        self._sid_rooms = {}
+        self._sid_lock = threading.Lock()
+        self._expire_listeners = []
+        self._sweeper_started = False
+        # Token di sessione revocati: jti -> scadenza
+        self._revoked = {}
+        self._revoked_lock = threading.Lock()
+
+    def _shard(self, code):
+        return self._shards[hash(code) % len(self._shards)]
+
+    def _index_sid(self, sid, code):
+        with self._sid_lock:
+            self._sid_rooms.setdefault(sid, set()).add(code)
+
+    def _unindex_sid(self, sid, code):
+        with self._sid_lock:
+            rooms = self._sid_rooms.get(sid)
+            if rooms is not None:
+                rooms.discard(code)
+                if not rooms:
+                    del self._sid_rooms[sid]
+
+    def create(self, code, quiz_id):
+        """Crea la lobby; ritorna False se il codice è già in uso"""
+        shard = self._shard(code)
+        with shard.lock:
+            if code in shard.lobbies:
+                return False
+            shard.lobbies[code] = Lobby(code, quiz_id)
+            return True
+
+    def exists(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            return code in shard.lobbies
+
+    def get_quiz_id(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            return lobby.quiz_id if lobby else None
+
+    def join(self, code, username, user_id, sid):
+        """
+        Aggiunge il giocatore alla lobby. Se lo stesso user_id è già presente
+        (es. nuova connessione) il vecchio sid viene sostituito.
+        Ritorna False se la lobby non esiste.
+        """
+        shard = self._shard(code)
+        key = user_id if user_id is not None else sid
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            if lobby is None:
+                return False
+            previous = lobby.players.get(key)
+            if previous is not None and previous['sid'] != sid:
+                lobby.sids.pop(previous['sid'], None)
+                self._unindex_sid(previous['sid'], code)
+            lobby.players[key] = {'sid': sid, 'username': username, 'user_id': user_id,
+                                  'id': player_id(user_id, sid)}
+            lobby.sids[sid] = key
+            lobby.touch()
+        self._index_sid(sid, code)
+        return True
+
+    def leave(self, code, sid):
+        """Rimuove il giocatore associato al sid; ritorna i suoi dati o None"""
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            if lobby is None:
+                return None
+            key = lobby.sids.pop(sid, None)
+            player = lobby.players.pop(key, None) if key is not None else None
+            lobby.touch()
+        self._unindex_sid(sid, code)
+        return player
+
+    def rebind(self, code, old_sid, new_sid):
+        """Sposta il giocatore sul nuovo sid mantenendo chiave e identificativo pubblico"""
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            if lobby is None or old_sid not in lobby.sids:
+                return None
+            key = lobby.sids.pop(old_sid)
+            player = lobby.players[key] = {**lobby.players[key], 'sid': new_sid}
+            lobby.sids[new_sid] = key
+            lobby.touch()
+        self._unindex_sid(old_sid, code)
+        self._index_sid(new_sid, code)
+        return player
+
+    def remove_sid(self, sid):
+        """Rimuove il sid da tutte le lobby (disconnessione); ritorna [(codice, giocatore)]"""
+        with self._sid_lock:
+            rooms = self._sid_rooms.pop(sid, set())
+        removed = []
+        for code in rooms:
+            player = self.leave(code, sid)
+            if player is not None:
+                removed.append((code, player))
+        return removed
+
+    def rooms_of(self, sid):
+        with self._sid_lock:
+            return set(self._sid_rooms.get(sid, ()))
+
+    def get_player(self, code, sid):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            if lobby is None or sid not in lobby.sids:
+                return None
+            return lobby.players.get(lobby.sids[sid])
+
+    def players(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            return list(lobby.players.values()) if lobby else []
+
+    def count(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            return len(lobby.players) if lobby else 0
+
+    def delete(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.pop(code, None)
+        if lobby is None:
+            return False
+        for sid in lobby.sids:
+            self._unindex_sid(sid, code)
+        for listener in self._expire_listeners:
+            listener(code)
+        return True
+
+    def append_event(self, code, event, payload):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            if lobby is None:
+                return None
+            lobby.event_seq += 1
+            lobby.events.append((lobby.event_seq, event, payload))
+            # Come con Redis: gli eventi della partita contano come attività della lobby
+            lobby.touch()
+            return lobby.event_seq
+
+    def events_since(self, code, seq):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            if lobby is None:
+                return [], False
+            return select_events(lobby.events, seq, lobby.event_seq)
+
+    def last_event_seq(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            return lobby.event_seq if lobby else 0
+
+    def next_players_version(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            if lobby is None:
+                return None
+            lobby.players_version += 1
+            return lobby.players_version
+
+    def players_version(self, code):
+        shard = self._shard(code)
+        with shard.lock:
+            lobby = shard.lobbies.get(code)
+            return lobby.players_version if lobby else 0
+
+    def revoke_session(self, jti, ttl):
+        now = time.monotonic()
+        with self._revoked_lock:
+            self._revoked[jti] = now + ttl
+            # I token revocati scaduti non servono più
+            for expired in [j for j, expires_at in self._revoked.items() if expires_at < now]:
+                del self._revoked[expired]
+
+    def is_session_revoked(self, jti):
+        with self._revoked_lock:
+            expires_at = self._revoked.get(jti)
+            return expires_at is not None and expires_at > time.monotonic()
+
+    def __len__(self):
+        return sum(len(shard.lobbies) for shard in self._shards)
+
+    def add_expire_listener(self, listener):
+        """listener(code) viene chiamato per ogni lobby eliminata"""
+        self._expire_listeners.append(listener)
+
+    def expire_idle(self, empty_ttl=EMPTY_LOBBY_TTL, idle_ttl=IDLE_LOBBY_TTL):
+        """Elimina le lobby inattive e ritorna i loro codici"""
+        now = time.monotonic()
+        expired = []
+        for shard in self._shards:
+            with shard.lock:
+                for code, lobby in shard.lobbies.items():
+                    idle = now - lobby.last_activity
+                    if (not lobby.players and idle > empty_ttl) or idle > idle_ttl:
+                        expired.append(code)
+        for code in expired:
+            self.delete(code)
+        return expired
+
+    def start_sweeper(self, socketio, interval=SWEEP_INTERVAL):
+        """
+        Avvia la pulizia periodica come background task di SocketIO,
+        così funziona sia con i thread che con eventlet/gevent.
+        """
+        if self._sweeper_started:
+            return
+        self._sweeper_started = True
+
+        def sweep():
+            while True:
+                socketio.sleep(interval)
+                expired = self.expire_idle()
+                if expired:
+                    logger.info("Lobby scadute: %d", len(expired))
+
+        socketio.start_background_task(sweep)
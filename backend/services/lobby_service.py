@@ -1,44 +1,73 @@
-from flask import Flask, request, jsonify
-from database import app, db
-from models import Quiz, User
-from datetime import datetime
-import uuid
-import hashlib
-import time
-
-# In-memory storage for lobbies (in production, use Redis or database)
-active_lobbies = {}
-
-def get_uuid_code(quiz_id):
-    """
-    Genera un codice univoco di 6 caratteri basato su quiz_id e timestamp
-    """
-    
-    # Combina quiz_id con timestamp corrente per unicità
-    data = f"{quiz_id}_{int(time.time() * 1000000)}"
-    
-    # Crea hash MD5 e prende i primi 6 caratteri in maiuscolo
-    hash_object = hashlib.md5(data.encode())
-    return hash_object.hexdigest()[:6].upper()
+from database import create_flask_app
+import threading
+
+from services.lobby_store import create_lobby_store
+from services.code_allocator import CodeAllocator
+from services.snapshot_service import quiz_snapshots
+
+# Stato delle lobby attive (in memoria o su Redis, vedi LOBBY_BACKEND). Lo store
+# dipende dalla configurazione dell'app, quindi viene creato al primo uso e non
+# all'import: `from services.lobby_service import lobby_store` chiama get_lobby_store().
+_lobby_store = None
+_code_allocator = None
+_store_lock = threading.Lock()
+
+def get_lobby_store():
+    global _lobby_store, _code_allocator
+    with _store_lock:
+        if _lobby_store is None:
+            config = create_flask_app().config
+            store = create_lobby_store(config['LOBBY_BACKEND'], config['REDIS_URL'])
+            store.add_expire_listener(quiz_snapshots.detach)
+            _code_allocator = CodeAllocator(store)
+            _lobby_store = store
+        return _lobby_store
+
+def get_code_allocator():
+    get_lobby_store()
+    return _code_allocator
+
+def __getattr__(name):
+    if name == 'lobby_store':
+        return get_lobby_store()
+    if name == 'code_allocator':
+        return get_code_allocator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def create_lobby(quiz_id):
-    id_lobby = get_uuid_code(quiz_id)
-    print(id_lobby)
-    active_lobbies[id_lobby] = {"quiz_id": quiz_id, "users": []}
-    return id_lobby
+    """
+    Crea la lobby e carica subito in memoria il quiz (condiviso tra le lobby dello
+    stesso quiz): l'avvio della partita non deve più leggere il database.
+    Ritorna (codice, messaggio); codice None se il quiz non esiste.
+    """
+    code = get_code_allocator().allocate(quiz_id)
+    if quiz_snapshots.attach(code, quiz_id) is None:
+        get_lobby_store().delete(code)
+        return None, "Quiz non trovato"
+    return code, "Lobby creata"
 
 def join_lobby(room, username, user_id, sid):
-    if room in active_lobbies:
-        user_data = {
-            'sid': sid,
-            'username': username,
-            'user_id': user_id
-        }
-        # Controlla se l'utente non è già nella lista
-        if not any(u['user_id'] == user_id for u in active_lobbies[room]['users']):
-            active_lobbies[room]['users'].append(user_data)
+    return get_lobby_store().join(room, username, user_id, sid)
+
+def leave_lobby(room, sid):
+    return get_lobby_store().leave(room, sid)
+
+def resume_player(room, old_sid, sid):
+    """Collega al nuovo sid il giocatore della connessione precedente; ritorna i suoi dati o None"""
+    return get_lobby_store().rebind(room, old_sid, sid)
+
+def leave_all_lobbies(sid):
+    """Rimuove il sid da tutte le lobby; ritorna [(room, giocatore)]"""
+    return get_lobby_store().remove_sid(sid)
+
+def count_players(room):
+    return get_lobby_store().count(room)
+
+def get_player(room, sid):
+    return get_lobby_store().get_player(room, sid)
+
+def get_lobby_quiz_id(room):
+    return get_lobby_store().get_quiz_id(room)
 
 def get_list_players(room):
-    if active_lobbies[room]:
-        print(active_lobbies[room]['users'])
-        return active_lobbies[room]['users']
\ No newline at end of file
+    return get_lobby_store().players(room)
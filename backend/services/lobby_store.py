@@ -0,0 +1,122 @@
+import hashlib
+
+# Eventi di room conservati per lobby (registro circolare) per il replay dopo un resume
+EVENT_LOG_SIZE = 256
+
+def player_id(user_id, sid):
+    """Identificativo pubblico del giocatore: user_id, o un hash del sid di ingresso per gli ospiti"""
+    if user_id is not None:
+        return user_id
+    return 'g' + hashlib.sha1(sid.encode()).hexdigest()[:10]
+
+def select_events(entries, seq, last_seq):
+    """Filtro comune di events_since: entries sono (seq, evento, payload) in ordine crescente"""
+    if seq > last_seq:
+        # seq di un'altra vita della lobby (es. riavvio del server): serve uno snapshot
+        return [], False
+    events = [entry for entry in entries if entry[0] > seq]
+    return events, not events or events[0][0] == seq + 1
+
+class LobbyStore:
+    """
+    Interfaccia per lo stato delle lobby. Implementazioni:
+    - LobbyRegistry (services/lobby_registry.py): in memoria, un solo processo
+    - RedisLobbyStore (services/redis_lobby_store.py): condivisa tra più worker
+    """
+
+    def create(self, code, quiz_id):
+        """Crea la lobby; ritorna False se il codice è già in uso"""
+        raise NotImplementedError
+
+    def exists(self, code):
+        raise NotImplementedError
+
+    def get_quiz_id(self, code):
+        raise NotImplementedError
+
+    def join(self, code, username, user_id, sid):
+        """Aggiunge il giocatore; ritorna False se la lobby non esiste"""
+        raise NotImplementedError
+
+    def leave(self, code, sid):
+        """Rimuove il giocatore associato al sid; ritorna i suoi dati o None"""
+        raise NotImplementedError
+
+    def rebind(self, code, old_sid, new_sid):
+        """Sposta il giocatore collegato con old_sid sul nuovo sid (resume); ritorna i suoi dati o None"""
+        raise NotImplementedError
+
+    def remove_sid(self, sid):
+        """Rimuove il sid da tutte le lobby; ritorna [(codice, giocatore)]"""
+        raise NotImplementedError
+
+    def rooms_of(self, sid):
+        raise NotImplementedError
+
+    def get_player(self, code, sid):
+        """Dati del giocatore collegato con quel sid, o None"""
+        raise NotImplementedError
+
+    def players(self, code):
+        raise NotImplementedError
+
+    def count(self, code):
+        raise NotImplementedError
+
+    def delete(self, code):
+        raise NotImplementedError
+
+    def append_event(self, code, event, payload):
+        """Registra un evento della room; ritorna il suo numero di sequenza o None se la lobby non esiste"""
+        raise NotImplementedError
+
+    def events_since(self, code, seq):
+        """
+        Eventi con numero di sequenza > seq: ritorna ([(seq, evento, payload)], completo).
+        completo è False se parte degli eventi è già uscita dal registro.
+        """
+        raise NotImplementedError
+
+    def last_event_seq(self, code):
+        raise NotImplementedError
+
+    def next_players_version(self, code):
+        """
+        Nuova versione della lista giocatori per un 'players_delta', unica per lobby
+        anche con più worker; None se la lobby non esiste
+        """
+        raise NotImplementedError
+
+    def players_version(self, code):
+        raise NotImplementedError
+
+    def revoke_session(self, jti, ttl):
+        """Revoca il token di sessione jti per ttl secondi (la sua durata massima), per tutti i worker"""
+        raise NotImplementedError
+
+    def is_session_revoked(self, jti):
+        raise NotImplementedError
+
+    def add_expire_listener(self, listener):
+        """listener(code) viene chiamato per ogni lobby eliminata"""
+        raise NotImplementedError
+
+    def start_sweeper(self, socketio):
+        """Avvia l'eventuale pulizia periodica delle lobby inattive"""
+        raise NotImplementedError
+
+def create_lobby_store(backend="memory", redis_url=None, client=None):
+    """
+    Crea lo store configurato. Con backend="redis" si può passare un client
+    già pronto (es. fakeredis.FakeRedis() nei test) al posto di redis_url.
+    """
+    if backend == "memory":
+        from services.lobby_registry import LobbyRegistry
+        return LobbyRegistry()
+    if backend == "redis":
+        from services.redis_lobby_store import RedisLobbyStore
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(redis_url, decode_responses=True)
+        return RedisLobbyStore(client)
+    raise ValueError(f"Backend lobby non supportato: {backend}")
@@ -0,0 +1,33 @@
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import logging
+import os
+import queue
+
+# I gestori scrivono solo su una coda in memoria; la scrittura su stderr
+# avviene in un thread separato, fuori dal percorso delle richieste.
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener = None
+
+def setup_logging(level=None):
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
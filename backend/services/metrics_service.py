@@ -0,0 +1,197 @@
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from functools import wraps
+import threading
+import time
+
+# Metriche in memoria esposte in formato testo Prometheus su /metrics:
+# - durata e numero delle richieste HTTP per route/metodo/stato
+# - durata degli eventi Socket.IO per evento
+# - numero e durata delle query SQL per richiesta/evento
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # valori delle label -> [conteggi per bucket, somma, totale]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for label_values, counts, total, count in snapshot:
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = list(self._values.items())
+        for label_values, value in snapshot:
+            lines.append(f"{self.name}{_format_labels(list(zip(self.label_names, label_values)))} {value}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, name, help_text, collect):
+        """collect() -> {nome_valore: numero}, esposto come gauge con label "value" """
+        self._collectors.append((name, help_text, collect))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help_text, collect in self._collectors:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in collect().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'{name}{{value="{key}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+http_duration = metrics.histogram(
+    "http_request_duration_seconds", "Durata delle richieste HTTP", ("route", "method", "status"))
+socket_duration = metrics.histogram(
+    "socketio_event_duration_seconds", "Durata dei gestori di eventi Socket.IO", ("event", "outcome"))
+sql_queries = metrics.histogram(
+    "sql_queries_per_unit", "Query SQL eseguite per richiesta HTTP o evento Socket.IO",
+    ("unit",), buckets=QUERY_COUNT_BUCKETS)
+sql_duration = metrics.histogram(
+    "sql_query_duration_seconds", "Durata delle singole query SQL", ())
+socket_errors = metrics.counter(
+    "socketio_event_errors_total", "Eccezioni nei gestori di eventi Socket.IO", ("event",))
+
+def _start_unit():
+    g.sql_query_count = 0
+
+def _finish_unit(unit):
+    count = g.pop("sql_query_count", None)
+    if count is not None:
+        sql_queries.observe(count, unit)
+
+# Query SQL: contate nella richiesta/evento corrente (flask.g) e misurate singolarmente
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql_duration.observe(time.perf_counter() - conn.info["query_start"].pop())
+    if has_app_context() and "sql_query_count" in g:
+        g.sql_query_count += 1
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+def init_request_metrics(app):
+    """Misura ogni richiesta HTTP dei blueprint registrati sull'app"""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        _start_unit()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "<unmatched>"
+            http_duration.observe(time.perf_counter() - started, route, request.method, response.status_code)
+            _finish_unit(f"http {request.method} {route}")
+        return response
+
+def instrumented_on(socketio):
+    """Sostituto di @socketio.on che misura durata, errori e query SQL dell'handler"""
+
+    def on(event_name):
+        def decorator(handler):
+            @wraps(handler)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                # Handler chiamato da un altro handler: le query restano dell'evento esterno
+                nested = "sql_query_count" in g
+                if not nested:
+                    _start_unit()
+                outcome = "ok"
+                try:
+                    return handler(*args, **kwargs)
+                except Exception:
+                    outcome = "error"
+                    socket_errors.inc(event_name)
+                    raise
+                finally:
+                    socket_duration.observe(time.perf_counter() - started, event_name, outcome)
+                    if not nested:
+                        _finish_unit(f"socket {event_name}")
+            socketio.on(event_name)(wrapper)
+            return wrapper
+        return decorator
+
+    return on
@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+# Hash delle password con scrypt (stdlib). Il calcolo è volutamente lento,
+# quindi gira in thread dedicati: hashlib.scrypt rilascia il GIL.
+# Con i thread normali la richiesta aspetta nel proprio thread e gli altri
+# continuano a servire i client. Con eventlet o gevent i thread del pool
+# sarebbero greenlet e scrypt fermerebbe l'hub: il calcolo passa al pool di
+# thread veri della libreria (eventlet.tpool, threadpool di gevent) e la
+# greenlet in attesa cede il controllo alle altre.
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+HASH_PREFIX = "scrypt"
+
+POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', os.cpu_count() or 2))
+MAX_PENDING = int(os.environ.get('PASSWORD_POOL_MAX_PENDING', 64))
+
+class PasswordPoolBusy(Exception):
+    """Troppe richieste di hash in coda: il chiamante deve rispondere 503"""
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+def hash_password_sync(password, salt=None, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = salt or os.urandom(SALT_BYTES)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES)
+    return f"{HASH_PREFIX}${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+def is_hashed(stored):
+    return stored.startswith(HASH_PREFIX + "$")
+
+def verify_password_sync(password, stored):
+    """Confronto a tempo costante; accetta anche le vecchie password in chiaro"""
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = base64.b64decode(digest)
+        actual = hashlib.scrypt(password.encode(), salt=base64.b64decode(salt),
+                                n=int(n), r=int(r), p=int(p), dklen=len(expected))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+def needs_rehash(stored):
+    return not is_hashed(stored) or not stored.startswith(f"{HASH_PREFIX}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+def _green_executor():
+    """Funzione che esegue fn() in un thread vero se eventlet o gevent hanno patchato i thread, altrimenti None"""
+    try:
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched('thread'):
+            return tpool.execute
+    except ImportError:
+        pass
+    try:
+        from gevent import monkey, get_hub
+        if monkey.is_module_patched('threading'):
+            return lambda fn: get_hub().threadpool.apply(fn)
+    except ImportError:
+        pass
+    return None
+
+class PasswordHasher:
+    """Pool limitato per hash e verifica, con metriche di coda"""
+
+    def __init__(self, workers=POOL_WORKERS, max_pending=MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy("Troppe richieste di autenticazione, riprova tra poco")
+
+        queued_at = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self.pending -= 1
+                    self.completed += 1
+                    self.total_wait += started - queued_at
+                    self.total_run += finished - started
+                self._slots.release()
+
+        green = _green_executor()
+        if green is not None:
+            return green(task)
+        return self._executor.submit(task).result()
+
+    def hash(self, password):
+        return self._submit(hash_password_sync, password)
+
+    def verify(self, password, stored):
+        return self._submit(verify_password_sync, password, stored)
+
+    def stats(self):
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / completed * 1000, 3),
+                "avg_run_ms": round(self.total_run / completed * 1000, 3)
+            }
+
+password_hasher = PasswordHasher()
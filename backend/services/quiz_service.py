@@ -1,33 +1,93 @@
-from flask import Flask, request, jsonify
-from database import app, db
-from models import Quiz, Domanda
+from database import db, read_session
+from models import Quiz, Domanda, Opzione
 from datetime import datetime
+from sqlalchemy import func, or_, and_, insert, select
+from services.cache_service import quiz_payload_cache
+from services.stream_service import STREAM_BATCH_SIZE
+import base64
+import json
+
+# Dimensione pagina di default e massima per le liste di quiz
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+INVALID_CURSOR = "Cursore non valido"
+
+# Limite di validazione: le opzioni sono righe di Opzione, lo schema non ha un massimo
+MAX_OPTIONS = 8
+
+def resolve_correct_index(correct, options):
+    """
+    Posizione (0-based) della risposta corretta: correctAnswer può essere l'indice
+    0-based (inviato dal frontend, anche come stringa di cifre) o il testo
+    dell'opzione. None se non è riconoscibile. Il CSV dell'import numera le
+    opzioni da 1 e converte prima (import_service.csv_correct_answer).
+    """
+    if isinstance(correct, bool):
+        return None
+    if isinstance(correct, int):
+        return correct if 0 <= correct < len(options) else None
+    if isinstance(correct, str):
+        if correct in options:
+            return options.index(correct)
+        if correct.isdigit() and int(correct) < len(options):
+            return int(correct)
+    return None
+
+def validate_question(q):
+    """Ritorna un messaggio di errore se la domanda non è valida, altrimenti None"""
+    if not isinstance(q, dict):
+        return "Domanda non valida"
+    if not q.get('text'):
+        return "Testo della domanda mancante"
+    options = q.get('options')
+    if not isinstance(options, list) or not 2 <= len(options) <= MAX_OPTIONS:
+        return f"Ogni domanda deve avere da 2 a {MAX_OPTIONS} opzioni"
+    if not all(isinstance(o, str) and o for o in options):
+        return "Le opzioni non possono essere vuote"
+    if q.get('correctAnswer') in (None, ''):
+        return "Risposta corretta mancante"
+    if resolve_correct_index(q['correctAnswer'], options) is None:
+        return "La risposta corretta non corrisponde a nessuna opzione"
+    return None
+
+def build_question_rows(quiz_id, questions):
+    """Converte le domande del payload in righe per un insert multiplo su Domanda"""
+    return [{
+        "testo": q['text'],
+        "indice_corretto": resolve_correct_index(q['correctAnswer'], q['options']),
+        "quiz_id": quiz_id
+    } for q in questions]
+
+def build_option_rows(question_ids, questions):
+    """Righe di Opzione per le domande appena inserite (stesso ordine di question_ids)"""
+    return [{"domanda_id": question_id, "posizione": position, "testo": option}
+            for question_id, q in zip(question_ids, questions)
+            for position, option in enumerate(q['options'])]
+
+def insert_quiz(userId, title, questions):
+    """
+    Inserisce quiz, domande e opzioni nella sessione corrente senza fare commit:
+    domande e opzioni vengono scritte con un executemany ciascuna.
+    """
+    quiz = Quiz(nome=title, data=datetime.utcnow(), user_id=userId)
+    db.session.add(quiz)
+    db.session.flush()  # assegna quiz.id senza chiudere la transazione
+
+    rows = build_question_rows(quiz.id, questions)
+    if rows:
+        # RETURNING ordinato come i parametri: servono gli id per le righe di Opzione
+        question_ids = db.session.execute(
+            insert(Domanda).returning(Domanda.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        db.session.execute(insert(Opzione), build_option_rows(question_ids, questions))
+    return quiz
 
 def create_quiz(userId, title, questions):
     try:
-        print("Creating quiz with title:", title)
-        print("Questions:", questions)
-        print("User ID:", userId)
-        # Crea nuovo quiz
-        quiz = Quiz(nome=title, data=datetime.utcnow(), user_id=userId)
-        db.session.add(quiz)
-        db.session.commit()
-        
-        # Aggiungi domande al quiz
-        for q in questions:
-            options = q['options']
-            question = Domanda(
-                testo=q['text'],
-                risposta_1=options[0] if len(options) > 0 else None,
-                risposta_2=options[1] if len(options) > 1 else None,
-                risposta_3=options[2] if len(options) > 2 else None,
-                risposta_4=options[3] if len(options) > 3 else None,
-                risposta_corretta=q['correctAnswer'],
-                quiz_id=quiz.id
-            )
-            db.session.add(question)
-        
+        # Quiz e domande nella stessa transazione: o tutto o niente
+        quiz = insert_quiz(userId, title, questions)
         db.session.commit()
+        quiz_payload_cache.invalidate(quiz.id)
         return quiz, "Quiz creato con successo"
     except Exception as e:
         db.session.rollback()
@@ -43,37 +103,176 @@ def get_quiz_by_id(quiz_id):
     except Exception as e:
         return None, f"Errore nel recupero del quiz: {str(e)}"
 
-def get_quizzes_by_user(user_id):
+def encode_cursor(data, quiz_id):
+    """Codifica la posizione (data, id) dell'ultimo quiz restituito in un cursore opaco"""
+    raw = f"{data.isoformat()}|{quiz_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decodifica un cursore prodotto da encode_cursor; solleva ValueError se non valido"""
     try:
-        quizzes = Quiz.query.filter_by(user_id=user_id).order_by(Quiz.data.desc()).all()
-        response = []
-        
-        for quiz in quizzes:
-            count_domande = get_count_questions_in_quiz(quiz.id)
-            quiz_obj = {
-                "id": quiz.id,
-                "nome": quiz.nome,
-                "data": quiz.data,
-                "user_id": quiz.user_id,
-                "question_count": count_domande
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        data, quiz_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(data), int(quiz_id)
+    except Exception:
+        raise ValueError(INVALID_CURSOR)
+
+def clamp_page_size(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+def list_quizzes(user_id=None, limit=None, cursor=None):
+    """
+    Lista paginata (keyset su Quiz.data/Quiz.id, dal più recente) con il numero
+    di domande calcolato in un'unica query aggregata.
+    Ritorna (quizzes, next_cursor); next_cursor è None sull'ultima pagina.
+    """
+    limit = clamp_page_size(limit)
+    with read_session() as session:
+        question_count = func.count(Domanda.id).label("question_count")
+        query = session.query(Quiz.id, Quiz.nome, Quiz.data, Quiz.user_id, question_count) \
+            .outerjoin(Domanda, Domanda.quiz_id == Quiz.id)
+
+        if user_id is not None:
+            query = query.filter(Quiz.user_id == user_id)
+
+        if cursor:
+            last_data, last_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Quiz.data < last_data,
+                and_(Quiz.data == last_data, Quiz.id < last_id)
+            ))
+
+        # Una riga in più per sapere se esiste una pagina successiva
+        rows = query.group_by(Quiz.id) \
+            .order_by(Quiz.data.desc(), Quiz.id.desc()) \
+            .limit(limit + 1) \
+            .all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].data, rows[-1].id)
+
+    quizzes = [{
+        "id": row.id,
+        "nome": row.nome,
+        "data": row.data.isoformat(),
+        "user_id": row.user_id,
+        "question_count": row.question_count
+    } for row in rows]
+    return quizzes, next_cursor
+
+def iter_quizzes(user_id=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Tutti i quiz (dal più recente) nello stesso formato di list_quizzes, letti a blocchi.
+    Il conteggio delle domande è una subquery correlata: niente GROUP BY su tutta
+    la tabella, le righe escono nell'ordine dell'indice man mano che vengono lette.
+    """
+    question_count = select(func.count(Domanda.id)) \
+        .where(Domanda.quiz_id == Quiz.id).correlate(Quiz).scalar_subquery()
+    query = select(Quiz.id, Quiz.nome, Quiz.data, Quiz.user_id, question_count.label("question_count"))
+    if user_id is not None:
+        query = query.where(Quiz.user_id == user_id)
+    query = query.order_by(Quiz.data.desc(), Quiz.id.desc()).execution_options(yield_per=batch_size)
+
+    with read_session() as session:
+        for row in session.execute(query):
+            yield {
+                "id": row.id,
+                "nome": row.nome,
+                "data": row.data.isoformat(),
+                "user_id": row.user_id,
+                "question_count": row.question_count
             }
-            response.append(quiz_obj)
 
-        return response, "Quizzes recuperati con successo"
+def get_quizzes_by_user(user_id, limit=None, cursor=None):
+    try:
+        quizzes, next_cursor = list_quizzes(user_id=user_id, limit=limit, cursor=cursor)
+        return quizzes, next_cursor, "Quizzes recuperati con successo"
+    except ValueError as e:
+        return None, None, str(e)
     except Exception as e:
-        return None, f"Errore nel recupero dei quiz dell'utente: {str(e)}"
+        return None, None, f"Errore nel recupero dei quiz dell'utente: {str(e)}"
+
+def load_questions(session, quiz_id):
+    """
+    Domande del quiz con le opzioni in ordine, lette con una sola query:
+    [{'id', 'testo', 'options', 'correct_index'}]
+    """
+    rows = session.query(Domanda.id, Domanda.testo, Domanda.indice_corretto, Opzione.testo) \
+        .outerjoin(Opzione, Opzione.domanda_id == Domanda.id) \
+        .filter(Domanda.quiz_id == quiz_id) \
+        .order_by(Domanda.id, Opzione.posizione) \
+        .all()
+
+    questions = []
+    for question_id, testo, correct_index, option in rows:
+        if not questions or questions[-1]['id'] != question_id:
+            questions.append({'id': question_id, 'testo': testo, 'options': [], 'correct_index': correct_index})
+        if option is not None:
+            questions[-1]['options'].append(option)
+    return questions
 
 def get_quiz_with_questions(quiz_id):
     try:
-        quiz = Quiz.query.get(quiz_id)
-        if quiz:
-            questions = Domanda.query.filter_by(quiz_id=quiz_id).all()
-            return quiz, questions, "Quiz con domande trovato"
-        else:
-            return None, None, "Quiz non trovato"
+        with read_session() as session:
+            quiz = session.get(Quiz, quiz_id)
+            if quiz:
+                questions = load_questions(session, quiz_id)
+                return quiz, questions, "Quiz con domande trovato"
+            else:
+                return None, None, "Quiz non trovato"
     except Exception as e:
         return None, None, f"Errore nel recupero del quiz con domande: {str(e)}"
 
+def serialize_question(question, quiz_id, include_answer=False):
+    """Senza include_answer la domanda è sicura da inviare ai giocatori"""
+    data = {
+        "id": question['id'],
+        "testo": question['testo'],
+        "options": question['options'],
+        "quiz_id": quiz_id
+    }
+    if include_answer:
+        data["correct_index"] = question['correct_index']
+    return data
+
+def serialize_quiz(quiz, questions, include_answers=False):
+    return {
+        "id": quiz.id,
+        "nome": quiz.nome,
+        "data": quiz.data.isoformat(),
+        "user_id": quiz.user_id,
+        "questions": [serialize_question(q, quiz.id, include_answers) for q in questions] if questions else []
+    }
+
+def _encode_payload(body):
+    return json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+def _load_quiz_payload(quiz_id):
+    """(id autore, payload per i giocatori, payload con le risposte)"""
+    quiz, questions, message = get_quiz_with_questions(quiz_id)
+    if not quiz:
+        return None
+    return (
+        quiz.user_id,
+        _encode_payload({"message": message, "quiz": serialize_quiz(quiz, questions)}),
+        _encode_payload({"message": message, "quiz": serialize_quiz(quiz, questions, include_answers=True)}),
+    )
+
+def get_quiz_payload(quiz_id, viewer_id=None):
+    """
+    Corpo JSON (bytes) di GET /api/quiz/<id>, servito dalla cache; None se il quiz non esiste.
+    Le risposte corrette sono incluse solo per l'autore del quiz.
+    """
+    entry = quiz_payload_cache.get_or_load(quiz_id, lambda: _load_quiz_payload(quiz_id))
+    if entry is None:
+        return None
+    owner_id, player_payload, full_payload = entry
+    return full_payload if viewer_id is not None and viewer_id == owner_id else player_payload
+
 def get_count_questions_in_quiz(quiz_id):
     try:
         count = Domanda.query.filter_by(quiz_id=quiz_id).count()
@@ -81,9 +280,11 @@ def get_count_questions_in_quiz(quiz_id):
     except Exception as e:
         return 0
 
-def get_all_quizzes():
+def get_all_quizzes(limit=None, cursor=None):
     try:
-        quizzes = Quiz.query.all()
-        return quizzes, "Tutti i quiz recuperati con successo"
+        quizzes, next_cursor = list_quizzes(limit=limit, cursor=cursor)
+        return quizzes, next_cursor, "Tutti i quiz recuperati con successo"
+    except ValueError as e:
+        return None, None, str(e)
     except Exception as e:
-        return None, f"Errore nel recupero di tutti i quiz: {str(e)}"
\ No newline at end of file
+        return None, None, f"Errore nel recupero di tutti i quiz: {str(e)}"
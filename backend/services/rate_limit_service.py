@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from flask import request, jsonify
+from functools import wraps
+from services.metrics_service import metrics
+from services.session_service import get_current_session
+import math
+import os
+import threading
+import time
+
+# Token bucket per chiave (sid, utente, room, ip): ogni chiave riceve `rate` gettoni
+# al secondo fino a un massimo di `burst`; ogni evento/richiesta ne consuma uno.
+# I bucket inattivi più vecchi vengono scartati oltre MAX_KEYS, quindi la memoria
+# resta limitata anche con molte connessioni di breve durata.
+#
+# I limiti delle route si possono cambiare senza toccare il codice con
+# RATE_LIMIT_<NOME DELLA VIEW>="rate/burst", es. RATE_LIMIT_SEARCH_QUIZZES_ROUTE=30/60.
+# Dietro un proxy l'indirizzo del client arriva da X-Forwarded-For solo se
+# TRUSTED_PROXIES indica quanti proxy fidati ci sono davanti al server (app_setup.py).
+
+MAX_KEYS = 100000
+# RATE_LIMIT_ENABLED=0 per i benchmark e i test di carico, che arrivano tutti dallo stesso client
+ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+
+rate_limited = metrics.counter(
+    "rate_limited_total", "Eventi Socket.IO e richieste HTTP rifiutati dal rate limiter", ("limiter",))
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated", "notified")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.notified = False
+
+class RateLimiter:
+    def __init__(self, name, rate, burst, max_keys=MAX_KEYS):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled = 0
+
+    def allow(self, key, cost=1):
+        """
+        Ritorna (consentito, secondi di attesa, primo rifiuto della serie).
+        Il terzo valore serve ad avvisare il client una volta sola per raffica.
+        """
+        if not ENABLED:
+            return True, 0.0, False
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.burst, now)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+                self._buckets.move_to_end(key)
+
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                bucket.notified = False
+                self.allowed += 1
+                return True, 0.0, False
+
+            self.throttled += 1
+            first = not bucket.notified
+            bucket.notified = True
+            retry_after = (cost - bucket.tokens) / self.rate
+        rate_limited.inc(self.name)
+        return False, retry_after, first
+
+    def stats(self):
+        with self._lock:
+            return {"keys": len(self._buckets), "allowed": self.allowed, "throttled": self.throttled,
+                    "rate": self.rate, "burst": self.burst}
+
+# Tutti i limiter creati dai decoratori, per /metrics
+limiters = []
+
+def configured_limit(view_name, rate, burst):
+    """(rate, burst) della route, con l'eventuale RATE_LIMIT_<VIEW> dall'ambiente"""
+    value = os.environ.get(f"RATE_LIMIT_{view_name.upper()}")
+    if not value:
+        return rate, burst
+    try:
+        configured_rate, configured_burst = (float(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"RATE_LIMIT_{view_name.upper()} non valido: usa rate/burst, es. 10/20")
+    return configured_rate, configured_burst
+
+def create_limiter(name, rate, burst):
+    limiter = RateLimiter(name, rate, burst)
+    limiters.append(limiter)
+    return limiter
+
+def limiter_stats():
+    return {f"{l.name} {key}": value for l in limiters for key, value in l.stats().items()
+            if key in ("keys", "throttled")}
+
+def _route_key(per):
+    if per == "user":
+        # Utente autenticato dal token, altrimenti l'indirizzo del client: una classe
+        # dietro lo stesso NAT non divide un unico bucket quando gli studenti hanno fatto login
+        session = get_current_session()
+        if session is not None:
+            return f"user:{session['user_id']}"
+        return f"ip:{request.remote_addr}"
+    if per == "ip":
+        return request.remote_addr
+    return "*"
+
+def rate_limit(per, rate, burst):
+    """
+    Decoratore per le route dei blueprint (sotto @bp.route): oltre il limite
+    risponde 429 con Retry-After. per: "ip", "user" (utente, o ip se anonimo) o "global".
+    """
+    def decorator(view):
+        view_rate, view_burst = configured_limit(view.__name__, rate, burst)
+        limiter = create_limiter(f"http {view.__name__} per {per}", view_rate, view_burst)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            allowed, retry_after, _ = limiter.allow(_route_key(per))
+            if not allowed:
+                response = jsonify({"error": "Troppe richieste, riprova più tardi"})
+                response.status_code = 429
+                response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,278 @@
+import json
+import logging
+import threading
+from redis.exceptions import WatchError
+from services.lobby_store import LobbyStore, EVENT_LOG_SIZE, player_id, select_events
+from services.lobby_registry import EMPTY_LOBBY_TTL, IDLE_LOBBY_TTL, SWEEP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Chiavi usate (il client deve avere decode_responses=True):
+#   lobby:<code>          hash con quiz_id
+#   lobby:<code>:players  hash chiave giocatore -> JSON del giocatore
+#   lobby:<code>:sids     hash sid -> chiave giocatore
+#   lobby:<code>:seq      ultimo numero di sequenza degli eventi di room
+#   lobby:<code>:events   lista JSON [seq, evento, payload], ultimi EVENT_LOG_SIZE
+#   lobby:<code>:version  versione della lista giocatori (players_delta)
+#   sid:<sid>:rooms       set dei codici lobby del sid, scade dopo idle_ttl senza attività del sid
+#   session:<jti>:revoked token di sessione revocato (logout), scade con il token
+# La scadenza delle lobby inattive usa il TTL di Redis, rinnovato a ogni attività.
+# Redis non avvisa quando una chiave scade: ogni worker ricorda le lobby che ha usato
+# e il sweeper controlla periodicamente quali non esistono più, per chiamare gli
+# expire listener (stato per room di broadcaster, code di uscita, copie dei quiz).
+
+class RedisLobbyStore(LobbyStore):
+    """Stato delle lobby su un server Redis (o compatibile), condiviso tra più processi"""
+
+    def __init__(self, client, empty_ttl=EMPTY_LOBBY_TTL, idle_ttl=IDLE_LOBBY_TTL):
+        self.client = client
+        self.empty_ttl = empty_ttl
+        self.idle_ttl = idle_ttl
+        self._known = set()  # lobby usate da questo processo, controllate dal sweeper
+        self._known_lock = threading.Lock()
+        self._expire_listeners = []
+        self._sweeper_started = False
+
+    def _remember(self, code):
+        with self._known_lock:
+            self._known.add(code)
+
+    @staticmethod
+    def _keys(code):
+        return f"lobby:{code}", f"lobby:{code}:players", f"lobby:{code}:sids"
+
+    @staticmethod
+    def _event_keys(code):
+        return f"lobby:{code}:seq", f"lobby:{code}:events"
+
+    @staticmethod
+    def _version_key(code):
+        return f"lobby:{code}:version"
+
+    @staticmethod
+    def _sid_key(sid):
+        return f"sid:{sid}:rooms"
+
+    @staticmethod
+    def _player_key(user_id, sid):
+        # user_id e sid hanno spazi di chiavi separati
+        return f"u:{user_id}" if user_id is not None else f"s:{sid}"
+
+    def _touch(self, pipe, code, has_players):
+        ttl = self.idle_ttl if has_players else self.empty_ttl
+        for key in self._keys(code) + self._event_keys(code) + (self._version_key(code),):
+            pipe.expire(key, ttl)
+
+    def create(self, code, quiz_id):
+        lobby_key, _, _ = self._keys(code)
+        if not self.client.hsetnx(lobby_key, "quiz_id", quiz_id):
+            return False
+        self.client.expire(lobby_key, self.empty_ttl)
+        self._remember(code)
+        return True
+
+    def exists(self, code):
+        return bool(self.client.exists(self._keys(code)[0]))
+
+    def get_quiz_id(self, code):
+        quiz_id = self.client.hget(self._keys(code)[0], "quiz_id")
+        return int(quiz_id) if quiz_id is not None else None
+
+    def join(self, code, username, user_id, sid):
+        lobby_key, players_key, sids_key = self._keys(code)
+        if not self.client.exists(lobby_key):
+            return False
+
+        key = self._player_key(user_id, sid)
+        previous = self.client.hget(players_key, key)
+        player = {'sid': sid, 'username': username, 'user_id': user_id, 'id': player_id(user_id, sid)}
+
+        pipe = self.client.pipeline(transaction=True)
+        if previous is not None:
+            previous_sid = json.loads(previous)['sid']
+            if previous_sid != sid:
+                pipe.hdel(sids_key, previous_sid)
+                pipe.srem(self._sid_key(previous_sid), code)
+        pipe.hset(players_key, key, json.dumps(player))
+        pipe.hset(sids_key, sid, key)
+        pipe.sadd(self._sid_key(sid), code)
+        pipe.expire(self._sid_key(sid), self.idle_ttl)
+        self._touch(pipe, code, True)
+        pipe.execute()
+        self._remember(code)
+        return True
+
+    def leave(self, code, sid):
+        lobby_key, players_key, sids_key = self._keys(code)
+        key = self.client.hget(sids_key, sid)
+        self.client.srem(self._sid_key(sid), code)
+        if key is None:
+            return None
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hget(players_key, key)
+        pipe.hdel(players_key, key)
+        pipe.hdel(sids_key, sid)
+        pipe.hlen(players_key)
+        raw, _, _, remaining = pipe.execute()
+
+        if self.client.exists(lobby_key):
+            pipe = self.client.pipeline(transaction=False)
+            self._touch(pipe, code, remaining > 0)
+            pipe.execute()
+        return json.loads(raw) if raw is not None else None
+
+    def rebind(self, code, old_sid, new_sid):
+        _, players_key, sids_key = self._keys(code)
+        # WATCH sulla lobby: se tra lettura e scrittura un altro resume con lo stesso
+        # token (o un join/leave) la modifica, la transazione non viene applicata e si
+        # rilegge. Solo il primo trova ancora old_sid: il token vale una volta sola.
+        with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(sids_key, players_key)
+                    key = pipe.hget(sids_key, old_sid)
+                    raw = pipe.hget(players_key, key) if key is not None else None
+                    if raw is None:
+                        pipe.unwatch()
+                        return None
+                    player = {**json.loads(raw), 'sid': new_sid}
+
+                    pipe.multi()
+                    pipe.hdel(sids_key, old_sid)
+                    pipe.hset(sids_key, new_sid, key)
+                    pipe.hset(players_key, key, json.dumps(player))
+                    pipe.srem(self._sid_key(old_sid), code)
+                    pipe.sadd(self._sid_key(new_sid), code)
+                    pipe.expire(self._sid_key(new_sid), self.idle_ttl)
+                    self._touch(pipe, code, True)
+                    pipe.execute()
+                    self._remember(code)
+                    return player
+                except WatchError:
+                    continue
+
+    def remove_sid(self, sid):
+        removed = []
+        for code in self.client.smembers(self._sid_key(sid)):
+            player = self.leave(code, sid)
+            if player is not None:
+                removed.append((code, player))
+        self.client.delete(self._sid_key(sid))
+        return removed
+
+    def rooms_of(self, sid):
+        return set(self.client.smembers(self._sid_key(sid)))
+
+    def get_player(self, code, sid):
+        _, players_key, sids_key = self._keys(code)
+        # Chiamato a ogni evento del giocatore (risposte, rate limit): rinnova il set del sid
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(sids_key, sid)
+        pipe.expire(self._sid_key(sid), self.idle_ttl)
+        key, _ = pipe.execute()
+        raw = self.client.hget(players_key, key) if key is not None else None
+        return json.loads(raw) if raw is not None else None
+
+    def players(self, code):
+        return [json.loads(raw) for raw in self.client.hvals(self._keys(code)[1])]
+
+    def count(self, code):
+        return self.client.hlen(self._keys(code)[1])
+
+    def delete(self, code):
+        _, _, sids_key = self._keys(code)
+        pipe = self.client.pipeline(transaction=True)
+        for sid in self.client.hkeys(sids_key):
+            pipe.srem(self._sid_key(sid), code)
+        pipe.delete(*self._keys(code), *self._event_keys(code), self._version_key(code))
+        deleted = bool(pipe.execute()[-1])
+        self._expired(code)
+        return deleted
+
+    def append_event(self, code, event, payload):
+        if not self.exists(code):
+            return None
+        seq_key, events_key = self._event_keys(code)
+        seq = self.client.incr(seq_key)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(events_key, json.dumps([seq, event, payload]))
+        pipe.ltrim(events_key, -EVENT_LOG_SIZE, -1)
+        self._touch(pipe, code, self.count(code) > 0)
+        pipe.execute()
+        return seq
+
+    def events_since(self, code, seq):
+        if not self.exists(code):
+            return [], False
+        seq_key, events_key = self._event_keys(code)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(seq_key)
+        pipe.lrange(events_key, 0, -1)
+        last, raw_events = pipe.execute()
+        entries = [tuple(json.loads(raw)) for raw in raw_events]
+        return select_events(entries, seq, int(last or 0))
+
+    def last_event_seq(self, code):
+        return int(self.client.get(self._event_keys(code)[0]) or 0)
+
+    def next_players_version(self, code):
+        if not self.exists(code):
+            return None
+        version_key = self._version_key(code)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(version_key)
+        pipe.expire(version_key, self.idle_ttl)
+        return pipe.execute()[0]
+
+    def players_version(self, code):
+        return int(self.client.get(self._version_key(code)) or 0)
+
+    def revoke_session(self, jti, ttl):
+        self.client.set(f"session:{jti}:revoked", 1, ex=int(ttl))
+
+    def is_session_revoked(self, jti):
+        return bool(self.client.exists(f"session:{jti}:revoked"))
+
+    def _expired(self, code):
+        with self._known_lock:
+            if code not in self._known:
+                return
+            self._known.discard(code)
+        for listener in self._expire_listeners:
+            listener(code)
+
+    def add_expire_listener(self, listener):
+        """listener(code) viene chiamato per ogni lobby eliminata o scaduta usata da questo processo"""
+        self._expire_listeners.append(listener)
+
+    def expire_idle(self):
+        """Avvisa i listener delle lobby scadute su Redis e ritorna i loro codici"""
+        with self._known_lock:
+            codes = list(self._known)
+        if not codes:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for code in codes:
+            pipe.exists(self._keys(code)[0])
+        expired = [code for code, exists in zip(codes, pipe.execute()) if not exists]
+        for code in expired:
+            self._expired(code)
+        return expired
+
+    def start_sweeper(self, socketio, interval=SWEEP_INTERVAL):
+        if self._sweeper_started:
+            return
+        self._sweeper_started = True
+
+        def sweep():
+            while True:
+                socketio.sleep(interval)
+                try:
+                    expired = self.expire_idle()
+                    if expired:
+                        logger.info("Lobby scadute: %d", len(expired))
+                except Exception as e:
+                    logger.error("Controllo delle lobby scadute fallito: %s", e)
+
+        socketio.start_background_task(sweep)
@@ -0,0 +1,51 @@
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from database import create_flask_app
+from services.metrics_service import metrics
+
+# Token di resume: firmati con SECRET_KEY, contengono codice lobby e sid della
+# connessione che li ha ricevuti. Dopo una disconnessione il giocatore resta nella
+# lobby per RESUME_GRACE secondi; con il token la nuova connessione prende il suo
+# posto. Non serve salvarli: dopo il resume il vecchio sid non è più collegato
+# a nessun giocatore, quindi ogni token vale una volta sola.
+
+RESUME_GRACE = 30
+RESUME_TOKEN_MAX_AGE = 2 * 60 * 60
+RESUME_SALT = "resume"
+
+resume_attempts = metrics.counter(
+    "socketio_resume_total", "Tentativi di resume delle sessioni Socket.IO", ("outcome",))
+replayed_events = metrics.counter(
+    "socketio_replayed_events_total", "Eventi di room inviati di nuovo dopo un resume", ())
+
+class ResumeTokens:
+    def __init__(self, secret_key, max_age=RESUME_TOKEN_MAX_AGE):
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=RESUME_SALT)
+        self.max_age = max_age
+
+    def issue(self, code, sid):
+        return self._serializer.dumps({"code": code, "sid": sid})
+
+    def verify(self, token, code):
+        """sid originale del token se valido per questa lobby, altrimenti None"""
+        if not isinstance(token, str):
+            return None
+        try:
+            data = self._serializer.loads(token, max_age=self.max_age)
+        except (BadSignature, SignatureExpired):
+            return None
+        if data.get("code") != code:
+            return None
+        return data.get("sid")
+
+_resume_tokens = None
+
+def get_resume_tokens():
+    global _resume_tokens
+    if _resume_tokens is None:
+        _resume_tokens = ResumeTokens(create_flask_app().config['SECRET_KEY'])
+    return _resume_tokens
+
+def __getattr__(name):
+    if name == 'resume_tokens':
+        return get_resume_tokens()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,101 @@
+from database import read_session
+from services.quiz_service import clamp_page_size, INVALID_CURSOR
+from sqlalchemy import text, DateTime
+import base64
+import re
+
+# Ricerca full-text sui quiz tramite gli indici FTS5 quiz_fts e domanda_fts (vedi models.py).
+# Ogni termine è cercato come prefisso ("cap" trova "capitale") e tutti i termini devono
+# comparire nel nome del quiz o nella stessa domanda. Il punteggio è la somma dei bm25 delle
+# corrispondenze, con più peso al nome; i risultati sono paginati con cursore su (punteggio, id).
+
+NAME_WEIGHT = 3.0
+MAX_TERMS = 8
+MIN_PREFIX_LENGTH = 2  # i prefissi più corti sono troppo generici per l'indice
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+SEARCH_SQL = """
+WITH hits AS (
+    SELECT rowid AS quiz_id, bm25(quiz_fts) * :name_weight AS score
+    FROM quiz_fts WHERE quiz_fts MATCH :match
+    UNION ALL
+    SELECT d.quiz_id, bm25(domanda_fts) AS score
+    FROM domanda_fts JOIN domanda d ON d.id = domanda_fts.rowid
+    WHERE domanda_fts MATCH :match
+),
+ranked AS (
+    SELECT quiz_id, SUM(score) AS score, COUNT(*) AS matches FROM hits GROUP BY quiz_id
+)
+SELECT r.quiz_id, r.score, r.matches, q.nome, q.data, q.user_id
+FROM ranked r JOIN quiz q ON q.id = r.quiz_id
+WHERE :after_score IS NULL OR r.score > :after_score OR (r.score = :after_score AND r.quiz_id > :after_id)
+ORDER BY r.score, r.quiz_id
+LIMIT :limit
+"""
+
+def build_match_query(query):
+    """
+    Converte il testo dell'utente in una query FTS5 sicura: solo parole,
+    ognuna tra virgolette e con * per il prefisso. None se non resta nessun termine.
+    """
+    terms = [t for t in TERM_PATTERN.findall(query or "") if len(t) >= MIN_PREFIX_LENGTH][:MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+def encode_search_cursor(score, quiz_id):
+    raw = f"{score!r}|{quiz_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_search_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        score, quiz_id = raw.rsplit("|", 1)
+        return float(score), int(quiz_id)
+    except Exception:
+        raise ValueError(INVALID_CURSOR)
+
+def search_quizzes(query, limit=None, cursor=None):
+    """
+    Ritorna (quizzes, next_cursor) ordinati per rilevanza; solleva ValueError
+    per un cursore non valido.
+    """
+    limit = clamp_page_size(limit)
+    match = build_match_query(query)
+    if match is None:
+        return [], None
+
+    after_score, after_id = decode_search_cursor(cursor) if cursor else (None, None)
+    with read_session() as session:
+        rows = session.execute(text(SEARCH_SQL).columns(data=DateTime), {
+            "match": match,
+            "name_weight": NAME_WEIGHT,
+            "after_score": after_score,
+            "after_id": after_id,
+            "limit": limit + 1  # una riga in più per sapere se esiste una pagina successiva
+        }).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1].score, rows[-1].quiz_id)
+
+    quizzes = [{
+        "id": row.quiz_id,
+        "nome": row.nome,
+        "data": row.data.isoformat(),
+        "user_id": row.user_id,
+        "score": round(-row.score, 4),
+        "matches": row.matches
+    } for row in rows]
+    return quizzes, next_cursor
+
+def get_search_results(query, limit=None, cursor=None):
+    try:
+        quizzes, next_cursor = search_quizzes(query, limit, cursor)
+        return quizzes, next_cursor, "Ricerca completata"
+    except ValueError as e:
+        return None, None, str(e)
+    except Exception as e:
+        return None, None, f"Errore nella ricerca dei quiz: {str(e)}"
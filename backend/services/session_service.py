@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from flask import request
+from database import create_flask_app
+from services.lobby_service import get_lobby_store
+import secrets
+import threading
+import time
+
+# Token di sessione firmati con SECRET_KEY: contengono user_id e username,
+# quindi la verifica non richiede il database. I token già visti restano
+# in una cache LRU per evitare anche il controllo della firma.
+# Le revoche (logout) stanno nello store delle lobby, condiviso tra i worker con
+# LOBBY_BACKEND=redis: vanno controllate anche per i token in cache, perché il
+# logout può essere arrivato a un altro worker.
+
+TOKEN_MAX_AGE = 7 * 24 * 60 * 60
+TOKEN_CACHE_SIZE = 10000
+TOKEN_SALT = "session"
+
+class SessionTokens:
+    def __init__(self, secret_key, revocations, max_age=TOKEN_MAX_AGE, cache_size=TOKEN_CACHE_SIZE):
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+        self._revocations = revocations  # LobbyStore
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # token -> (scadenza, sessione)
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.revoked = 0
+
+    def issue(self, user_id, username):
+        session = {"user_id": user_id, "username": username, "jti": secrets.token_urlsafe(8)}
+        token = self._serializer.dumps(session)
+        self._remember(token, time.time() + self.max_age, session)
+        return token
+
+    def _remember(self, token, expires_at, session):
+        with self._lock:
+            self._cache[token] = (expires_at, session)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def verify(self, token):
+        """Ritorna la sessione {user_id, username, jti} o None se il token non è valido"""
+        if not token:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None and entry[0] <= now:
+                del self._cache[token]
+                entry = None
+            if entry is not None:
+                self._cache.move_to_end(token)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+        if entry is not None:
+            session = entry[1]
+        else:
+            try:
+                session, signed_at = self._serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+            except (BadSignature, SignatureExpired):
+                return None
+        if self._revocations.is_session_revoked(session.get("jti")):
+            with self._lock:
+                self._cache.pop(token, None)
+            return None
+        if entry is None:
+            self._remember(token, signed_at.timestamp() + self.max_age, session)
+        return session
+
+    def revoke(self, token):
+        session = self.verify(token)
+        if session is None:
+            return False
+        self._revocations.revoke_session(session["jti"], self.max_age)
+        with self._lock:
+            self._cache.pop(token, None)
+            self.revoked += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "revoked": self.revoked,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses
+            }
+
+_session_tokens = None
+_tokens_lock = threading.Lock()
+
+def get_session_tokens():
+    """Creati al primo uso: servono SECRET_KEY e lo store delle lobby"""
+    global _session_tokens
+    with _tokens_lock:
+        if _session_tokens is None:
+            _session_tokens = SessionTokens(create_flask_app().config['SECRET_KEY'], get_lobby_store())
+        return _session_tokens
+
+def __getattr__(name):
+    if name == 'session_tokens':
+        return get_session_tokens()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_request_token():
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        return header[len("Bearer "):].strip()
+    return None
+
+def get_current_session():
+    return get_session_tokens().verify(get_request_token())
@@ -0,0 +1,185 @@
+from database import create_flask_app, read_session
+from models import Quiz, Domanda, Opzione
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Copia in memoria di un quiz e delle sue domande, caricata alla creazione della
+# lobby con una sola query. Tutte le lobby dello stesso quiz condividono la stessa
+# copia, che viene scartata quando l'ultima lobby che la usa viene eliminata:
+# durante la partita il motore di gioco non legge mai il database.
+# La copia è immutabile, quindi una modifica al quiz vale dalle lobby successive.
+
+SWEEP_INTERVAL = 30
+
+class _Frozen:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} è immutabile")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} è immutabile")
+
+class QuestionSnapshot(_Frozen):
+    __slots__ = ("id", "testo", "options", "correct_index")
+
+    def __init__(self, question_id, testo, options, correct_index):
+        object.__setattr__(self, "id", question_id)
+        object.__setattr__(self, "testo", testo)
+        object.__setattr__(self, "options", tuple(options))
+        object.__setattr__(self, "correct_index", correct_index)
+
+class QuizSnapshot(_Frozen):
+    __slots__ = ("quiz_id", "nome", "questions")
+
+    def __init__(self, quiz_id, nome, questions):
+        object.__setattr__(self, "quiz_id", quiz_id)
+        object.__setattr__(self, "nome", nome)
+        object.__setattr__(self, "questions", tuple(questions))
+
+def load_quiz_snapshot(quiz_id):
+    """Quiz, domande e opzioni con una sola query; None se il quiz non esiste"""
+    with create_flask_app().app_context():
+        with read_session() as session:
+            rows = session.query(Quiz.nome, Domanda.id, Domanda.testo, Domanda.indice_corretto, Opzione.testo) \
+                .outerjoin(Domanda, Domanda.quiz_id == Quiz.id) \
+                .outerjoin(Opzione, Opzione.domanda_id == Domanda.id) \
+                .filter(Quiz.id == quiz_id) \
+                .order_by(Domanda.id, Opzione.posizione) \
+                .all()
+    if not rows:
+        return None
+
+    questions = []
+    current = None
+    for _, question_id, testo, correct_index, option in rows:
+        if question_id is None:
+            continue
+        if current is None or current[0] != question_id:
+            current = (question_id, testo, correct_index, [])
+            questions.append(current)
+        if option is not None:
+            current[3].append(option)
+    return QuizSnapshot(quiz_id, rows[0][0], [
+        QuestionSnapshot(question_id, testo, options, correct_index)
+        for question_id, testo, correct_index, options in questions
+    ])
+
+class QuizSnapshots:
+    """
+    Copie dei quiz per lobby: il conteggio dei riferimenti è il numero di lobby
+    collegate, a zero la copia viene rimossa. I caricamenti concorrenti dello
+    stesso quiz aspettano una sola query.
+    """
+
+    def __init__(self, loader=load_quiz_snapshot):
+        self.loader = loader
+        self._snapshots = {}  # quiz_id -> [snapshot, riferimenti]
+        self._lobbies = {}    # codice lobby -> quiz_id
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self._sweeper_started = False
+        self.loads = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def _acquire(self, quiz_id):
+        with self._lock:
+            entry = self._snapshots.get(quiz_id)
+            if entry is not None:
+                entry[1] += 1
+                self.shared += 1
+                return entry[0]
+            load_lock = self._load_locks.setdefault(quiz_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._snapshots.get(quiz_id)
+                if entry is not None:
+                    entry[1] += 1
+                    self.shared += 1
+                    return entry[0]
+            snapshot = self.loader(quiz_id)
+            with self._lock:
+                self._load_locks.pop(quiz_id, None)
+                if snapshot is None:
+                    return None
+                self._snapshots[quiz_id] = [snapshot, 1]
+                self.loads += 1
+                return snapshot
+
+    def attach(self, code, quiz_id):
+        """Collega la lobby alla copia del quiz (caricandola se serve); None se il quiz non esiste"""
+        with self._lock:
+            if code in self._lobbies:
+                return self._snapshots[self._lobbies[code]][0]
+        snapshot = self._acquire(quiz_id)
+        if snapshot is None:
+            return None
+        with self._lock:
+            if code in self._lobbies:
+                # Collegata nel frattempo da un'altra richiesta: il riferimento in più va restituito
+                self._release(quiz_id)
+            else:
+                self._lobbies[code] = quiz_id
+        return snapshot
+
+    def _release(self, quiz_id):
+        entry = self._snapshots.get(quiz_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._snapshots[quiz_id]
+            self.evictions += 1
+
+    def detach(self, code):
+        """Da chiamare quando la lobby viene eliminata"""
+        with self._lock:
+            quiz_id = self._lobbies.pop(code, None)
+            if quiz_id is not None:
+                self._release(quiz_id)
+
+    def for_lobby(self, code):
+        with self._lock:
+            quiz_id = self._lobbies.get(code)
+            return self._snapshots[quiz_id][0] if quiz_id is not None else None
+
+    def prune(self, exists):
+        """Scollega le lobby che non esistono più (con Redis scadono senza notifiche)"""
+        with self._lock:
+            codes = list(self._lobbies)
+        stale = [code for code in codes if not exists(code)]
+        for code in stale:
+            self.detach(code)
+        return stale
+
+    def start_sweeper(self, socketio, exists, interval=SWEEP_INTERVAL):
+        if self._sweeper_started:
+            return
+        self._sweeper_started = True
+
+        def sweep():
+            while True:
+                socketio.sleep(interval)
+                try:
+                    self.prune(exists)
+                except Exception as e:
+                    logger.error("Pulizia delle copie dei quiz fallita: %s", e)
+
+        socketio.start_background_task(sweep)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "quizzes": len(self._snapshots),
+                "lobbies": len(self._lobbies),
+                "questions": sum(len(entry[0].questions) for entry in self._snapshots.values()),
+                "loads": self.loads,
+                "shared": self.shared,
+                "evictions": self.evictions
+            }
+
+quiz_snapshots = QuizSnapshots()
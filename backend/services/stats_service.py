@@ -0,0 +1,163 @@
+from database import read_session
+from models import (User, Quiz, StatisticheQuiz, StatisticheDomanda, StatisticheUtente,
+                    StatisticheQuizUtente)
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Statistiche materializzate: ogni flush delle risposte aggiorna gli aggregati
+# per quiz, domanda, utente e (quiz, utente) nella stessa transazione degli insert
+# su Risposta. Le letture sono per chiave primaria o sugli indici delle classifiche,
+# quindi non dipendono dal numero di risposte registrate.
+
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+COUNTERS = ("risposte", "corrette", "punti")
+QUIZ_NOT_FOUND = "Quiz non trovato"
+USER_NOT_FOUND = "Utente non trovato"
+
+def _add(aggregates, key, row, extra=None):
+    counters = aggregates.get(key)
+    if counters is None:
+        counters = aggregates[key] = dict(extra or {}, risposte=0, corrette=0, punti=0)
+    counters["risposte"] += 1
+    counters["corrette"] += 1 if row.get("corretta") else 0
+    counters["punti"] += row.get("punti") or 0
+
+def _upsert(session, model, keys, rows, counters=COUNTERS):
+    """Insert multiplo che in caso di conflitto somma i contatori a quelli esistenti"""
+    if not rows:
+        return
+    stmt = sqlite_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: getattr(model, name) + stmt.excluded[name] for name in counters}
+    )
+    session.execute(stmt, rows)
+
+def apply_answer_rows(session, rows):
+    """Aggiorna gli aggregati con le righe Risposta appena inserite (senza commit)"""
+    per_quiz, per_question, per_user, per_player = {}, {}, {}, {}
+    for row in rows:
+        _add(per_quiz, row["quiz_id"], row)
+        _add(per_user, row["user_id"], row)
+        _add(per_player, (row["quiz_id"], row["user_id"]), row)
+        if row.get("domanda_id") is not None:
+            _add(per_question, row["domanda_id"], row, {"quiz_id": row["quiz_id"]})
+
+    # Le coppie (quiz, utente) nuove sono i giocatori da aggiungere al quiz
+    existing = set(session.execute(
+        select(StatisticheQuizUtente.quiz_id, StatisticheQuizUtente.user_id)
+        .where(tuple_(StatisticheQuizUtente.quiz_id, StatisticheQuizUtente.user_id).in_(list(per_player)))
+    ).all())
+    for quiz_id, user_id in per_player:
+        per_quiz[quiz_id].setdefault("giocatori", 0)
+        if (quiz_id, user_id) not in existing:
+            per_quiz[quiz_id]["giocatori"] += 1
+
+    _upsert(session, StatisticheQuizUtente, ["quiz_id", "user_id"],
+            [dict(c, quiz_id=k[0], user_id=k[1]) for k, c in per_player.items()])
+    _upsert(session, StatisticheQuiz, ["quiz_id"],
+            [dict(c, quiz_id=k) for k, c in per_quiz.items()], COUNTERS + ("giocatori",))
+    _upsert(session, StatisticheDomanda, ["domanda_id"],
+            [dict(c, domanda_id=k) for k, c in per_question.items()])
+    _upsert(session, StatisticheUtente, ["user_id"],
+            [dict(c, user_id=k) for k, c in per_user.items()])
+
+REBUILD_STATEMENTS = [
+    "DELETE FROM statistiche_quiz_utente",
+    "DELETE FROM statistiche_quiz",
+    "DELETE FROM statistiche_domanda",
+    "DELETE FROM statistiche_utente",
+    """INSERT INTO statistiche_quiz_utente (quiz_id, user_id, risposte, corrette, punti)
+       SELECT quiz_id, user_id, COUNT(*), SUM(CASE WHEN corretta THEN 1 ELSE 0 END), SUM(punti)
+       FROM risposta GROUP BY quiz_id, user_id""",
+    """INSERT INTO statistiche_quiz (quiz_id, risposte, corrette, punti, giocatori)
+       SELECT quiz_id, SUM(risposte), SUM(corrette), SUM(punti), COUNT(*)
+       FROM statistiche_quiz_utente GROUP BY quiz_id""",
+    """INSERT INTO statistiche_utente (user_id, risposte, corrette, punti)
+       SELECT user_id, SUM(risposte), SUM(corrette), SUM(punti)
+       FROM statistiche_quiz_utente GROUP BY user_id""",
+    """INSERT INTO statistiche_domanda (domanda_id, quiz_id, risposte, corrette, punti)
+       SELECT r.domanda_id, d.quiz_id, COUNT(*), SUM(CASE WHEN r.corretta THEN 1 ELSE 0 END), SUM(r.punti)
+       FROM risposta r JOIN domanda d ON d.id = r.domanda_id GROUP BY r.domanda_id""",
+]
+
+def rebuild_stats(conn):
+    """Ricalcola da zero tutti gli aggregati da Risposta (backfill) nella transazione di conn"""
+    for statement in REBUILD_STATEMENTS:
+        conn.execute(text(statement))
+    return {
+        table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        for table in ("statistiche_quiz", "statistiche_domanda", "statistiche_utente", "statistiche_quiz_utente")
+    }
+
+def _summary(stats):
+    answers = stats.risposte if stats else 0
+    correct = stats.corrette if stats else 0
+    points = stats.punti if stats else 0
+    return {
+        "answers": answers,
+        "correct": correct,
+        "accuracy": round(correct / answers, 4) if answers else 0.0,
+        "points": points,
+        "average_points": round(points / answers, 2) if answers else 0.0
+    }
+
+def _ranking(rows, offset=0):
+    return [{"rank": offset + i, "user_id": user_id, "username": username, "score": score}
+            for i, (user_id, username, score) in enumerate(rows, start=1)]
+
+def clamp_leaderboard_size(limit):
+    if limit is None:
+        return LEADERBOARD_SIZE
+    return max(1, min(int(limit), MAX_LEADERBOARD_SIZE))
+
+def get_quiz_stats(quiz_id, limit=None):
+    try:
+        with read_session() as session:
+            stats = session.get(StatisticheQuiz, quiz_id)
+            if stats is None and session.get(Quiz, quiz_id) is None:
+                return None, QUIZ_NOT_FOUND
+            questions = session.query(StatisticheDomanda) \
+                .filter(StatisticheDomanda.quiz_id == quiz_id) \
+                .order_by(StatisticheDomanda.domanda_id).all()
+            top = session.query(StatisticheQuizUtente.user_id, User.username, StatisticheQuizUtente.punti) \
+                .join(User, User.id == StatisticheQuizUtente.user_id) \
+                .filter(StatisticheQuizUtente.quiz_id == quiz_id) \
+                .order_by(StatisticheQuizUtente.punti.desc(), StatisticheQuizUtente.user_id) \
+                .limit(clamp_leaderboard_size(limit)).all()
+            result = dict(_summary(stats), quiz_id=quiz_id, players=stats.giocatori if stats else 0)
+            result["questions"] = [dict(_summary(q), question_id=q.domanda_id) for q in questions]
+            result["leaderboard"] = _ranking(top)
+            return result, "Statistiche del quiz recuperate"
+    except Exception as e:
+        return None, f"Errore nel recupero delle statistiche del quiz: {str(e)}"
+
+def get_user_stats(user_id):
+    try:
+        with read_session() as session:
+            stats = session.get(StatisticheUtente, user_id)
+            if stats is None and session.get(User, user_id) is None:
+                return None, USER_NOT_FOUND
+            result = dict(_summary(stats), user_id=user_id, rank=None)
+            if stats is not None:
+                # Posizione nella classifica generale: conteggio sull'indice (punti, user_id)
+                ahead = session.query(StatisticheUtente).filter(
+                    (StatisticheUtente.punti > stats.punti) |
+                    ((StatisticheUtente.punti == stats.punti) & (StatisticheUtente.user_id < user_id))
+                ).count()
+                result["rank"] = ahead + 1
+            return result, "Statistiche dell'utente recuperate"
+    except Exception as e:
+        return None, f"Errore nel recupero delle statistiche dell'utente: {str(e)}"
+
+def get_leaderboard(limit=None):
+    try:
+        with read_session() as session:
+            top = session.query(StatisticheUtente.user_id, User.username, StatisticheUtente.punti) \
+                .join(User, User.id == StatisticheUtente.user_id) \
+                .order_by(StatisticheUtente.punti.desc(), StatisticheUtente.user_id) \
+                .limit(clamp_leaderboard_size(limit)).all()
+            return _ranking(top), "Classifica recuperata"
+    except Exception as e:
+        return None, f"Errore nel recupero della classifica: {str(e)}"
@@ -0,0 +1,52 @@
+from flask import Response
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Risposte JSON in streaming per le liste grandi: le righe arrivano dal database
+# a blocchi (yield_per) e vengono scritte una alla volta in un array JSON, quindi
+# la memoria non dipende dal numero di righe e il primo byte parte subito.
+
+STREAM_BATCH_SIZE = 1000      # righe lette dal cursore per blocco
+STREAM_CHUNK_BYTES = 64 * 1024  # dimensione indicativa dei pezzi inviati al client
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+def iter_json_object(array_key, items, fields=None, trailer=None):
+    """
+    Genera in pezzi di bytes l'oggetto {**fields, array_key: [items...], **trailer(count)}.
+    trailer riceve il numero di elementi scritti: utile per i campi noti solo alla fine.
+    """
+    head = "{" + "".join(f"{_encode(k)}:{_encode(v)}," for k, v in (fields or {}).items())
+    parts = [head, _encode(array_key), ":["]
+    size = 0
+    count = 0
+    try:
+        for item in items:
+            piece = _encode(item) if count == 0 else "," + _encode(item)
+            parts.append(piece)
+            size += len(piece)
+            count += 1
+            if size >= STREAM_CHUNK_BYTES:
+                yield "".join(parts).encode("utf-8")
+                parts, size = [], 0
+    except Exception:
+        # Gli header sono già partiti: si chiude il JSON e si segnala l'errore nel corpo
+        logger.exception("Errore durante lo streaming di '%s'", array_key)
+        parts.append('],"error":"Errore durante la lettura dei dati"}')
+        yield "".join(parts).encode("utf-8")
+        return
+
+    parts.append("]")
+    for k, v in (trailer(count) if trailer else {}).items():
+        parts.append(f",{_encode(k)}:{_encode(v)}")
+    parts.append("}")
+    yield "".join(parts).encode("utf-8")
+
+def stream_json_response(array_key, items, fields=None, trailer=None, status=200):
+    return Response(iter_json_object(array_key, items, fields, trailer),
+                    status=status, mimetype="application/json")
+
+def wants_stream(args):
+    return args.get("stream", "").lower() in ("1", "true", "yes")
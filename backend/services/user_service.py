@@ -1,7 +1,9 @@
-from flask import Flask, request, jsonify
-from database import app, db
+from database import db, read_session
 from models import User
 from datetime import datetime
+from services.password_service import password_hasher, needs_rehash, PasswordPoolBusy
+from services.stream_service import STREAM_BATCH_SIZE
+from sqlalchemy import select
 
 def create_user(username, password):
     try:
@@ -10,19 +12,22 @@ def create_user(username, password):
         if existing_user:
             return None, "Username già esistente"
         
-        # Crea nuovo utente
-        user = User(username=username, password=password)
+        # Crea nuovo utente (l'hash gira nel pool dedicato)
+        user = User(username=username, password=password_hasher.hash(password))
         db.session.add(user)
         db.session.commit()
         
         return user, "Utente creato con successo"
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         db.session.rollback()
         return None, f"Errore nella creazione: {str(e)}"
 
 def get_user_by_id(user_id):
     try:
-        user = User.query.get(user_id)
+        with read_session() as session:
+            user = session.get(User, user_id)
         if user:
             return user, "Utente trovato"
         else:
@@ -33,17 +38,33 @@ def get_user_by_id(user_id):
 def get_all_users():
     """Ottieni tutti gli utenti"""
     try:
-        users = User.query.all()
+        with read_session() as session:
+            users = session.query(User).all()
         return users, f"Trovati {len(users)} utenti"
     except Exception as e:
         return [], f"Errore: {str(e)}"
 
+def iter_users(batch_size=STREAM_BATCH_SIZE):
+    """Utenti come dict, letti a blocchi: per le risposte in streaming"""
+    with read_session() as session:
+        rows = session.execute(
+            select(User.id, User.username).order_by(User.id).execution_options(yield_per=batch_size)
+        )
+        for user_id, username in rows:
+            yield {"id": user_id, "username": username}
+
 def authenticate_user(username, password):
     try:
         user = User.query.filter_by(username=username).first()
-        if user and user.password == password:
+        if user and password_hasher.verify(password, user.password):
+            # Aggiorna le vecchie password in chiaro o con parametri superati
+            if needs_rehash(user.password):
+                user.password = password_hasher.hash(password)
+                db.session.commit()
             return user, "Autenticazione riuscita"
         else:
             return None, "Credenziali non valide"
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         return None, f"Errore nell'autenticazione: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""Configurazione dei test: database SQLite temporaneo, impostato prima di importare l'app."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_fd, DB_PATH = tempfile.mkstemp(prefix="quiz_test_", suffix=".db")
+os.close(_fd)
+os.environ['DATABASE_URL'] = f"sqlite:///{DB_PATH}"
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ['SECRET_KEY'] = 'chiave-dei-test'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+@pytest.fixture(scope="session")
+def database():
+    """Schema aggiornato sul database temporaneo; ritorna (app, db)"""
+    from database import app, db
+    from migrations import upgrade_db
+    upgrade_db()
+    yield app, db
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+@pytest.fixture(scope="session")
+def client(database):
+    """Client HTTP dell'app completa (route e servizi registrati)"""
+    from app import create_app
+    app, _ = create_app()
+    return app.test_client()
+
+@pytest.fixture
+def author(database):
+    """Utente a cui intestare i quiz importati"""
+    app, db = database
+    from models import User
+    with app.app_context():
+        user = User(username=f"autore{User.query.count() + 1}", password="x")
+        db.session.add(user)
+        db.session.commit()
+        return user.id
@@ -0,0 +1,119 @@
+import types
+
+import pytest
+
+import services.cache_service as cache_service
+from services.cache_service import PayloadCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_service, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+class Loader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+def test_entries_expire_after_ttl(clock):
+    cache = PayloadCache(ttl=10)
+    loader = Loader(b"v1")
+    assert cache.get_or_load(1, loader) == b"v1"
+    clock[0] += 9
+    assert cache.get_or_load(1, loader) == b"v1"
+    assert loader.calls == 1
+
+    clock[0] += 2
+    loader.value = b"v2"
+    assert cache.get_or_load(1, loader) == b"v2"
+    assert loader.calls == 2
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PayloadCache(max_size=2)
+    loaders = {key: Loader(key.encode()) for key in "abc"}
+    cache.get_or_load("a", loaders["a"])
+    cache.get_or_load("b", loaders["b"])
+    cache.get_or_load("a", loaders["a"])  # "a" diventa la più recente
+    cache.get_or_load("c", loaders["c"])  # esce "b"
+
+    cache.get_or_load("a", loaders["a"])
+    cache.get_or_load("b", loaders["b"])
+    assert loaders["a"].calls == 1
+    assert loaders["b"].calls == 2
+    assert cache.stats()["evictions"] == 2
+
+def test_invalidate_during_a_load_does_not_store_the_stale_payload():
+    cache = PayloadCache()
+
+    def stale():
+        cache.invalidate(1)  # scrittura concorrente durante la lettura
+        return b"vecchio"
+    assert cache.get_or_load(1, stale) == b"vecchio"
+    assert cache.get_or_load(1, Loader(b"nuovo")) == b"nuovo"
+
+def test_none_is_not_cached():
+    cache = PayloadCache()
+    assert cache.get_or_load(1, Loader(None)) is None
+    assert cache.get_or_load(1, Loader(b"creato")) == b"creato"
+
+@pytest.fixture
+def quiz(database, author):
+    app, _ = database
+    from services.quiz_service import create_quiz
+    with app.app_context():
+        created, message = create_quiz(author, "Cache", [
+            {"text": "Capitale d'Italia?", "options": ["Roma", "Milano"], "correctAnswer": 0}])
+        assert created is not None, message
+        return created.id, author
+
+def get_quiz(client, quiz_id, user_id=None):
+    from services.session_service import get_session_tokens
+    headers = {"Authorization": f"Bearer {get_session_tokens().issue(user_id, 'utente')}"} if user_id else {}
+    response = client.get(f"/api/quiz/{quiz_id}", headers=headers)
+    return response.status_code, response.get_json()
+
+def has_answers(body):
+    return all("correct_index" in question for question in body["quiz"]["questions"])
+
+def test_cached_owner_payload_is_never_served_to_others(client, quiz):
+    quiz_id, owner = quiz
+    # Prima richiesta dell'autore: in cache finisce anche la versione con le risposte
+    status, body = get_quiz(client, quiz_id, owner)
+    assert status == 200 and has_answers(body)
+
+    for viewer in (None, owner + 1000):
+        status, body = get_quiz(client, quiz_id, viewer)
+        assert status == 200
+        assert not any("correct_index" in question for question in body["quiz"]["questions"])
+
+    assert has_answers(get_quiz(client, quiz_id, owner)[1])
+
+def test_writes_invalidate_the_cached_payload(client, database, quiz):
+    app, db = database
+    from models import Quiz, Domanda, Opzione
+    from services.cache_service import quiz_payload_cache
+    quiz_id, owner = quiz
+    assert get_quiz(client, quiz_id)[1]["quiz"]["nome"] == "Cache"
+
+    # Modifica: chi scrive sul quiz invalida la voce, la lettura successiva è aggiornata
+    with app.app_context():
+        db.session.get(Quiz, quiz_id).nome = "Cache modificata"
+        db.session.commit()
+    assert get_quiz(client, quiz_id)[1]["quiz"]["nome"] == "Cache"
+    quiz_payload_cache.invalidate(quiz_id)
+    assert get_quiz(client, quiz_id)[1]["quiz"]["nome"] == "Cache modificata"
+
+    # Eliminazione: dopo l'invalidazione il quiz non esiste più neanche in cache
+    with app.app_context():
+        question_ids = [d.id for d in Domanda.query.filter_by(quiz_id=quiz_id)]
+        Opzione.query.filter(Opzione.domanda_id.in_(question_ids)).delete()
+        Domanda.query.filter_by(quiz_id=quiz_id).delete()
+        Quiz.query.filter_by(id=quiz_id).delete()
+        db.session.commit()
+    quiz_payload_cache.invalidate(quiz_id)
+    assert get_quiz(client, quiz_id)[0] == 404
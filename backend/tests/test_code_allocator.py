@@ -0,0 +1,58 @@
+import threading
+
+import fakeredis
+import pytest
+
+from services.code_allocator import CodeAllocator
+from services.lobby_store import create_lobby_store
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "redis":
+        return create_lobby_store("redis", client=fakeredis.FakeRedis(decode_responses=True))
+    return create_lobby_store("memory")
+
+def expire_all(store):
+    """Scadenza di tutte le lobby, come dopo EMPTY_LOBBY_TTL"""
+    if hasattr(store, "client"):
+        # Con Redis scadono le chiavi; expire_idle se ne accorge
+        store.client.delete(*store.client.keys("lobby:*"))
+        return store.expire_idle()
+    return store.expire_idle(empty_ttl=-1, idle_ttl=-1)
+
+def test_concurrent_allocations_never_share_a_code(store):
+    # 2^10 codici: con 160 lobby le collisioni tra thread sono praticamente certe
+    allocator = CodeAllocator(store, alphabet="AB", length=10)
+    codes = []
+    lock = threading.Lock()
+    start = threading.Barrier(8)
+
+    def worker():
+        start.wait()
+        for _ in range(20):
+            code = allocator.allocate(1)
+            with lock:
+                codes.append(code)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(codes) == 160
+    assert len(set(codes)) == 160
+    assert all(store.exists(code) for code in codes)
+    assert allocator.allocated == 160
+    assert allocator.retries > 0
+
+def test_code_is_reused_after_its_lobby_expires(store):
+    # Un solo codice possibile: torna libero solo quando la lobby scade
+    allocator = CodeAllocator(store, alphabet="A", length=1)
+    assert allocator.allocate(1) == "A"
+    with pytest.raises(RuntimeError):
+        allocator.allocate(2)
+
+    assert expire_all(store) == ["A"]
+    assert allocator.allocate(2) == "A"
+    assert store.get_quiz_id("A") == 2
@@ -0,0 +1,45 @@
+import pytest
+
+import services.game_service as game_service
+from services.game_service import AnswerBuffer, Game
+from services.snapshot_service import QuizSnapshot, QuestionSnapshot
+
+def answer_row(user_id, n=0):
+    return {'risposta_data': str(n), 'quiz_id': 1, 'user_id': user_id, 'domanda_id': 1,
+            'corretta': False, 'punti': 0}
+
+def test_full_batch_wakes_the_flusher_instead_of_writing(monkeypatch):
+    buffer = AnswerBuffer(batch_size=2)
+    monkeypatch.setattr(buffer, "flush", lambda: pytest.fail("flush nel gestore della risposta"))
+    snapshot = QuizSnapshot(1, "Quiz", [QuestionSnapshot(10, "Italia?", ("Roma", "Milano"), 0)])
+    game = Game("CODICE", snapshot, buffer)
+    game.open_question(0)
+
+    for user_id in (1, 2):
+        result, error = game.submit({'id': user_id, 'user_id': user_id, 'sid': f"s{user_id}", 'username': f"u{user_id}"},
+                                    10, 0)
+        assert error is None
+    assert buffer.pending() == 2
+    # Il flusher viene svegliato subito, senza aspettare FLUSH_INTERVAL
+    assert buffer.wait_full(0)
+
+def test_failed_flush_keeps_at_most_max_pending(database, monkeypatch):
+    def broken(session, rows):
+        raise RuntimeError("database non raggiungibile")
+    monkeypatch.setattr(game_service, "apply_answer_rows", broken)
+    dropped_before = game_service.answers_dropped._values.get((), 0)
+
+    buffer = AnswerBuffer(batch_size=2, max_pending=5)
+    for n in range(4):
+        buffer.add(answer_row(None, n))
+    assert buffer.flush() == 0
+    assert buffer.pending() == 4
+
+    for n in range(4, 8):
+        buffer.add(answer_row(None, n))
+    assert buffer.flush() == 0
+    # Restano le 5 più recenti, le altre sono contate come scartate
+    assert buffer.pending() == 5
+    assert buffer.dropped == 3
+    assert game_service.answers_dropped._values[()] == dropped_before + 3
+    assert [row['risposta_data'] for row in buffer._rows] == ['3', '4', '5', '6', '7']
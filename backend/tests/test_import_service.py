@@ -0,0 +1,71 @@
+import io
+import json
+
+from services.import_service import iter_csv, iter_ndjson, import_quizzes, MAX_CHUNK_SIZE
+
+HEADER = "quiz,user_id,question,option_1,option_2,option_3,option_4,correct\n"
+
+def csv_records(rows):
+    return list(iter_csv(io.StringIO(HEADER + "".join(rows))))
+
+def test_csv_correct_is_one_based():
+    _, record, error = csv_records(["Capitali,1,Italia?,Roma,Milano,Napoli,Torino,1\n"])[0]
+    assert error is None
+    assert record["questions"][0]["correctAnswer"] == 0
+
+def test_csv_correct_by_option_text():
+    _, record, error = csv_records(["Capitali,1,Francia?,Lione,Parigi,,,Parigi\n"])[0]
+    assert error is None
+    assert record["questions"][0]["correctAnswer"] == "Parigi"
+
+def test_csv_numeric_option_text_is_ambiguous():
+    # "2" è option_2 per numero ma il testo di option_3: il quiz viene rifiutato
+    line, record, error = csv_records(["Conti,1,1+1?,1,3,2,4,2\n"])[0]
+    assert record is None
+    assert line == 2
+    assert "ambigua" in error
+
+def test_csv_numeric_option_text_matching_position_is_accepted():
+    _, record, error = csv_records(["Conti,1,1+1?,1,2,3,4,2\n"])[0]
+    assert error is None
+    assert record["questions"][0]["correctAnswer"] == 1
+
+def test_csv_correct_out_of_range():
+    _, record, error = csv_records(["Capitali,1,Italia?,Roma,Milano,,,0\n"])[0]
+    assert record is None
+    assert "fuori intervallo" in error
+
+def test_csv_import_stores_option_1_as_correct(database, author):
+    app, _ = database
+    from models import Quiz, Domanda
+    stream = io.StringIO(HEADER + f"Import CSV,{author},Italia?,Roma,Milano,Napoli,Torino,1\n"
+                                  f"Import CSV,{author},Francia?,Lione,Parigi,,,2\n")
+    with app.app_context():
+        report = import_quizzes(iter_csv(stream))
+        assert report["imported_quizzes"] == 1, report
+        quiz = Quiz.query.filter_by(user_id=author, nome="Import CSV").one()
+        correct = [d.indice_corretto for d in Domanda.query.filter_by(quiz_id=quiz.id).order_by(Domanda.id)]
+    assert correct == [0, 1]
+
+def test_invalid_utf8_mid_stream_is_reported(database, author):
+    app, _ = database
+    line = json.dumps({"title": "Import UTF-8", "user_id": author, "questions": [
+        {"text": "Italia?", "options": ["Roma", "Milano"], "correctAnswer": 0}]}) + "\n"
+    # Oltre il buffer di lettura di TextIOWrapper: l'errore arriva dopo i primi blocchi
+    lines = 20000 // len(line) + 1
+    body = (line * lines).encode() + b'{"title": "\xff\xfe"}\n'
+    stream = io.TextIOWrapper(io.BytesIO(body), encoding="utf-8", newline="")
+    with app.app_context():
+        report = import_quizzes(iter_ndjson(stream), chunk_size=10)
+    # Le righe decodificate insieme ai byte non validi vanno perse, le precedenti no
+    assert 0 < report["imported_quizzes"] < lines
+    assert report["error_count"] == 1
+    assert "UTF-8" in report["errors"][0]["error"]
+
+def test_chunk_size_is_clamped(monkeypatch):
+    sizes = []
+    monkeypatch.setattr("services.import_service._flush_chunk", lambda chunk, report: sizes.append(len(chunk)))
+    records = [(i, {"title": "q", "user_id": 1, "questions": [
+        {"text": "t", "options": ["a", "b"], "correctAnswer": 0}]}, None) for i in range(MAX_CHUNK_SIZE + 1)]
+    import_quizzes(records, chunk_size=10 ** 9)
+    assert sizes == [MAX_CHUNK_SIZE, 1]
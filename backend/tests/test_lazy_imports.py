@@ -0,0 +1,13 @@
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+def test_importing_services_does_not_build_the_app():
+    # Processo nuovo: nei test l'app è già stata creata dalle altre fixture
+    code = ("import database, services.quiz_service, services.search_service, services.user_service, "
+            "services.lobby_service, services.session_service, services.resume_service, "
+            "services.game_service, routes.user_routes, websocket.socket_handlers; "
+            "print(database._app is None)")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "True"
@@ -0,0 +1,28 @@
+import types
+
+import pytest
+
+import services.lobby_registry as lobby_registry
+from services.lobby_registry import LobbyRegistry, IDLE_LOBBY_TTL
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Orologio monotono controllato dal test"""
+    now = [1000.0]
+    monkeypatch.setattr(lobby_registry, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def test_room_events_keep_an_active_lobby_alive(clock):
+    registry = LobbyRegistry()
+    registry.create("ATTIVA", 1)
+    registry.join("ATTIVA", "anna", 1, "sid-anna")
+    registry.create("FERMA", 2)
+    registry.join("FERMA", "bruno", 2, "sid-bruno")
+
+    # Partita in corso: solo eventi di room (domande, risposte), nessun join/leave
+    for _ in range(3):
+        clock[0] += IDLE_LOBBY_TTL / 2
+        registry.append_event("ATTIVA", "question", {"index": 0})
+
+    assert registry.expire_idle() == ["FERMA"]
+    assert registry.exists("ATTIVA")
@@ -0,0 +1,90 @@
+import ast
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+from migrations import LATEST_VERSION
+
+# Schema originale, prima delle migrazioni: opzioni in colonne e risposta corretta come testo
+LEGACY_SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL, password VARCHAR(120) NOT NULL);
+CREATE TABLE quiz (id INTEGER PRIMARY KEY, nome VARCHAR(200) NOT NULL, data DATETIME NOT NULL,
+                   user_id INTEGER NOT NULL REFERENCES user (id));
+CREATE TABLE domanda (id INTEGER PRIMARY KEY, testo VARCHAR(500) NOT NULL,
+                      risposta_1 VARCHAR(200) NOT NULL, risposta_2 VARCHAR(200) NOT NULL,
+                      risposta_3 VARCHAR(200), risposta_4 VARCHAR(200),
+                      risposta_corretta VARCHAR(200) NOT NULL, quiz_id INTEGER NOT NULL REFERENCES quiz (id));
+CREATE TABLE risposta (id INTEGER PRIMARY KEY, risposta_data VARCHAR(200) NOT NULL,
+                       quiz_id INTEGER NOT NULL REFERENCES quiz (id), user_id INTEGER NOT NULL REFERENCES user (id));
+"""
+
+def build_legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany("INSERT INTO user VALUES (?, ?, ?)", [(1, "anna", "x"), (2, "bruno", "y")])
+    conn.executemany("INSERT INTO quiz VALUES (?, ?, ?, ?)", [
+        (1, "Capitali europee", "2024-01-01 10:00:00", 1),
+        (2, "Fiumi", "2024-01-02 10:00:00", 2),
+    ])
+    conn.executemany("INSERT INTO domanda VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+        # Risposta corretta come testo dell'opzione
+        (1, "Capitale della Francia?", "Lione", "Parigi", "Nizza", "Lille", "Parigi", 1),
+        # Opzione 3 nulla: le opzioni vengono compattate, la corretta resta la quarta scritta
+        (2, "Capitale della Spagna?", "Madrid", "Siviglia", None, "Valencia", "Valencia", 1),
+        # Indice 0-based salvato come stringa di cifre
+        (3, "Fiume più lungo d'Italia?", "Tevere", "Po", None, None, "1", 2),
+        # Non riconoscibile: indice_corretto resta NULL
+        (4, "Fiume di Firenze?", "Arno", "Adige", None, None, "Tevere", 2),
+    ])
+    conn.executemany("INSERT INTO risposta (risposta_data, quiz_id, user_id) VALUES (?, ?, ?)", [
+        ("Parigi", 1, 1), ("Madrid", 1, 1), ("Po", 2, 2),
+    ])
+    conn.commit()
+    conn.close()
+
+def upgrade(path):
+    """Migrazioni in un processo separato: l'app dei test usa già un altro database"""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}"}
+    result = subprocess.run([sys.executable, "-c", "from migrations import upgrade_db; print(upgrade_db())"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    return ast.literal_eval(result.stdout.strip().splitlines()[-1])
+
+def test_upgrade_legacy_database(tmp_path):
+    path = str(tmp_path / "quiz_game.db")
+    build_legacy_db(path)
+
+    assert upgrade(path) == list(range(1, LATEST_VERSION + 1))
+    # Una seconda esecuzione non applica più nulla
+    assert upgrade(path) == []
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(domanda)")}
+    assert "indice_corretto" in columns
+    assert not columns & {"risposta_1", "risposta_2", "risposta_3", "risposta_4", "risposta_corretta"}
+    assert dict(conn.execute("SELECT id, indice_corretto FROM domanda")) == {1: 1, 2: 2, 3: 1, 4: None}
+
+    options = {}
+    for domanda_id, posizione, testo in conn.execute(
+            "SELECT domanda_id, posizione, testo FROM opzione ORDER BY domanda_id, posizione"):
+        options.setdefault(domanda_id, []).append((posizione, testo))
+    assert options == {
+        1: [(0, "Lione"), (1, "Parigi"), (2, "Nizza"), (3, "Lille")],
+        2: [(0, "Madrid"), (1, "Siviglia"), (2, "Valencia")],
+        3: [(0, "Tevere"), (1, "Po")],
+        4: [(0, "Arno"), (1, "Adige")],
+    }
+
+    # Statistiche ricalcolate dalle risposte già registrate
+    assert dict(conn.execute("SELECT quiz_id, risposte FROM statistiche_quiz")) == {1: 2, 2: 1}
+
+    # Indice full-text popolato con le righe esistenti (prefissi e accenti)
+    assert [row[0] for row in conn.execute("SELECT rowid FROM quiz_fts WHERE quiz_fts MATCH 'capit*'")] == [1]
+    assert sorted(row[0] for row in conn.execute(
+        "SELECT rowid FROM domanda_fts WHERE domanda_fts MATCH 'fiume'")) == [3, 4]
+    assert [row[0] for row in conn.execute(
+        "SELECT rowid FROM domanda_fts WHERE domanda_fts MATCH 'piu'")] == [3]
+    conn.close()
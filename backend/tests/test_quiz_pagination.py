@@ -0,0 +1,70 @@
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.quiz_service import MAX_PAGE_SIZE
+
+@pytest.fixture
+def quizzes_of(database, author):
+    """Crea count quiz per l'autore; metà con la stessa data, per i pari merito su data"""
+    app, db = database
+    from models import Quiz
+
+    def create(count):
+        start = datetime(2024, 1, 1)
+        with app.app_context():
+            db.session.add_all(Quiz(nome=f"Quiz {n}", user_id=author,
+                                    data=start if n % 2 else start + timedelta(minutes=n))
+                               for n in range(count))
+            db.session.commit()
+            ids = [quiz.id for quiz in Quiz.query.filter_by(user_id=author)
+                   .order_by(Quiz.data.desc(), Quiz.id.desc())]
+        return author, ids
+    return create
+
+def walk(client, url, limit):
+    """Segue next_cursor fino all'ultima pagina; ritorna (id in ordine, numero di pagine)"""
+    ids, pages, cursor = [], 0, None
+    while True:
+        query = f"?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url + query)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body["quizzes"]) <= limit
+        ids.extend(quiz["id"] for quiz in body["quizzes"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+def test_pages_have_no_duplicates_or_gaps(client, quizzes_of):
+    user_id, expected = quizzes_of(11)
+    ids, pages = walk(client, f"/api/user/{user_id}/quizzes", limit=3)
+    assert pages == 4
+    assert ids == expected
+
+def test_exact_multiple_of_the_page_size_ends_with_no_cursor(client, quizzes_of):
+    user_id, expected = quizzes_of(4)
+    ids, pages = walk(client, f"/api/user/{user_id}/quizzes", limit=2)
+    assert ids == expected
+    assert pages == 2
+
+def test_page_size_is_capped(client, quizzes_of):
+    user_id, expected = quizzes_of(MAX_PAGE_SIZE + 5)
+    body = client.get(f"/api/user/{user_id}/quizzes?limit=100000").get_json()
+    assert len(body["quizzes"]) == MAX_PAGE_SIZE
+    assert body["next_cursor"] is not None
+    assert len(client.get(f"/api/user/{user_id}/quizzes?limit=0").get_json()["quizzes"]) == 1
+
+@pytest.mark.parametrize("cursor", [
+    "non-base64!!",
+    base64.urlsafe_b64encode(b"senza separatore").decode(),
+    base64.urlsafe_b64encode(b"non-una-data|12").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T00:00:00|abc").decode(),
+])
+def test_malformed_cursor_is_rejected(client, author, cursor):
+    for url in (f"/api/user/{author}/quizzes", "/api/quizzez"):
+        response = client.get(f"{url}?cursor={cursor}")
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Cursore non valido"
@@ -0,0 +1,109 @@
+import types
+
+import pytest
+from flask import Flask
+
+import services.rate_limit_service as rate_limit_service
+from services.rate_limit_service import RateLimiter, rate_limit
+from app_setup import trust_proxies
+
+@pytest.fixture
+def clock(monkeypatch):
+    # conftest disattiva il rate limit per gli altri test
+    monkeypatch.setattr(rate_limit_service, "ENABLED", True)
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit_service, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def test_burst_is_exhausted_then_refilled(clock):
+    limiter = RateLimiter("test", rate=2, burst=3)
+    assert [limiter.allow("k")[0] for _ in range(3)] == [True, True, True]
+
+    allowed, retry_after, first = limiter.allow("k")
+    assert not allowed and first and retry_after == pytest.approx(0.5)
+    # Un solo avviso per raffica
+    assert limiter.allow("k")[2] is False
+
+    clock[0] += 0.5
+    assert limiter.allow("k")[0]
+    assert not limiter.allow("k")[0]
+
+    # Il bucket non supera mai burst, anche dopo una lunga pausa
+    clock[0] += 60
+    assert [limiter.allow("k")[0] for _ in range(4)] == [True, True, True, False]
+
+def test_least_recent_keys_are_dropped_over_max_keys(clock):
+    limiter = RateLimiter("test", rate=1, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        assert limiter.allow(key)[0]
+    assert limiter.stats()["keys"] == 2
+    # "a" è stata scartata: riparte con il bucket pieno
+    assert limiter.allow("a")[0]
+    assert not limiter.allow("c")[0]
+
+def limited_app(per, trusted_proxies=0):
+    app = Flask(__name__)
+    app.config['TRUSTED_PROXIES'] = trusted_proxies
+    trust_proxies(app)
+
+    @app.route("/limited")
+    @rate_limit(per, rate=1, burst=2)
+    def limited():
+        return {"ok": True}
+    return app.test_client()
+
+def test_over_the_limit_responds_429_with_retry_after(clock):
+    client = limited_app("ip")
+    assert [client.get("/limited").status_code for _ in range(2)] == [200, 200]
+
+    response = client.get("/limited")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["error"] == "Troppe richieste, riprova più tardi"
+
+    clock[0] += 1
+    assert client.get("/limited").status_code == 200
+
+def test_each_ip_has_its_own_bucket(clock):
+    client = limited_app("ip")
+    first = {"REMOTE_ADDR": "10.0.0.1"}
+    second = {"REMOTE_ADDR": "10.0.0.2"}
+    for _ in range(2):
+        client.get("/limited", environ_base=first)
+    assert client.get("/limited", environ_base=first).status_code == 429
+    assert client.get("/limited", environ_base=second).status_code == 200
+
+def test_logged_users_behind_the_same_ip_have_their_own_bucket(clock):
+    from services.session_service import get_session_tokens
+    client = limited_app("user")
+    tokens = get_session_tokens()
+    alice = {"Authorization": f"Bearer {tokens.issue(1, 'alice')}"}
+    bruno = {"Authorization": f"Bearer {tokens.issue(2, 'bruno')}"}
+
+    for _ in range(2):
+        client.get("/limited", headers=alice)
+    assert client.get("/limited", headers=alice).status_code == 429
+    assert client.get("/limited", headers=bruno).status_code == 200
+    # Gli anonimi usano il bucket dell'indirizzo, separato da quello degli utenti
+    assert client.get("/limited").status_code == 200
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(clock):
+    client = limited_app("ip")
+    for n in range(2):
+        client.get("/limited", headers={"X-Forwarded-For": f"203.0.113.{n}"})
+    # Cambiare X-Forwarded-For non dà un nuovo bucket: conta l'indirizzo della connessione
+    assert client.get("/limited", headers={"X-Forwarded-For": "203.0.113.99"}).status_code == 429
+
+def test_client_cannot_spoof_addresses_before_the_trusted_proxy(clock):
+    client = limited_app("ip", trusted_proxies=1)
+    proxy = {"REMOTE_ADDR": "10.0.0.1"}
+
+    def get(forwarded_for):
+        return client.get("/limited", environ_base=proxy, headers={"X-Forwarded-For": forwarded_for})
+
+    # Il client aggiunge indirizzi inventati; il proxy fidato aggiunge quello reale in fondo
+    for n in range(2):
+        assert get(f"198.51.100.{n}, 203.0.113.7").status_code == 200
+    assert get("198.51.100.99, 203.0.113.7").status_code == 429
+    # Un altro client reale dietro lo stesso proxy ha il suo bucket
+    assert get("203.0.113.8").status_code == 200
@@ -0,0 +1,38 @@
+import fakeredis
+
+from services.lobby_store import create_lobby_store
+
+def redis_store():
+    return create_lobby_store("redis", client=fakeredis.FakeRedis(decode_responses=True))
+
+def test_expired_lobbies_reach_the_listeners():
+    store = redis_store()
+    expired = []
+    store.add_expire_listener(expired.append)
+    store.create("SCADE", 1)
+    store.join("SCADE", "anna", 1, "sid-anna")
+    store.create("RESTA", 2)
+
+    # Scadenza per TTL: Redis elimina le chiavi senza avvisare nessuno
+    store.client.delete(*store.client.keys("lobby:SCADE*"))
+    assert store.expire_idle() == ["SCADE"]
+    assert expired == ["SCADE"]
+    # Ogni lobby viene segnalata una volta sola
+    assert store.expire_idle() == []
+
+    store.delete("RESTA")
+    assert expired == ["SCADE", "RESTA"]
+
+def test_sid_rooms_expire_and_are_refreshed_on_activity():
+    store = redis_store()
+    store.create("LOBBY", 1)
+    store.join("LOBBY", "anna", 1, "sid-anna")
+    key = "sid:sid-anna:rooms"
+    assert 0 < store.client.ttl(key) <= store.idle_ttl
+
+    store.client.expire(key, 5)
+    assert store.get_player("LOBBY", "sid-anna")["username"] == "anna"
+    assert store.client.ttl(key) > 5
+
+    assert store.rebind("LOBBY", "sid-anna", "sid-nuovo") is not None
+    assert 0 < store.client.ttl("sid:sid-nuovo:rooms") <= store.idle_ttl
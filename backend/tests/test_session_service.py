@@ -0,0 +1,53 @@
+import os
+import stat
+
+from itsdangerous import URLSafeTimedSerializer
+
+from database import load_secret_key
+from services.session_service import TOKEN_SALT
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_token_signed_with_another_key_is_rejected(client):
+    forged = URLSafeTimedSerializer("un'altra-chiave", salt=TOKEN_SALT).dumps(
+        {"user_id": 1, "username": "admin", "jti": "x"})
+    assert client.get("/api/auth/me", headers=bearer(forged)).status_code == 401
+
+def test_token_signed_with_the_old_default_key_is_rejected(client):
+    forged = URLSafeTimedSerializer("your-secret-key-here", salt=TOKEN_SALT).dumps({"user_id": 1})
+    assert client.get("/api/auth/me", headers=bearer(forged)).status_code == 401
+
+def test_issued_token_is_accepted(client):
+    from services.session_service import session_tokens
+    token = session_tokens.issue(7, "carla")
+    response = client.get("/api/auth/me", headers=bearer(token))
+    assert response.status_code == 200
+    assert response.get_json()["user"] == {"id": 7, "username": "carla"}
+
+def test_generated_secret_key_is_persisted(tmp_path, monkeypatch):
+    monkeypatch.delenv("SECRET_KEY")
+    monkeypatch.delenv("SECRET_KEY_FILE", raising=False)
+    key = load_secret_key(str(tmp_path))
+    assert len(key) == 64
+    assert load_secret_key(str(tmp_path)) == key
+    mode = os.stat(tmp_path / "secret_key").st_mode
+    assert stat.S_IMODE(mode) == 0o600
+    assert os.listdir(tmp_path) == ["secret_key"]
+
+def test_logout_reaches_the_other_workers():
+    import fakeredis
+    from services.lobby_store import create_lobby_store
+    from services.session_service import SessionTokens
+    client = fakeredis.FakeRedis(decode_responses=True)
+    # Due worker: ognuno con la propria cache, lo stesso Redis
+    first = SessionTokens("chiave", create_lobby_store("redis", client=client))
+    second = SessionTokens("chiave", create_lobby_store("redis", client=client))
+    token = first.issue(3, "dario")
+    assert second.verify(token)["user_id"] == 3  # ora anche nella cache del secondo
+
+    assert first.revoke(token)
+    assert first.verify(token) is None
+    assert second.verify(token) is None
+    [key] = client.keys("session:*:revoked")
+    assert 0 < client.ttl(key) <= first.max_age
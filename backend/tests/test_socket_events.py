@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from websocket.outbound import OutboundQueues, MERGE
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    def emit(self, event, data=None, room=None, **kwargs):
+        self.sent.append((event, room))
+
+@pytest.fixture
+def server(client):
+    """(app, socketio) dell'app completa"""
+    from app import create_app
+    return create_app()
+
+def events(socket_client, name):
+    return [message["args"][0] for message in socket_client.get_received() if message["name"] == name]
+
+def test_phase_events_follow_queued_notifications():
+    socket = RecordingSocket()
+    outbound = OutboundQueues(socket)
+    outbound.send("ROOM", "answer_submitted", {"username": "anna"}, policy=MERGE, merge_key=("anna", 1))
+    outbound.send("ALTRA", "room_message", {"message": "ciao"})
+
+    outbound.emit("question_ended", {}, room="ROOM")
+    outbound.emit("quiz_ended", {}, room="ROOM")
+    assert socket.sent == [("answer_submitted", "ROOM"), ("question_ended", "ROOM"), ("quiz_ended", "ROOM")]
+    # Le altre room restano alla coda
+    assert outbound.pending() == 1
+
+def test_join_and_leave_are_announced_to_the_room(server):
+    app, socketio = server
+    first = socketio.test_client(app)
+    second = socketio.test_client(app)
+    first.emit("join_room", {"room_id": "ANNUNCI", "username": "anna", "user_id": None})
+    first.get_received()
+
+    second.emit("join_room", {"room_id": "ANNUNCI", "username": "bruno", "user_id": None})
+    [announcement] = events(first, "user_joined")
+    assert announcement["username"] == "bruno"
+    assert announcement["participants_count"] == 0  # la lobby non esiste: nessun giocatore registrato
+    assert "resume_token" not in announcement
+    # Chi entra riceve una sola conferma, con i dati per il resume
+    [own] = events(second, "user_joined")
+    assert set(own) >= {"resume_token", "seq"}
+
+    second.emit("leave_room", {"room_id": "ANNUNCI", "username": "bruno"})
+    [left] = events(first, "user_left")
+    assert left["username"] == "bruno"
+    first.disconnect()
+    second.disconnect()
+
+def wait_for(socket_client, name, count, timeout=2.0):
+    """Messaggi ricevuti finché non arrivano `count` eventi `name` (le code si svuotano in background)"""
+    received = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        received += socket_client.get_received()
+        if sum(1 for message in received if message["name"] == name) >= count:
+            break
+        time.sleep(0.02)
+    return received
+
+def test_resume_rebinds_the_player_and_replays_missed_events(server):
+    from services.lobby_service import get_lobby_store, count_players
+    app, socketio = server
+    store = get_lobby_store()
+    assert store.create("RIPRESA", 1)
+
+    anna = socketio.test_client(app)
+    bruno = socketio.test_client(app)
+    anna.emit("join_room", {"room_id": "RIPRESA", "username": "anna", "user_id": 101})
+    [joined] = events(anna, "user_joined")
+    bruno.emit("join_room", {"room_id": "RIPRESA", "username": "bruno", "user_id": None})
+    wait_for(anna, "user_joined", 1)
+
+    # anna perde la connessione: resta nella lobby per RESUME_GRACE secondi
+    anna.disconnect()
+    for n in range(3):
+        bruno.emit("room_message", {"room_id": "RIPRESA", "username": "bruno", "message": f"messaggio {n}"})
+    wait_for(bruno, "room_message", 3)
+    missed, complete = store.events_since("RIPRESA", joined["seq"])
+    assert complete and len(missed) >= 3
+
+    again = socketio.test_client(app)
+    again.get_received()
+    again.emit("resume", {"room_id": "RIPRESA", "resume_token": joined["resume_token"], "last_seq": joined["seq"]})
+    received = again.get_received()
+    assert received[0]["name"] == "resumed"
+    resumed = received[0]["args"][0]
+    assert resumed["player"]["username"] == "anna"
+    assert resumed["complete"] and resumed["replayed"] == len(missed)
+    assert resumed["participants_count"] == count_players("RIPRESA") == 2
+
+    # Solo gli eventi successivi a last_seq, nell'ordine del registro
+    replayed = received[1:1 + len(missed)]
+    assert [message["args"][0]["seq"] for message in replayed] == [seq for seq, _, _ in missed]
+    assert [message["args"][0]["message"] for message in replayed if message["name"] == "room_message"] == \
+        ["messaggio 0", "messaggio 1", "messaggio 2"]
+
+    # Il giocatore ora è legato al nuovo sid: riceve gli eventi della room...
+    bruno.emit("room_message", {"room_id": "RIPRESA", "username": "bruno", "message": "bentornata"})
+    assert any(message["args"][0]["message"] == "bentornata"
+               for message in wait_for(again, "room_message", 1) if message["name"] == "room_message")
+    # ...e il vecchio token non vale più
+    intruder = socketio.test_client(app)
+    intruder.get_received()
+    intruder.emit("resume", {"room_id": "RIPRESA", "resume_token": joined["resume_token"], "last_seq": 0})
+    assert events(intruder, "resume_failed")
+    for socket_client in (bruno, again, intruder):
+        socket_client.disconnect()
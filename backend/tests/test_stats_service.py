@@ -0,0 +1,85 @@
+import pytest
+
+from services.stats_service import apply_answer_rows, get_quiz_stats, get_user_stats, get_leaderboard
+
+@pytest.fixture
+def game(database, author):
+    """Quiz con due domande e tre giocatori registrati: (quiz_id, [domanda_id], [user_id])"""
+    app, db = database
+    from models import User, Domanda
+    from services.quiz_service import create_quiz
+    with app.app_context():
+        quiz, message = create_quiz(author, "Statistiche", [
+            {"text": "Capitale d'Italia?", "options": ["Roma", "Milano"], "correctAnswer": 0},
+            {"text": "Capitale di Francia?", "options": ["Lione", "Parigi"], "correctAnswer": 1}])
+        assert quiz is not None, message
+        players = [User(username=f"giocatore{author}-{n}", password="x") for n in range(3)]
+        db.session.add_all(players)
+        db.session.commit()
+        questions = [d.id for d in Domanda.query.filter_by(quiz_id=quiz.id).order_by(Domanda.id)]
+        return quiz.id, questions, [p.id for p in players]
+
+def answer(database, quiz_id, question_id, user_id, points):
+    """Una risposta registrata come farebbe il flush di AnswerBuffer"""
+    app, db = database
+    with app.app_context():
+        apply_answer_rows(db.session, [{'quiz_id': quiz_id, 'domanda_id': question_id, 'user_id': user_id,
+                                        'corretta': points > 0, 'punti': points}])
+        db.session.commit()
+
+def ranking(quiz_id):
+    stats, message = get_quiz_stats(quiz_id)
+    assert stats is not None, message
+    return [(row["rank"], row["user_id"], row["score"]) for row in stats["leaderboard"]]
+
+def test_quiz_leaderboard_is_updated_after_each_answer(database, game):
+    quiz_id, (first, second), (anna, bruno, carla) = game
+    assert ranking(quiz_id) == []
+
+    answer(database, quiz_id, first, bruno, 700)
+    assert ranking(quiz_id) == [(1, bruno, 700)]
+
+    answer(database, quiz_id, first, anna, 900)
+    assert ranking(quiz_id) == [(1, anna, 900), (2, bruno, 700)]
+
+    answer(database, quiz_id, first, carla, 0)
+    answer(database, quiz_id, second, bruno, 600)
+    assert ranking(quiz_id) == [(1, bruno, 1300), (2, anna, 900), (3, carla, 0)]
+
+    stats, _ = get_quiz_stats(quiz_id)
+    assert (stats["players"], stats["answers"], stats["correct"]) == (3, 4, 3)
+    assert [q["answers"] for q in stats["questions"]] == [3, 1]
+
+def test_ties_are_ordered_by_user_id(database, game):
+    quiz_id, (first, second), (anna, bruno, carla) = game
+    for user_id in (carla, anna, bruno):
+        answer(database, quiz_id, first, user_id, 500)
+    assert ranking(quiz_id) == [(1, anna, 500), (2, bruno, 500), (3, carla, 500)]
+
+    # A pari punti la posizione personale segue lo stesso ordine della classifica
+    ranks = [get_user_stats(user_id)[0]["rank"] for user_id in (anna, bruno, carla)]
+    assert ranks == [ranks[0], ranks[0] + 1, ranks[0] + 2]
+
+    answer(database, quiz_id, second, carla, 1)
+    assert ranking(quiz_id)[0] == (1, carla, 501)
+
+def test_global_leaderboard_and_user_rank_agree(database, game):
+    quiz_id, (first, _), (anna, bruno, carla) = game
+    answer(database, quiz_id, first, anna, 100000)
+    answer(database, quiz_id, first, bruno, 100000)
+
+    leaderboard, message = get_leaderboard(limit=100)
+    assert leaderboard is not None, message
+    positions = {row["user_id"]: row["rank"] for row in leaderboard}
+    assert positions[anna] < positions[bruno]
+    for user_id in (anna, bruno):
+        assert get_user_stats(user_id)[0]["rank"] == positions[user_id]
+    # Chi non ha mai risposto non ha una posizione
+    assert get_user_stats(carla)[0]["rank"] is None
+
+def test_limit_is_clamped(database, game):
+    quiz_id, (first, _), players = game
+    for points, user_id in enumerate(players, start=1):
+        answer(database, quiz_id, first, user_id, points)
+    stats, _ = get_quiz_stats(quiz_id, limit=0)
+    assert len(stats["leaderboard"]) == 1
@@ -0,0 +1,48 @@
+import fakeredis
+
+from websocket.wire_format import WireFormats, RedisRoomCounts, COMPACT
+
+class Emits:
+    def __init__(self):
+        self.rooms = []
+
+    def __call__(self, event, data, room=None, **kwargs):
+        self.rooms.append(room)
+
+def emitted_rooms(formats, room="ROOM"):
+    emits = Emits()
+    formats.emit_to_room(emits, "room_message", {"username": "anna", "message": "ciao"}, room)
+    return emits.rooms
+
+def test_json_only_room_gets_a_single_emit():
+    formats = WireFormats(enabled=True)
+    formats.negotiate("json-sid", {})
+    assert formats.enter("ROOM", "json-sid") == "ROOM"
+    assert emitted_rooms(formats) == ["ROOM"]
+
+def test_compact_copy_only_while_a_compact_client_is_in_the_room():
+    formats = WireFormats(enabled=True)
+    formats.negotiate("sid", {"encoding": COMPACT})
+    assert formats.enter("ROOM", "sid") == "ROOM#compact"
+    formats.enter("ROOM", "sid")  # un secondo join non conta due volte
+    assert emitted_rooms(formats) == ["ROOM", "ROOM#compact"]
+    assert emitted_rooms(formats, "ALTRA") == ["ALTRA"]
+
+    assert formats.exit("ROOM", "sid") == "ROOM#compact"
+    assert emitted_rooms(formats) == ["ROOM"]
+
+    formats.enter("ROOM", "sid")
+    formats.forget("sid")  # disconnessione
+    assert emitted_rooms(formats) == ["ROOM"]
+
+def test_compact_clients_on_another_worker_are_counted():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    first = WireFormats(enabled=True, room_counts=RedisRoomCounts(client))
+    second = WireFormats(enabled=True, room_counts=RedisRoomCounts(client))
+    first.negotiate("sid", {"encoding": COMPACT})
+    first.enter("ROOM", "sid")
+    assert emitted_rooms(second) == ["ROOM", "ROOM#compact"]
+
+    first.forget("sid")
+    assert emitted_rooms(second) == ["ROOM"]
+    assert client.keys("wire:*") == []
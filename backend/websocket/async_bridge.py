@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from websocket import context
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Numero di thread che eseguono gli handler (e quindi le query) fuori dal loop asyncio
+DEFAULT_WORKERS = int(os.environ.get("ASGI_WORKER_THREADS", 32))
+
+class AsyncSocketBridge:
+    """
+    Adatta un socketio.AsyncServer all'interfaccia di Flask-SocketIO usata dal resto
+    del backend (on, emit, sleep, start_background_task), così gli stessi handler
+    sincroni di socket_handlers.py girano anche in modalità ASGI.
+    Ogni evento viene eseguito nell'executor dentro un app_context: il loop non
+    si blocca mai su SQLite o sull'hash delle password.
+    """
+
+    def __init__(self, sio, flask_app, workers=DEFAULT_WORKERS):
+        self.sio = sio
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="socketio-worker")
+        self.loop = None
+
+    def _run_handler(self, sid, handler, args):
+        token = context.enter(self, sid)
+        try:
+            with self.flask_app.app_context():
+                return handler(*args)
+        finally:
+            context.exit(token)
+
+    async def _dispatch(self, event_name, sid, handler, args):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        try:
+            return await self.loop.run_in_executor(self.executor, self._run_handler, sid, handler, args)
+        except Exception:
+            logger.exception("Errore nell'handler Socket.IO '%s'", event_name)
+
+    def on(self, event_name):
+        def decorator(handler):
+            if event_name == 'connect':
+                async def async_handler(sid, environ, auth=None):
+                    return await self._dispatch(event_name, sid, handler, (auth,))
+            elif event_name == 'disconnect':
+                async def async_handler(sid, *reason):
+                    return await self._dispatch(event_name, sid, handler, reason[:1])
+            else:
+                async def async_handler(sid, *data):
+                    return await self._dispatch(event_name, sid, handler, data)
+            self.sio.on(event_name, async_handler)
+            return handler
+        return decorator
+
+    def _submit(self, coro, wait):
+        if self.loop is None:
+            coro.close()
+            logger.warning("Loop asyncio non ancora avviato: messaggio scartato")
+            return
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if wait:
+            return future.result()
+        future.add_done_callback(_log_failure)
+
+    def emit(self, event, data=None, room=None, to=None, skip_sid=None):
+        """Chiamabile da qualsiasi thread: accoda l'emit sul loop senza attendere"""
+        self._submit(self.sio.emit(event, data, to=to or room, skip_sid=skip_sid), wait=False)
+
+    def enter_room(self, sid, room):
+        # Attende: gli emit successivi verso la room devono già includere il client
+        self._submit(self.sio.enter_room(sid, room), wait=True)
+
+    def leave_room(self, sid, room):
+        self._submit(self.sio.leave_room(sid, room), wait=True)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def start_background_task(self, target, *args, **kwargs):
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    async def startup(self):
+        """Da chiamare all'avvio del loop (lifespan ASGI), prima dei task in background"""
+        self.loop = asyncio.get_running_loop()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Emit Socket.IO fallito: %s", future.exception())
@@ -0,0 +1,109 @@
+import threading
+from services.lobby_store import player_id
+
+# Finestra di raggruppamento delle modifiche alla lista giocatori
+COALESCE_WINDOW = 0.075
+
+def public_player(player):
+    """Dati del giocatore visibili agli altri client (senza sid)"""
+    # 'id' è fissato all'ingresso e non cambia quando il giocatore riprende la sessione
+    public_id = player.get('id')
+    if public_id is None:
+        public_id = player_id(player.get('user_id'), player['sid'])
+    return {'id': public_id, 'user_id': player.get('user_id'), 'username': player.get('username')}
+
+class _RoomChanges:
+    __slots__ = ("added", "removed", "scheduled")
+
+    def __init__(self):
+        self.added = {}
+        self.removed = set()
+        self.scheduled = False
+
+class PlayerListBroadcaster:
+    """
+    Raggruppa ingressi e uscite di una room nella finestra COALESCE_WINDOW
+    e li invia come un unico evento 'players_delta':
+        {room_id, version, base_version, added: [...], removed: [id], count}
+    Le delta sono idempotenti; se base_version non coincide con la versione
+    locale il client chiede uno snapshot con 'list_players'.
+    Le versioni vengono dallo store delle lobby, quindi restano in sequenza anche
+    quando i giocatori della stessa lobby sono collegati a worker diversi.
+    """
+
+    def __init__(self, socketio, store, count_players, window=COALESCE_WINDOW):
+        self.socketio = socketio
+        self.store = store
+        self.count_players = count_players
+        self.window = window
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self.events_sent = 0
+        self.changes_coalesced = 0
+
+    def _changes(self, room):
+        changes = self._rooms.get(room)
+        if changes is None:
+            changes = self._rooms[room] = _RoomChanges()
+        return changes
+
+    def player_added(self, room, player):
+        public = public_player(player)
+        with self._lock:
+            changes = self._changes(room)
+            changes.removed.discard(public['id'])
+            changes.added[public['id']] = public
+            self._schedule(room, changes)
+
+    def player_removed(self, room, player):
+        public = public_player(player)
+        with self._lock:
+            changes = self._changes(room)
+            # Entrato e uscito nella stessa finestra: le due modifiche si annullano
+            if changes.added.pop(public['id'], None) is None:
+                changes.removed.add(public['id'])
+            self._schedule(room, changes)
+
+    def _schedule(self, room, changes):
+        self.changes_coalesced += 1
+        if not changes.scheduled:
+            changes.scheduled = True
+            self.socketio.start_background_task(self._flush_later, room)
+
+    def _flush_later(self, room):
+        self.socketio.sleep(self.window)
+        self.flush(room)
+
+    def flush(self, room):
+        with self._lock:
+            changes = self._rooms.get(room)
+            if changes is None:
+                return
+            changes.scheduled = False
+            if not changes.added and not changes.removed:
+                return
+            version = self.store.next_players_version(room)
+            if version is None:
+                # Lobby eliminata nel frattempo
+                self._rooms.pop(room, None)
+                return
+            payload = {
+                'room_id': room,
+                'version': version,
+                'base_version': version - 1,
+                'added': list(changes.added.values()),
+                'removed': list(changes.removed)
+            }
+            changes.added = {}
+            changes.removed = set()
+        payload['count'] = self.count_players(room)
+        self.socketio.emit('players_delta', payload, room=room)
+        self.events_sent += 1
+
+    def version(self, room):
+        return self.store.players_version(room)
+
+    def forget(self, room):
+        """Da chiamare quando la lobby viene eliminata"""
+        with self._lock:
+            self._rooms.pop(room, None)
@@ -0,0 +1,69 @@
+import contextvars
+import flask
+from websocket.wire_format import wire_formats
+
+# Funzioni usate dai gestori in socket_handlers.py che funzionano con entrambi i server:
+# - Flask-SocketIO (app.py): delegano a flask_socketio e a flask.request
+# - AsyncServer (asgi_app.py): il bridge imposta il sid corrente in una ContextVar
+#   e l'emit viene inoltrato al loop asyncio
+# In entrambi i casi emit e join/leave rispettano il formato negoziato dal client
+# (websocket/wire_format.py).
+# flask_socketio viene importato solo al primo uso: il worker ASGI non lo carica.
+
+_current = contextvars.ContextVar("socket_context", default=None)
+
+class SocketContext:
+    __slots__ = ("bridge", "sid")
+
+    def __init__(self, bridge, sid):
+        self.bridge = bridge
+        self.sid = sid
+
+def enter(bridge, sid):
+    return _current.set(SocketContext(bridge, sid))
+
+def exit(token):
+    _current.reset(token)
+
+class _SocketRequest:
+    """Espone request.sid come flask.request durante un evento Socket.IO"""
+
+    @property
+    def sid(self):
+        context = _current.get()
+        return context.sid if context is not None else flask.request.sid
+
+socket_request = _SocketRequest()
+
+def emit(event, data=None, room=None, to=None, skip_sid=None):
+    """
+    Senza room invia solo al client che ha generato l'evento, come flask_socketio.emit;
+    skip_sid esclude un client dagli invii alla room
+    """
+    context = _current.get()
+    if context is None:
+        from flask_socketio import emit as send
+    else:
+        send = context.bridge.emit
+    target = room or to
+    if target is None:
+        return wire_formats.emit_to_sid(send, event, data, socket_request.sid)
+    if skip_sid is not None:
+        return wire_formats.emit_to_room(send, event, data, target, skip_sid=skip_sid)
+    return wire_formats.emit_to_room(send, event, data, target)
+
+def join_room(room):
+    context = _current.get()
+    room = wire_formats.enter(room, socket_request.sid)
+    if context is None:
+        from flask_socketio import join_room as join
+        return join(room)
+    context.bridge.enter_room(context.sid, room)
+
+def leave_room(room):
+    context = _current.get()
+    room = wire_formats.exit(room, socket_request.sid)
+    if context is None:
+        from flask_socketio import leave_room as leave
+        return leave(room)
+    context.bridge.leave_room(context.sid, room)
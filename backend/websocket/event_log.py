@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from services.resume_service import RESUME_GRACE
+from websocket.wire_format import wire_formats
+
+logger = logging.getLogger(__name__)
+
+class RoomEventLog:
+    """
+    Stessa interfaccia di socketio (emit, sleep, start_background_task): gli eventi
+    inviati a una lobby ricevono un numero di sequenza 'seq' e finiscono nel registro
+    circolare della lobby, da cui 'resume' li invia di nuovo a chi si riconnette.
+    Gli eventi verso room che non sono lobby non vengono registrati; tutti gli
+    eventi di room arrivano anche ai client con il formato compatto.
+    """
+
+    def __init__(self, socketio, store):
+        self.socketio = socketio
+        self.store = store
+
+    def emit(self, event, data=None, room=None, **kwargs):
+        if room is not None and isinstance(data, dict):
+            seq = self.store.append_event(room, event, data)
+            if seq is not None:
+                data = {**data, 'seq': seq}
+        if room is None:
+            return self.socketio.emit(event, data, **kwargs)
+        return wire_formats.emit_to_room(self.socketio.emit, event, data, room, **kwargs)
+
+    def events_since(self, room, seq):
+        """([(evento, payload con 'seq')], completo) per il replay"""
+        events, complete = self.store.events_since(room, seq)
+        return [(event, {**payload, 'seq': event_seq}) for event_seq, event, payload in events], complete
+
+    def sleep(self, seconds):
+        return self.socketio.sleep(seconds)
+
+    def start_background_task(self, target, *args, **kwargs):
+        return self.socketio.start_background_task(target, *args, **kwargs)
+
+class DisconnectGrace:
+    """
+    Sid disconnessi che restano nelle lobby per `grace` secondi in attesa di un
+    resume; poi on_expire(sid) li rimuove. Se nel frattempo il giocatore è passato
+    a un nuovo sid, la rimozione del vecchio non trova più niente.
+    """
+
+    def __init__(self, socketio, on_expire, grace=RESUME_GRACE, interval=1.0):
+        self.socketio = socketio
+        self.on_expire = on_expire
+        self.grace = grace
+        self.interval = interval
+        self._pending = {}  # sid -> scadenza
+        self._lock = threading.Lock()
+        self._started = False
+
+    def hold(self, sid):
+        with self._lock:
+            self._pending[sid] = time.monotonic() + self.grace
+
+    def release(self, sid):
+        with self._lock:
+            self._pending.pop(sid, None)
+
+    def expire_due(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [sid for sid, deadline in self._pending.items() if deadline <= now]
+            for sid in due:
+                del self._pending[sid]
+        for sid in due:
+            try:
+                self.on_expire(sid)
+            except Exception as e:
+                logger.error("Rimozione del sid %s fallita: %s", sid, e)
+        return len(due)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+
+        def expire_loop():
+            while True:
+                self.socketio.sleep(self.interval)
+                self.expire_due()
+
+        self.socketio.start_background_task(expire_loop)
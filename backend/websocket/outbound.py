@@ -0,0 +1,145 @@
+from collections import deque, OrderedDict
+from services.metrics_service import metrics
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Code di uscita limitate per destinatario (sid o room) per gli eventi "chiacchieroni"
+# (messaggi, notifiche delle risposte). Un ciclo in background le svuota a turno,
+# al massimo DRAIN_BATCH eventi per destinatario per giro: una room inondata non
+# ritarda le altre e la coda non cresce oltre MAX_QUEUE_SIZE.
+# Politiche quando la coda è piena o l'evento è già in coda:
+# - DROP_OLDEST: scarta l'evento più vecchio (chat: contano i messaggi recenti)
+# - DROP_NEWEST: scarta l'evento appena arrivato
+# - MERGE: un evento con la stessa merge_key sostituisce quello in attesa
+#
+# Gli eventi che non passano dalla coda (fasi della partita) usano emit(): prima
+# parte quanto è ancora in coda per la stessa room, così i client ricevono gli
+# eventi nell'ordine in cui sono stati generati.
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+MERGE = "merge"
+
+MAX_QUEUE_SIZE = 32
+DRAIN_INTERVAL = 0.02
+DRAIN_BATCH = 8
+
+outbound_dropped = metrics.counter(
+    "socketio_outbound_dropped_total", "Eventi scartati dalle code di uscita piene", ("event", "policy"))
+outbound_merged = metrics.counter(
+    "socketio_outbound_merged_total", "Eventi sostituiti da uno più recente con la stessa chiave", ("event",))
+
+class OutboundQueues:
+    def __init__(self, socketio, max_size=MAX_QUEUE_SIZE, interval=DRAIN_INTERVAL, batch=DRAIN_BATCH):
+        self.socketio = socketio
+        self.max_size = max_size
+        self.interval = interval
+        self.batch = batch
+        self._queues = OrderedDict()  # destinatario -> deque di [evento, payload, merge_key]
+        self._lock = threading.Lock()
+        # Un invio alla volta: un evento preso dalla coda non può essere superato
+        # da un emit() diretto verso la stessa room
+        self._emit_lock = threading.RLock()
+        self._started = False
+        self.sent = 0
+        self.dropped = 0
+        self.merged = 0
+
+    def send(self, target, event, payload, policy=DROP_OLDEST, merge_key=None):
+        """Accoda l'evento per target (sid o room); ritorna False se è stato scartato"""
+        with self._lock:
+            queue = self._queues.get(target)
+            if queue is None:
+                queue = self._queues[target] = deque()
+
+            if policy == MERGE and merge_key is not None:
+                for item in queue:
+                    if item[0] == event and item[2] == merge_key:
+                        item[1] = payload
+                        self.merged += 1
+                        outbound_merged.inc(event)
+                        return True
+
+            if len(queue) >= self.max_size:
+                self.dropped += 1
+                if policy == DROP_NEWEST:
+                    outbound_dropped.inc(event, policy)
+                    return False
+                outbound_dropped.inc(queue.popleft()[0], policy)
+            queue.append([event, payload, merge_key])
+        return True
+
+    def _take_batch(self):
+        """Al massimo `batch` eventi per destinatario, a rotazione tra i destinatari"""
+        with self._lock:
+            batch = []
+            for target in list(self._queues):
+                queue = self._queues[target]
+                for _ in range(min(self.batch, len(queue))):
+                    event, payload, _ = queue.popleft()
+                    batch.append((target, event, payload))
+                if queue:
+                    self._queues.move_to_end(target)
+                else:
+                    del self._queues[target]
+            return batch
+
+    def _send_batch(self, batch):
+        for target, event, payload in batch:
+            try:
+                self.socketio.emit(event, payload, room=target)
+            except Exception as e:
+                logger.error("Invio di '%s' a %s fallito: %s", event, target, e)
+        self.sent += len(batch)
+
+    def drain(self):
+        with self._emit_lock:
+            batch = self._take_batch()
+            self._send_batch(batch)
+        return len(batch)
+
+    def emit(self, event, data=None, room=None, **kwargs):
+        """Stessa interfaccia di socketio.emit: invio immediato, dopo gli eventi in coda per la room"""
+        with self._emit_lock:
+            if room is not None:
+                with self._lock:
+                    queue = self._queues.pop(room, None) or ()
+                self._send_batch([(room, queued, payload) for queued, payload, _ in queue])
+            return self.socketio.emit(event, data, room=room, **kwargs)
+
+    def sleep(self, seconds):
+        return self.socketio.sleep(seconds)
+
+    def start_background_task(self, target, *args, **kwargs):
+        return self.socketio.start_background_task(target, *args, **kwargs)
+
+    def forget(self, target):
+        """Scarta gli eventi in attesa per un sid disconnesso o una lobby eliminata"""
+        with self._lock:
+            self._queues.pop(target, None)
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+
+        def drain_loop():
+            # socketio.sleep e non threading.Event: funziona anche con eventlet/gevent
+            while True:
+                self.drain()
+                self.socketio.sleep(self.interval)
+
+        self.socketio.start_background_task(drain_loop)
+
+    def pending(self):
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+    def stats(self):
+        with self._lock:
+            targets = len(self._queues)
+            pending = sum(len(q) for q in self._queues.values())
+        return {"targets": targets, "pending": pending, "sent": self.sent,
+                "dropped": self.dropped, "merged": self.merged}
@@ -0,0 +1,50 @@
+from functools import wraps
+from services.lobby_service import get_player
+from services.rate_limit_service import create_limiter
+from websocket.context import emit, socket_request as request
+
+# Rate limiting dichiarativo degli handler Socket.IO, da mettere sotto @on(...):
+#     @on('room_message')
+#     @socket_rate_limit('sid', rate=5, burst=10)
+#     @socket_rate_limit('room', rate=20, burst=40)
+# Un evento oltre il limite viene scartato; il client riceve un solo 'rate_limited'
+# per raffica, così anche l'avviso non diventa un'amplificazione.
+
+SCOPES = ("sid", "user", "room")
+
+def _room(data):
+    if isinstance(data, dict):
+        return data.get('room_id') or data.get('quiz_id')
+    return data
+
+def _key(scope, data):
+    sid = request.sid
+    if scope == "room":
+        return _room(data) or sid
+    if scope == "user":
+        # Il giocatore registrato nella lobby, non lo user_id dichiarato dal client
+        room = _room(data)
+        player = get_player(room, sid) if room else None
+        if player is not None and player.get('user_id') is not None:
+            return f"user:{player['user_id']}"
+    return sid
+
+def socket_rate_limit(scope, rate, burst):
+    if scope not in SCOPES:
+        raise ValueError(f"Ambito del rate limit non valido: {scope}")
+
+    def decorator(handler):
+        # handle_room_message -> room_message
+        event_name = handler.__name__.removeprefix('handle_')
+        limiter = create_limiter(f"socket {event_name} per {scope}", rate, burst)
+
+        @wraps(handler)
+        def wrapper(data=None, *args):
+            allowed, retry_after, first = limiter.allow(_key(scope, data))
+            if not allowed:
+                if first:
+                    emit('rate_limited', {'event': event_name, 'retry_after': round(retry_after, 2)})
+                return None
+            return handler(data, *args)
+        return wrapper
+    return decorator
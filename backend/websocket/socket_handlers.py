@@ -1,27 +1,78 @@
-from flask_socketio import emit, join_room, leave_room
-from flask import request
 from services.lobby_service import *
+# request.sid vale per entrambi i server (websocket/context.py)
+from websocket.context import emit, join_room, leave_room, socket_request as request
+from services.game_service import game_engine
+from websocket.broadcaster import PlayerListBroadcaster, public_player
+from services.metrics_service import instrumented_on, metrics
+from services.resume_service import get_resume_tokens, resume_attempts, replayed_events
+from websocket.event_log import RoomEventLog, DisconnectGrace
+from websocket.wire_format import wire_formats, schema_table, COMPACT
+from websocket.outbound import OutboundQueues, DROP_OLDEST, MERGE
+from websocket.rate_limit import socket_rate_limit
+import logging
+
+logger = logging.getLogger(__name__)
 
 def register_socket_events(socketio):
     """Registra tutti gli eventi WebSocket"""
+
+    # Come @socketio.on, ma misura durata e query SQL di ogni handler
+    on = instrumented_on(socketio)
+
+    lobby_store = get_lobby_store()
+    resume_tokens = get_resume_tokens()
+
+    # Gli eventi verso le lobby passano da qui: numerati e conservati per il resume
+    room_events = RoomEventLog(socketio, lobby_store)
+
+    # Ingressi/uscite raggruppati in un unico 'players_delta' per finestra
+    players_broadcaster = PlayerListBroadcaster(room_events, lobby_store, count_players)
+    lobby_store.add_expire_listener(players_broadcaster.forget)
+
+    # Messaggi e notifiche delle risposte passano da code limitate per room:
+    # un client lento o una room inondata non fanno crescere la memoria
+    outbound = OutboundQueues(room_events)
+    lobby_store.add_expire_listener(outbound.forget)
+    outbound.start()
+    metrics.register_collector("socketio_outbound", "Code di uscita degli eventi Socket.IO", outbound.stats)
+    metrics.register_collector("socketio_wire_format", "Client collegati con il formato compatto", wire_formats.counts)
+
+    def remove_disconnected(sid):
+        for room, player in leave_all_lobbies(sid):
+            players_broadcaster.player_removed(room, player)
+
+    # Chi si disconnette resta nelle lobby per RESUME_GRACE secondi
+    disconnect_grace = DisconnectGrace(socketio, remove_disconnected)
+    disconnect_grace.start()
     
-    @socketio.on('connect')
-    def handle_connect():
-        print(f"Client connesso: {request.sid}")
-        emit('connected', {'message': 'Connesso al server WebSocket!'})
+    @on('connect')
+    def handle_connect(auth=None):
+        logger.debug("Client connesso: %s", request.sid)
+        # auth={'encoding': 'compact'} per il formato compatto, altrimenti JSON
+        encoding = wire_formats.negotiate(request.sid, auth)
+        connected = {'message': 'Connesso al server WebSocket!', 'encoding': encoding}
+        if encoding == COMPACT:
+            connected['schema'] = schema_table()
+        emit('connected', connected)
     
-    @socketio.on('disconnect')
-    def handle_disconnect():
-        print(f"Client disconnesso: {request.sid}")
+    @on('disconnect')
+    def handle_disconnect(reason=None):
+        # Flask-SocketIO 5 passa il motivo della disconnessione
+        logger.debug("Client disconnesso: %s (%s)", request.sid, reason)
+        wire_formats.forget(request.sid)
+
+        # Le lobby vengono pulite solo se il client non riprende la sessione in tempo
+        disconnect_grace.hold(request.sid)
     
-    @socketio.on('join_quiz')
+    @on('join_quiz')
+    @socket_rate_limit('sid', rate=2, burst=5)
     def handle_join_quiz(data):
         room = data.get('quiz_id')
         username = data.get('username')
 
         if room and username:
             join_room(room)
-            print(f"User {username} ({request.sid}) joined quiz {room}")
+            logger.debug("User %s (%s) joined quiz %s", username, request.sid, room)
             emit('joined_quiz', {
                 'quiz_id': room,
                 'username': username,
@@ -30,75 +81,159 @@ def register_socket_events(socketio):
         else:
             emit('error', {'message': 'Quiz ID e username sono richiesti'})
 
-    @socketio.on('leave_quiz')
+    @on('leave_quiz')
     def handle_leave_quiz(data):
         room = data.get('quiz_id')
         username = data.get('username')
 
         if room:
             leave_room(room)
-            print(f"User {username} ({request.sid}) left quiz {room}")
+            logger.debug("User %s (%s) left quiz %s", username, request.sid, room)
             emit('left_quiz', {
                 'quiz_id': room,
                 'username': username,
                 'message': f'{username} ha lasciato il quiz'
             }, room=room)
 
-    @socketio.on('quiz_message')
+    @on('quiz_message')
+    @socket_rate_limit('sid', rate=5, burst=10)
+    @socket_rate_limit('room', rate=20, burst=40)
     def handle_quiz_message(data):
         room = data.get('quiz_id')
         message = data.get('message')
         username = data.get('username')
 
         if room and message and username:
-            emit('quiz_message', {
+            outbound.send(room, 'quiz_message', {
                 'username': username,
                 'message': message,
                 'quiz_id': room
-            }, room=room)
+            }, policy=DROP_OLDEST)
 
-    @socketio.on('start_quiz')
+    @on('start_quiz')
+    @socket_rate_limit('room', rate=1, burst=2)
     def handle_start_quiz(data):
         room = data.get('quiz_id')
-        if room:
-            emit('quiz_started', {'quiz_id': room}, room=room)
+        if not room:
+            return
+
+        quiz_id = get_lobby_quiz_id(room)
+        if quiz_id is None or not game_engine.available():
+            # Partita gestita dal client, come prima del motore di gioco
+            outbound.emit('quiz_started', {'quiz_id': room}, room=room)
+            return
 
-    @socketio.on('submit_answer')
+        # quiz_started parte dal loop della partita, prima della prima domanda.
+        # Gli eventi della partita passano da outbound.emit: le notifiche delle
+        # risposte ancora in coda partono prima di question_ended e quiz_ended.
+        _, error = game_engine.start(outbound, room, quiz_id, lambda: count_players(room))
+        if error:
+            emit('error', {'message': error})
+
+    @on('submit_answer')
+    @socket_rate_limit('sid', rate=5, burst=10)
     def handle_submit_answer(data):
         room = data.get('quiz_id')
         answer = data.get('answer')
         username = data.get('username')
         question_id = data.get('question_id')
 
+        game = game_engine.get(room) if room else None
+        if game is not None:
+            # Partita gestita dal server: il giocatore è quello registrato nella lobby
+            player = get_player(room, request.sid)
+            if player is None:
+                emit('error', {'message': 'Non sei in questa lobby'})
+                return
+            result, error = game.submit(player, question_id, answer)
+            if error:
+                emit('error', {'message': error})
+                return
+            emit('answer_result', result)
+            notify_answer(room, player['username'], result['question_id'])
+            return
+
         if room and answer and username:
-            emit('answer_submitted', {
-                'username': username,
-                'question_id': question_id,
-                'quiz_id': room
-            }, room=room)
+            notify_answer(room, username, question_id)
 
-    @socketio.on('join_room')
+    def notify_answer(room, username, question_id):
+        # Notifica solo informativa: se è ancora in coda, quella nuova la sostituisce
+        outbound.send(room, 'answer_submitted', {
+            'username': username,
+            'question_id': question_id,
+            'quiz_id': room
+        }, policy=MERGE, merge_key=(username, question_id))
+
+    @on('join_room')
+    @socket_rate_limit('sid', rate=2, burst=5)
     def handle_join_room(data):
         room = data.get('room_id')
         username = data.get('username')
         user_id = data.get('user_id')
-        
-        print(f"user_id: ${user_id}")
+
 
         if room:
             join_room(room)
             
-            join_lobby(room, username, user_id, request.sid)
+            joined = join_lobby(room, username, user_id, request.sid)
+            if joined:
+                players_broadcaster.player_added(room, get_player(room, request.sid))
 
-            print(f"User {username} ({request.sid}) joined room {room}")
-            emit('user_joined', {
+            logger.debug("User %s (%s) joined room %s", username, request.sid, room)
+            announcement = {
                 'username': username,
                 'message': f'{username} si è unito alla room!',
-                'participants_count': len(active_lobbies.get(room, {}).get('users', []))
-            }, room=room)
-            handle_list_players(room)
+                'participants_count': count_players(room)
+            }
+            emit('user_joined', announcement, room=room, skip_sid=request.sid)
+            # Chi entra riceve anche snapshot, resume_token e l'ultimo seq: con questi
+            # può riprendere la sessione dopo una disconnessione (evento 'resume')
+            emit('user_joined', {
+                **announcement,
+                'resume_token': resume_tokens.issue(room, request.sid) if joined else None,
+                'seq': lobby_store.last_event_seq(room)
+            })
+            send_player_list(room)
 
-    @socketio.on('leave_room')
+    @on('resume')
+    @socket_rate_limit('sid', rate=1, burst=3)
+    def handle_resume(data):
+        # {room_id, resume_token, last_seq}: riprende il posto nella lobby e
+        # riceve gli eventi persi invece di ricostruire tutto lo stato
+        room = data.get('room_id')
+        old_sid = resume_tokens.verify(data.get('resume_token'), room)
+        player = resume_player(room, old_sid, request.sid) if old_sid else None
+        if player is None:
+            resume_attempts.inc("failed")
+            emit('resume_failed', {
+                'room_id': room,
+                'message': 'Sessione scaduta, entra di nuovo nella room'
+            })
+            return
+
+        disconnect_grace.release(old_sid)
+        join_room(room)
+        last_seq = data.get('last_seq')
+        events, complete = room_events.events_since(room, last_seq if isinstance(last_seq, int) else 0)
+        resume_attempts.inc("resumed" if complete else "partial")
+        replayed_events.inc(amount=len(events))
+        logger.debug("Sessione di %s ripresa in %s da %s (%d eventi)", player['username'], room, request.sid, len(events))
+
+        emit('resumed', {
+            'room_id': room,
+            'player': public_player(player),
+            'resume_token': resume_tokens.issue(room, request.sid),
+            'replayed': len(events),
+            # False: parte degli eventi è uscita dal registro, il client deve ricaricare lo stato
+            'complete': complete,
+            'participants_count': count_players(room)
+        })
+        for event, payload in events:
+            emit(event, payload)
+        if not complete:
+            send_player_list(room)
+
+    @on('leave_room')
     def handle_leave_room(data):
         room = data.get('room_id')
         username = data.get('username')
@@ -108,32 +243,43 @@ def register_socket_events(socketio):
             leave_room(room)
 
             # Rimuovi dalla struttura dati del lobby
-            if room in active_lobbies:
-                active_lobbies[room]['users'] = [
-                    u for u in active_lobbies[room]['users']
-                    if u['sid'] != request.sid
-                ]
+            player = leave_lobby(room, request.sid)
+            if player is not None:
+                players_broadcaster.player_removed(room, player)
 
-            print(f"User {username} ({request.sid}) left room {room}")
+            logger.debug("User %s (%s) left room %s", username, request.sid, room)
             emit('user_left', {
                 'username': username,
                 'message': f'{username} ha lasciato la room',
-                'participants_count': len(active_lobbies.get(room, {}).get('users', []))
+                'participants_count': count_players(room)
             }, room=room)
 
-    @socketio.on('room_message')
+    @on('room_message')
+    @socket_rate_limit('sid', rate=5, burst=10)
+    @socket_rate_limit('room', rate=20, burst=40)
     def handle_room_message(data):
         room = data.get('room_id')
         message = data.get('message')
         username = data.get('username')
 
         if room and message:
-            emit('room_message', {
+            outbound.send(room, 'room_message', {
                 'username': username,
                 'message': message,
                 'room_id': room
-            }, room=room)
+            }, policy=DROP_OLDEST)
         
-    @socketio.on('list_players')
-    def handle_list_players(room):
-        emit('list_players', {'players': get_list_players(room)}, room=room)
\ No newline at end of file
+    @on('list_players')
+    @socket_rate_limit('sid', rate=2, burst=5)
+    def handle_list_players(data):
+        # Snapshot completo solo per chi lo chiede (accetta il codice o {'room_id': codice})
+        room = data.get('room_id') if isinstance(data, dict) else data
+        if room:
+            send_player_list(room)
+
+    def send_player_list(room):
+        emit('list_players', {
+            'room_id': room,
+            'version': players_broadcaster.version(room),
+            'players': [public_player(p) for p in get_list_players(room)]
+        })
\ No newline at end of file
@@ -0,0 +1,215 @@
+import os
+import threading
+
+# Formato compatto degli eventi Socket.IO, su richiesta del client:
+#     io(url, {auth: {encoding: 'compact'}})
+# Ogni evento noto diventa una lista di valori nell'ordine dello schema e il suo
+# nome un codice breve; i campi ridondanti (messaggi in italiano già noti al client,
+# codice della room ripetuto in ogni evento) non vengono inviati. Lo schema arriva
+# al client nell'evento 'connected'. Senza richiesta resta il JSON di sempre.
+#
+# I client compatti entrano nella room "<room>#compact" invece che in "<room>":
+# ogni evento di room viene codificato una volta sola e inviato anche a
+# "<room>#compact", ma solo se nella room c'è almeno un client compatto. Il conteggio
+# per room è in memoria, oppure su Redis quando i worker condividono la message
+# queue (share_room_counts): un client compatto collegato a un altro worker conta.
+
+JSON = "json"
+COMPACT = "compact"
+ENCODINGS = (JSON, COMPACT)
+ROOM_SEPARATOR = "#"
+SCHEMA_VERSION = 1
+
+# SOCKETIO_COMPACT_ENCODING=0 disattiva la negoziazione
+COMPACT_ENABLED = os.environ.get('SOCKETIO_COMPACT_ENCODING', '1') != '0'
+# Scadenza dei contatori su Redis, rinnovata a ogni ingresso: se un worker si ferma
+# senza decrementarli, al peggio la room riceve l'emit compatto per un giorno
+ROOM_COUNT_TTL = 24 * 60 * 60
+
+# Record annidati: campi che contengono un giocatore o una lista di giocatori/posizioni
+RECORDS = {
+    'player': ('id', 'user_id', 'username'),
+    'leader': ('rank', 'user_id', 'username', 'score'),
+}
+NESTED = {'player': 'player', 'players': 'player', 'added': 'player', 'leaderboard': 'leader'}
+
+# evento -> (codice, campi). I codici non vanno mai riassegnati: per cambiarli
+# si aumenta SCHEMA_VERSION. Gli eventi di room terminano con 'seq'.
+EVENTS = {
+    'user_joined': ('1', ('username', 'participants_count', 'resume_token', 'seq')),
+    'user_left': ('2', ('username', 'participants_count')),
+    'list_players': ('3', ('room_id', 'version', 'players')),
+    'players_delta': ('4', ('version', 'base_version', 'added', 'removed', 'count', 'seq')),
+    'quiz_started': ('5', ('question_count', 'seq')),
+    'question': ('6', ('index', 'total', 'question_id', 'testo', 'options', 'duration', 'ends_at', 'seq')),
+    'answer_result': ('7', ('question_id', 'correct', 'points', 'score')),
+    'answer_submitted': ('8', ('username', 'question_id', 'seq')),
+    'question_ended': ('9', ('question_id', 'correct_index', 'leaderboard', 'seq')),
+    'quiz_ended': ('10', ('leaderboard', 'seq')),
+    'room_message': ('11', ('username', 'message', 'seq')),
+    'quiz_message': ('12', ('username', 'message', 'seq')),
+    'joined_quiz': ('13', ('username',)),
+    'left_quiz': ('14', ('username',)),
+    'resumed': ('15', ('room_id', 'player', 'resume_token', 'replayed', 'complete', 'participants_count')),
+    'resume_failed': ('16', ('room_id',)),
+    'rate_limited': ('17', ('event', 'retry_after')),
+}
+
+def schema_table():
+    """Tabella inviata al client: codice -> [evento, campi] più i record annidati"""
+    return {
+        'version': SCHEMA_VERSION,
+        'events': {code: [event, list(fields)] for event, (code, fields) in EVENTS.items()},
+        'records': {name: list(fields) for name, fields in RECORDS.items()},
+        'nested': NESTED,
+    }
+
+def _record(name, value):
+    return [value.get(field) for field in RECORDS[name]] if isinstance(value, dict) else value
+
+def _value(field, value):
+    name = NESTED.get(field)
+    if name is None:
+        return value
+    if isinstance(value, list):
+        return [_record(name, item) for item in value]
+    return _record(name, value)
+
+def encode_compact(event, payload):
+    """(codice evento, lista di valori); gli eventi fuori schema restano invariati"""
+    schema = EVENTS.get(event)
+    if schema is None or not isinstance(payload, dict):
+        return event, payload
+    code, fields = schema
+    values = [_value(field, payload.get(field)) for field in fields]
+    # I None finali (seq assente, campi opzionali) non vengono inviati
+    while values and values[-1] is None:
+        values.pop()
+    return code, values
+
+def encoded_room(room, encoding):
+    return room if encoding == JSON else f"{room}{ROOM_SEPARATOR}{encoding}"
+
+class LocalRoomCounts:
+    """Client compatti per room, in un solo processo"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def incr(self, room):
+        with self._lock:
+            self._counts[room] = self._counts.get(room, 0) + 1
+
+    def decr(self, room):
+        with self._lock:
+            count = self._counts.get(room, 0) - 1
+            if count > 0:
+                self._counts[room] = count
+            else:
+                self._counts.pop(room, None)
+
+    def get(self, room):
+        with self._lock:
+            return self._counts.get(room, 0)
+
+class RedisRoomCounts:
+    """Client compatti per room condivisi tra i worker (chiave wire:<room>:compact)"""
+
+    def __init__(self, client, ttl=ROOM_COUNT_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(room):
+        return f"wire:{room}:{COMPACT}"
+
+    def incr(self, room):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(self._key(room))
+        pipe.expire(self._key(room), self.ttl)
+        pipe.execute()
+
+    def decr(self, room):
+        if self.client.decr(self._key(room)) <= 0:
+            self.client.delete(self._key(room))
+
+    def get(self, room):
+        return int(self.client.get(self._key(room)) or 0)
+
+class WireFormats:
+    """Formato scelto da ogni sid collegato a questo processo e client compatti per room"""
+
+    def __init__(self, enabled=COMPACT_ENABLED, room_counts=None):
+        self.enabled = enabled
+        self._sids = {}  # solo i sid con un formato diverso da JSON
+        self._compact_rooms = {}  # sid compatto -> room in cui è entrato
+        self._room_counts = room_counts or LocalRoomCounts()
+        self._lock = threading.Lock()
+
+    def share_room_counts(self, client):
+        """Conteggio dei client compatti su Redis, per più worker con la stessa message queue"""
+        self._room_counts = RedisRoomCounts(client)
+
+    def negotiate(self, sid, auth):
+        requested = auth.get('encoding') if isinstance(auth, dict) else None
+        encoding = requested if self.enabled and requested in ENCODINGS else JSON
+        if encoding != JSON:
+            with self._lock:
+                self._sids[sid] = encoding
+        return encoding
+
+    def forget(self, sid):
+        """Disconnessione: il sid esce da tutte le room"""
+        with self._lock:
+            self._sids.pop(sid, None)
+            rooms = self._compact_rooms.pop(sid, ())
+        for room in rooms:
+            self._room_counts.decr(room)
+
+    def of(self, sid):
+        with self._lock:
+            return self._sids.get(sid, JSON)
+
+    def enter(self, room, sid):
+        """Room in cui far entrare il sid; conta i client compatti della room"""
+        with self._lock:
+            encoding = self._sids.get(sid, JSON)
+            counted = encoding == COMPACT and room not in self._compact_rooms.get(sid, ())
+            if counted:
+                self._compact_rooms.setdefault(sid, set()).add(room)
+        if counted:
+            self._room_counts.incr(room)
+        return encoded_room(room, encoding)
+
+    def exit(self, room, sid):
+        """Room da cui far uscire il sid"""
+        with self._lock:
+            encoding = self._sids.get(sid, JSON)
+            rooms = self._compact_rooms.get(sid)
+            counted = rooms is not None and room in rooms
+            if counted:
+                rooms.discard(room)
+        if counted:
+            self._room_counts.decr(room)
+        return encoded_room(room, encoding)
+
+    def counts(self):
+        with self._lock:
+            compact = sum(1 for encoding in self._sids.values() if encoding == COMPACT)
+        return {COMPACT: compact}
+
+    def emit_to_sid(self, emit, event, data, sid, **kwargs):
+        if self.of(sid) == COMPACT:
+            event, data = encode_compact(event, data)
+        return emit(event, data, room=sid, **kwargs)
+
+    def emit_to_room(self, emit, event, data, room, **kwargs):
+        """Stesso evento in JSON a <room> e, se ci sono client compatti, a <room>#compact"""
+        result = emit(event, data, room=room, **kwargs)
+        if self.enabled and self._room_counts.get(room) > 0:
+            code, values = encode_compact(event, data)
+            emit(code, values, room=encoded_room(room, COMPACT), **kwargs)
+        return result
+
+wire_formats = WireFormats()
@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import type { LoginCredentials } from '../types';
-import { authApi } from '../services/api';
+import { authApi, tokenManager } from '../services/api';
 import { useAuth } from '../hooks/useAuth';
 
 const Login: React.FC = () => {
@@ -37,6 +37,9 @@ const Login: React.FC = () => {
       const response = await authApi.login(credentials);
       console.log('Login successful:', response);
       if (response?.user_id) {
+        if (response.token) {
+          tokenManager.setToken(response.token);
+        }
         setUserId(response.user_id);
         setUsername(credentials.username);
         navigate('/');
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useAuth } from "../hooks/useAuth";
 import type { QuizLobby } from "../types";
@@ -22,7 +22,8 @@ const QuizLobbyPage: React.FC = () => {
   const [isStarting, setIsStarting] = useState(false);
   const [testMessage, setTestMessage] = useState("");
   const [isInRoom, setIsInRoom] = useState(false);
-  const [listUsers, setListUsers] = useState([]);
+  const [listUsers, setListUsers] = useState<any[]>([]);
+  const playersVersion = useRef(0);
 
   // Socket handlers
   useEffect(() => {
@@ -57,10 +58,30 @@ const QuizLobbyPage: React.FC = () => {
       });
 
       socket.on("list_players", (data: any) => {
+        playersVersion.current = data.version ?? 0;
         setListUsers(data.players);
+        setCountUsers(data.players?.length ?? 0);
         console.log("list players: ", data);
       });
 
+      // Modifiche raggruppate dal server: se manca una versione si chiede lo snapshot
+      socket.on("players_delta", (data: any) => {
+        if (data.base_version !== playersVersion.current) {
+          socket.emit("list_players", { room_id: quizId });
+          return;
+        }
+        playersVersion.current = data.version;
+        setListUsers((prev: any[]) => {
+          const removed = new Set(data.removed);
+          const added = new Map(data.added.map((p: any) => [p.id, p]));
+          return [
+            ...prev.filter((p: any) => !removed.has(p.id) && !added.has(p.id)),
+            ...data.added,
+          ];
+        });
+        setCountUsers(data.count);
+      });
+
       return () => {
         socket.emit("leave_room", {
           room_id: quizId,
@@ -73,6 +94,8 @@ const QuizLobbyPage: React.FC = () => {
         socket.off("room_message");
         socket.off("test_event");
         socket.off("test_response");
+        socket.off("list_players");
+        socket.off("players_delta");
       };
     }
   }, [socket, isConnected, quizId, userId]);
@@ -128,7 +151,7 @@ const QuizLobbyPage: React.FC = () => {
                 <div className="space-y-3">
                   {listUsers?.map((user: any, index: number) => (
                     <div
-                      key={index}
+                      key={user.id ?? index}
                       className="flex items-center space-x-3 p-3 bg-white/5 rounded-lg border border-white/10"
                     >
                       <UserAvatar username={user.username} size="md" />
@@ -55,7 +55,7 @@ const apiRequest = async <T>(
 
 // Authentication API calls
 export const authApi = {
-  login: async (credentials: LoginCredentials): Promise<{ user: User; user_id: string }> => {
+  login: async (credentials: LoginCredentials): Promise<{ user: User; user_id: string; token: string }> => {
     return apiRequest('/auth', {
       method: 'POST',
       body: JSON.stringify(credentials),
@@ -147,8 +147,20 @@ export const quizApi = {
     return apiRequest('/quizzes/my');
   },
 
+  // La lista è paginata dal server: segue next_cursor fino all'ultima pagina
   getQuizzesByUser: async (userId: number): Promise<{ quizzes: Quiz[]; message: string }> => {
-    return apiRequest(`/user/${userId}/quizzes`);
+    const quizzes: Quiz[] = [];
+    let cursor: string | null = null;
+    let message = '';
+    do {
+      const query: string = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+      const page: { quizzes: Quiz[]; message: string; next_cursor: string | null } =
+        await apiRequest(`/user/${userId}/quizzes?limit=200${query}`);
+      quizzes.push(...page.quizzes);
+      message = page.message;
+      cursor = page.next_cursor;
+    } while (cursor);
+    return { quizzes, message };
   },
 
   createLobby: async (quizId: number): Promise<CreateLobbyResponse> =>{